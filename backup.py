@@ -0,0 +1,308 @@
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import db
+
+
+# ===============================
+# 💾 YEDEKLEME / GERİ YÜKLEME
+# ===============================
+# Yedek, SQLite backup API ile uygulama açıkken alınır. Kopya BACKUP_PAGES
+# sayfalık adımlarla yapılır (ilerleme çubuğu, adım aralarında diğer
+# thread'ler çalışır). Kaynak bağlantı kopya boyunca açık bir okuma
+# transaction'ı tutar: WAL modunda bu sabit bir anlık görüntüdür, yazanlar
+# beklemez ve SQLite kopyayı her yazmada baştan almak zorunda kalmaz. Adımlar
+# arasında mola yok: açık anlık görüntü WAL checkpoint'ini (safe profilinde
+# yazanları) durdurur, kopya ne kadar kısa sürerse o kadar iyi.
+#
+# Dosya adı: stok_YYYYAAGG_SSDDss[_etiket].db(.gz) — ada göre sıralama
+# tarihe göre sıralama demektir, rotasyon buna dayanır.
+
+BACKUP_PAGES = 256          # 4 KB sayfa ile adım başına ~1 MB
+KEEP_BACKUPS = 7
+BACKUP_INTERVAL_HOURS = 24
+
+BACKUP_DIR_KEY = "backup_dir"
+BACKUP_KEEP_KEY = "backup_keep"
+BACKUP_INTERVAL_KEY = "backup_interval_hours"
+
+_backup_lock = threading.Lock()  # aynı anda tek yedek / geri yükleme
+
+
+def backup_dir():
+    path = db.get_setting(BACKUP_DIR_KEY) or Path(db.DB_PATH).parent / "backups"
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def list_backups(directory=None):
+    # En yeni başta
+    directory = Path(directory) if directory else backup_dir()
+    files = [
+        p for p in directory.glob("stok_*.db*")
+        if p.name.endswith((".db", ".db.gz"))
+    ]
+    return sorted(files, key=lambda p: p.name, reverse=True)
+
+
+def _backup_name(directory, label=None, compress=True):
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    suffix = f"_{label}" if label else ""
+    ext = ".db.gz" if compress else ".db"
+
+    path = directory / f"stok_{stamp}{suffix}{ext}"
+    n = 1
+    while path.exists():
+        n += 1
+        path = directory / f"stok_{stamp}{suffix}_{n}{ext}"
+    return path
+
+
+# -------------------------------
+# 🔍 DOĞRULAMA
+# -------------------------------
+def _check_database(path):
+    conn = sqlite3.connect(path)
+    try:
+        integrity = [r[0] for r in conn.execute("PRAGMA integrity_check")]
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        conn.close()
+
+    return {
+        "ok": integrity == ["ok"],
+        "integrity": integrity[:10],
+        "schema_version": version,
+    }
+
+
+def _gunzip_to_temp(path):
+    fd, tmp = tempfile.mkstemp(suffix=".db", dir=Path(path).parent)
+    with os.fdopen(fd, "wb") as out, gzip.open(path, "rb") as src:
+        shutil.copyfileobj(src, out, 1024 * 1024)
+    return tmp
+
+
+def verify_backup(path):
+    # Dönüş: {"ok", "integrity": [...], "schema_version"}
+    path = str(path)
+    if not path.endswith(".gz"):
+        return _check_database(path)
+
+    tmp = _gunzip_to_temp(path)
+    try:
+        return _check_database(tmp)
+    finally:
+        os.remove(tmp)
+
+
+# -------------------------------
+# 📸 YEDEK AL
+# -------------------------------
+def create_backup(directory=None, compress=True, keep=None, label=None,
+                  on_progress=None):
+    # Worker thread'den çağrılabilir. Dönüş: yedek dosyasının yolu.
+    directory = Path(directory) if directory else backup_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    if keep is None:
+        keep = int(db.get_setting(BACKUP_KEEP_KEY, KEEP_BACKUPS))
+
+    target = _backup_name(directory, label, compress)
+    tmp = directory / f".{target.name}.part"
+
+    with _backup_lock:
+        try:
+            _copy_database(tmp, on_progress)
+
+            check = _check_database(tmp)
+            if not check["ok"]:
+                raise ValueError("Yedek doğrulanamadı: " + "; ".join(check["integrity"]))
+
+            if compress:
+                with open(tmp, "rb") as src, gzip.open(target, "wb", compresslevel=6) as out:
+                    shutil.copyfileobj(src, out, 1024 * 1024)
+                os.remove(tmp)
+            else:
+                os.replace(tmp, target)
+        except BaseException:
+            if tmp.exists():
+                os.remove(tmp)
+            raise
+
+        rotate_backups(directory, keep)
+
+    if on_progress:
+        on_progress(1.0)
+    return target
+
+
+def _copy_database(dest, on_progress=None):
+    # Havuz dışı bağlantı: açık tuttuğumuz okuma transaction'ı başka işi etkilemesin
+    source = sqlite3.connect(db.DB_PATH, isolation_level=None)
+    source.execute("BEGIN")
+    source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()  # anlık görüntüyü sabitle
+    target = sqlite3.connect(dest)
+
+    def step(status, remaining, total):
+        if on_progress and total:
+            on_progress(0.9 * (total - remaining) / total)
+        time.sleep(0)  # anlık görüntü açık: beklemeden, sadece GIL'i bırak
+
+    try:
+        source.backup(target, pages=BACKUP_PAGES, progress=step)
+        # Kaynak WAL modunda; yedek tek başına taşınabilir tek dosya olsun
+        target.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        target.close()
+        source.execute("COMMIT")
+        source.close()
+
+
+def rotate_backups(directory=None, keep=KEEP_BACKUPS):
+    removed = []
+    for path in list_backups(directory)[max(keep, 1):]:
+        os.remove(path)
+        removed.append(path)
+    return removed
+
+
+# -------------------------------
+# ⏰ ZAMANLANMIŞ YEDEK
+# -------------------------------
+def backup_due(now=None):
+    hours = float(db.get_setting(BACKUP_INTERVAL_KEY, BACKUP_INTERVAL_HOURS))
+    if hours <= 0:
+        return False  # kapalı
+
+    backups = list_backups()
+    if not backups:
+        return True
+
+    last = datetime.fromtimestamp(backups[0].stat().st_mtime)
+    return (now or datetime.now()) - last >= timedelta(hours=hours)
+
+
+def backup_in_background(on_done=None):
+    # Süresi geldiyse arka planda yedek alır; on_done(path, error) worker'da çağrılır
+    if _backup_lock.locked() or not backup_due():
+        return False
+
+    def worker():
+        try:
+            path, error = create_backup(), None
+        except Exception as e:
+            path, error = None, e
+        if on_done:
+            on_done(path, error)
+
+    threading.Thread(target=worker, name="backup", daemon=True).start()
+    return True
+
+
+# -------------------------------
+# ♻️ GERİ YÜKLE
+# -------------------------------
+def restore_backup(path, on_progress=None):
+    # 1) yedeği doğrula  2) mevcut DB'nin güvenlik yedeğini al
+    # 3) havuzu kilitle, yedeği tek adımda kopyala  4) migrate
+    path = str(path)
+    source_path = _gunzip_to_temp(path) if path.endswith(".gz") else path
+
+    try:
+        check = _check_database(source_path)
+        if not check["ok"]:
+            raise ValueError("Yedek bozuk: " + "; ".join(check["integrity"]))
+        if check["schema_version"] > db.SCHEMA_VERSION:
+            raise ValueError("Yedek bu sürümden daha yeni bir uygulamaya ait")
+
+        # rotasyon yok: geri yüklenen yedek silinmesin
+        safety = create_backup(label="pre-restore", keep=len(list_backups()) + 1)
+
+        # Diğer thread'ler açık transaction'larını bitirir, sonra geri yükleme
+        # bitene kadar DB'ye dokunmaz; çıkışta havuz ve ayar önbelleği yeni DB'yi görür
+        with _backup_lock, db.fenced_connections():
+            source = sqlite3.connect(source_path)
+            target = sqlite3.connect(db.DB_PATH)
+            try:
+                # pages=-1: tek adım, yarım geri yükleme olmaz
+                source.backup(target)
+            finally:
+                source.close()
+                target.close()
+
+            db.migrate()
+    finally:
+        if source_path != path:
+            os.remove(source_path)
+
+    if on_progress:
+        on_progress(1.0)
+    return safety
+
+
+# -------------------------------
+# 🖥️ KOMUT SATIRI
+# -------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="stok-takip yedekleme")
+    parser.add_argument("--db", help="veritabanı dosyası (varsayılan: stok.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("create", help="yedek al")
+    p.add_argument("--dir")
+    p.add_argument("--keep", type=int)
+    p.add_argument("--no-compress", action="store_true")
+
+    p = sub.add_parser("list", help="yedekleri listele")
+    p.add_argument("--dir")
+
+    p = sub.add_parser("verify", help="yedeği doğrula")
+    p.add_argument("path")
+
+    p = sub.add_parser("restore", help="yedeği geri yükle")
+    p.add_argument("path")
+    p.add_argument("--yes", action="store_true", help="onay sorma")
+
+    args = parser.parse_args(argv)
+    if args.db:
+        db.DB_PATH = Path(args.db)
+    db.migrate()
+
+    if args.command == "create":
+        path = create_backup(args.dir, compress=not args.no_compress, keep=args.keep)
+        print(f"✅ {path} ({path.stat().st_size / 1024:.0f} KB)")
+
+    elif args.command == "list":
+        for path in list_backups(args.dir):
+            stamp = datetime.fromtimestamp(path.stat().st_mtime).strftime("%Y-%m-%d %H:%M")
+            print(f"{stamp}  {path.stat().st_size / 1024:>9.0f} KB  {path}")
+
+    elif args.command == "verify":
+        check = verify_backup(args.path)
+        print(f"{'✅' if check['ok'] else '❌'} şema v{check['schema_version']}: "
+              + "; ".join(check["integrity"]))
+        return 0 if check["ok"] else 1
+
+    elif args.command == "restore":
+        if not args.yes:
+            answer = input(f"{db.DB_PATH} üzerine {args.path} yazılacak. Devam? [e/H] ")
+            if answer.strip().lower() not in ("e", "evet", "y", "yes"):
+                return 1
+        safety = restore_backup(args.path)
+        print(f"✅ geri yüklendi (önceki hali: {safety})")
+
+    db.close_connections()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,1387 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from urllib.parse import quote
+
+import db
+
+
+# ===============================
+# 🧰 YARDIMCILAR
+# ===============================
+def use_temp_db(tmpdir, name="bench.db"):
+    db.close_connections()
+    db.DB_PATH = Path(tmpdir) / name
+    db.migrate()
+
+
+WORDS = [
+    "süt", "peynir", "yoğurt", "ekmek", "şeker", "çay", "kahve", "un",
+    "pirinç", "bulgur", "makarna", "zeytin", "yağ", "tuz", "bal", "reçel",
+    "ıspanak", "İnegöl", "köfte", "sucuk", "çikolata", "bisküvi", "gofret",
+    "deterjan", "şampuan", "sabun", "kağıt", "havlu", "pil", "ampul",
+]
+
+
+def product_name(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(3)).capitalize()
+
+
+def seed_products(n):
+    conn = db.get_connection()
+    rng = random.Random(42)
+    now = "2026-01-18T12:00:00"
+    with db.transaction() as cur:
+        cur.executemany(
+            """
+            INSERT INTO products (code, name, category, quantity, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                (f"P{i:07d}", product_name(rng), "Genel", 1_000_000, now, now)
+                for i in range(n)
+            ),
+        )
+        # Stok varsayılan şubede (lotsuz: çıkışlar lot kaydı düşmeden geçer)
+        cur.execute(
+            "INSERT INTO product_stock (product_id, location_id, quantity) "
+            "SELECT id, ?, quantity FROM products",
+            (db.DEFAULT_LOCATION_ID,),
+        )
+    return [r[0] for r in conn.execute("SELECT id FROM products")]
+
+
+def ops_per_sec(fn, n):
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    return n / elapsed
+
+
+def report(title, rows):
+    print(f"\n{title}")
+    width = max(len(r[0]) for r in rows)
+    for name, value in rows:
+        print(f"  {name.ljust(width)}  {value:>12,.0f} ops/s")
+
+
+# ===============================
+# 🔌 BAĞLANTI HAVUZU
+# ===============================
+def _legacy_connection():
+    # Havuzdan önceki davranış: her çağrıda yeni bağlantı + pragma
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = OFF")
+    # tetikleyicilerin kullandığı fonksiyonlar (o zaman da her bağlantıda gerekirdi)
+    conn.create_function("tr_fold", 1, db.fold_text, deterministic=True)
+    conn.create_function("hlc_now", 0, db.hlc_now)
+    conn.create_function("sync_local", 0, db._sync_local)
+    return conn
+
+
+def bench_pool(n=2000, products=1000):
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        ids = seed_products(products)
+
+        cases = [
+            ("get_product", lambda i: db.get_product(ids[i % len(ids)]), n),
+            ("stock_in", lambda i: db.stock_in(ids[i % len(ids)], 1), n // 4),
+            ("get_products (liste)", lambda i: db.get_products(), 20),
+        ]
+
+        pooled = db.get_connection
+        results = []
+        for name, fn, count in cases:
+            db.get_connection = _legacy_connection
+            before = ops_per_sec(fn, count)
+            db.get_connection = pooled
+            after = ops_per_sec(fn, count)
+            results.append((f"{name} önce", before))
+            results.append((f"{name} sonra", after))
+
+        report("Bağlantı havuzu (önce = her çağrıda connect)", results)
+        db.close_connections()
+
+
+# ===============================
+# 💾 DEPOLAMA PROFİLLERİ
+# ===============================
+def bench_profiles(n=1000, products=1000):
+    results = []
+    for name in db.STORAGE_PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            use_temp_db(tmp)
+            db.set_setting(db.STORAGE_PROFILE_KEY, name)
+            ids = seed_products(products)
+
+            results.append((
+                f"stock_in [{name}]",
+                ops_per_sec(lambda i: db.stock_in(ids[i % len(ids)], 1), n),
+            ))
+            results.append((
+                f"get_product [{name}]",
+                ops_per_sec(lambda i: db.get_product(ids[i % len(ids)]), n * 10),
+            ))
+            db.close_connections()
+
+    report("Depolama profilleri", results)
+
+
+# ===============================
+# 🧨 EŞZAMANLI STOK HAREKETİ
+# ===============================
+def run_stock_moves(threads, moves, products, start_qty):
+    # Çok thread aynı az sayıdaki ürüne çıkış/giriş yapar (geçerli DB'de).
+    # Dönüş: (ids, red sayısı, beklenmeyen hatalar, süre)
+    ids = [db.add_product(f"S{i}", f"Stres {i}", quantity=start_qty) for i in range(products)]
+    rejected = [0] * threads
+    errors = []
+
+    def worker(n):
+        rng = random.Random(n)
+        try:
+            for _ in range(moves):
+                pid = rng.choice(ids)
+                try:
+                    if rng.random() < 0.7:
+                        db.stock_out(pid, rng.randint(1, 10))
+                    else:
+                        db.stock_in(pid, rng.randint(1, 5))
+                except ValueError:
+                    rejected[n] += 1  # yetersiz stok: beklenen
+        except Exception as e:
+            errors.append(e)
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return ids, sum(rejected), errors, time.perf_counter() - start
+
+
+def stock_totals(ids):
+    # [(ürün, stok, hareketler toplamı)]. Açılış stoğu da bir "Stok düzeltme"
+    # hareketi olarak kayıtlı: stok = giriş - çıkış olmalı
+    conn = db.get_connection()
+    return [
+        (pid, db.get_product(pid)["quantity"], conn.execute(
+            """
+            SELECT COALESCE(SUM(CASE type WHEN 'IN' THEN amount ELSE -amount END), 0)
+            FROM stock_movements WHERE product_id=?
+            """,
+            (pid,),
+        ).fetchone()[0])
+        for pid in ids
+    ]
+
+
+def stress_stock_moves(threads=8, moves=500, products=3, start_qty=100):
+    # Sonunda: hiçbir stok eksi olmamalı ve stok = giriş - çıkış (açılış dahil).
+    # Aynı kontroller küçük sayılarla tests/test_stress.py'de
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        ids, rejected, errors, elapsed = run_stock_moves(threads, moves, products, start_qty)
+
+        total = threads * moves
+        print(
+            f"\nEşzamanlı stok hareketi: {threads} thread x {moves}, "
+            f"{total / elapsed:,.0f} hareket/s, {rejected} red, hata: {errors or 'yok'}"
+        )
+
+        ok = not errors
+        for pid, qty, net in stock_totals(ids):
+            ok = ok and qty >= 0 and qty == net
+            print(f"  ürün {pid}: stok {qty}, hareketler toplamı {net}")
+
+        problems = db.check_stock() + db.check_lots()
+        ok = ok and not problems
+        print(f"  şube / lot toplamları: {problems or 'tutarlı'}")
+
+        db.close_connections()
+
+    if not ok:
+        raise SystemExit("stok tutarsız veya eksi")
+
+
+# ===============================
+# 📦 TOPLU HAREKET
+# ===============================
+def bench_batch(lines=300, rounds=5, products=1000):
+    results = []
+    for name in ("balanced", "safe"):
+        with tempfile.TemporaryDirectory() as tmp:
+            use_temp_db(tmp)
+            db.set_setting(db.STORAGE_PROFILE_KEY, name)
+            ids = seed_products(products)
+            pallet = [(ids[i % len(ids)], "IN", 10, "palet") for i in range(lines)]
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                for pid, move_type, amount, description in pallet:
+                    db.stock_in(pid, amount, description)
+            single = lines * rounds / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                db.apply_movements(pallet)
+            batch = lines * rounds / (time.perf_counter() - start)
+
+            results.append((f"tek tek stock_in [{name}]", single))
+            results.append((f"apply_movements [{name}]", batch))
+
+            # Bozuk satırlar (ham JSON gibi) sadece kendilerini düşürür
+            mixed = db.apply_movements([
+                (ids[0], "IN", "5"), (ids[0], "IN", None), [ids[0], "IN", 1, None, None, None, None],
+                ("x", "IN", 1), (ids[0], ["IN"], 1), 42, (ids[0], "IN", 2),
+            ], atomic=False)
+            db.close_connections()
+
+    print(f"\nToplu hareket ({lines} satırlık palet, hareket/s)")
+    for title, value in results:
+        print(f"  {title:<32} {value:>12,.0f}")
+    if [r["ok"] for r in mixed] != [False] * 6 + [True]:
+        raise SystemExit(f"bozuk satırlar partiyi etkiledi: {mixed}")
+    print("  bozuk satırlar tek tek reddedildi, geçerli satır yazıldı ✓")
+
+
+# ===============================
+# 🔍 ÜRÜN ARAMA
+# ===============================
+def _like_search(text):
+    # FTS öncesi arama: baştan joker karakterli LIKE, tam tablo taraması
+    return db.get_connection().execute(
+        "SELECT * FROM products WHERE name LIKE ? OR code LIKE ? LIMIT ?",
+        (f"%{text}%", f"%{text}%", db.SEARCH_LIMIT),
+    ).fetchall()
+
+
+def bench_search(products=50_000):
+    # Her tuş vuruşunda bir sorgu: "ç", "çi", "çik", ...
+    keystrokes = ["çikolata", "P0049", "ınegol", "süt peynir", "zzz yok"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        seed_products(products)
+
+        print(f"\nÜrün arama ({products:,} ürün, tuş başına ms)")
+        for word in keystrokes:
+            prefixes = [word[:i] for i in range(1, len(word) + 1)]
+            for name, fn in (("LIKE", _like_search), ("FTS ", db.search_products)):
+                start = time.perf_counter()
+                for p in prefixes:
+                    fn(p)
+                ms = (time.perf_counter() - start) * 1000 / len(prefixes)
+                print(f"  {name} {word!r:<14} {ms:8.2f} ms")
+
+        # En son eklenen ürünün kodu: binlerce isim eşleşmesinin ardında kalmamalı
+        db.add_product("CIKO", "Yeni ürün")
+        found = [p["code"] for p in db.search_products("ciko", 5)]
+        db.close_connections()
+
+    if found[:1] != ["CIKO"]:
+        raise SystemExit(f"birebir kod eşleşmesi ilk sırada değil: {found}")
+    print("  birebir kod, aday sınırının dışında olsa da ilk sırada ✓")
+
+
+# ===============================
+# 📄 SAYFALAMA
+# ===============================
+def bench_pages(sizes=(1_000, 10_000, 100_000)):
+    print("\nİlk kart için gereken sorgu (ms)")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            use_temp_db(tmp)
+            seed_products(n)
+
+            for name, fn in (
+                ("tüm liste ", db.get_products),
+                ("ilk sayfa ", db.get_products_page),
+            ):
+                start = time.perf_counter()
+                fn()
+                ms = (time.perf_counter() - start) * 1000
+                print(f"  {name} {n:>7,}  {ms:9.2f} ms")
+
+            db.close_connections()
+
+
+# ===============================
+# 📥 TOPLU İÇE AKTARMA
+# ===============================
+def _write_import_csv(path, n, seed=7):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("Kod;Ürün Adı;Kategori;Adet;Raf;Not;SKT\n")
+        for i in range(n):
+            f.write(
+                f"IMP{i:07d};{product_name(rng)};Gıda;{rng.randint(0, 500)};"
+                f"R{i % 40};;{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.2027\n"
+            )
+        # bilerek hatalı satırlar: tekrar eden kod, boş alan, sayı olmayan adet
+        f.write("IMP0000000;Tekrar;Gıda;1;;;\n")
+        f.write(";Kodsuz;Gıda;1;;;\n")
+        f.write("BAD1;Bozuk;Gıda;on;;;\n")
+
+
+def bench_import(rows=200_000):
+    import importer
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        path = os.path.join(tmp, "urunler.csv")
+        _write_import_csv(path, rows)
+
+        print(f"\nToplu içe aktarma ({rows:,} satır CSV)")
+        for title, traced in (("ilk yükleme", False), ("tekrar (upsert)", False), ("bellek ölçümü", True)):
+            # tracemalloc süreyi ~2 kat şişirir: sadece son turda açık
+            if traced:
+                tracemalloc.start()
+            start = time.perf_counter()
+            summary = importer.import_products(path)
+            elapsed = time.perf_counter() - start
+
+            if traced:
+                peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+                tracemalloc.stop()
+                print(f"  {title:<16} tepe {peak:5.1f} MB")
+            else:
+                print(
+                    f"  {title:<16} {elapsed:7.2f} s  {rows / elapsed:>9,.0f} satır/s  "
+                    f"hatalı {summary['failed']}"
+                )
+
+        count = db.get_connection().execute("SELECT COUNT(*) FROM products").fetchone()[0]
+        db.close_connections()
+
+    if count != rows or summary["failed"] != 3:
+        raise SystemExit(f"içe aktarma tutarsız: {count} ürün, {summary['failed']} hata")
+
+
+# ===============================
+# 📤 DIŞA AKTARMA
+# ===============================
+def bench_export(movements=200_000, products=1_000):
+    import exporter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        ids = seed_products(products)
+        for start in range(0, movements, 10_000):
+            db.apply_movements(
+                [(ids[i % len(ids)], "IN", 1, "bench") for i in range(start, start + 10_000)]
+            )
+
+        print(f"\nDışa aktarma ({movements:,} hareket)")
+        for fmt in exporter.EXPORT_FORMATS:
+            path = os.path.join(tmp, f"hareketler.{fmt}")
+            for traced in (False, True):
+                # tracemalloc süreyi şişirir: süre ve bellek ayrı turlarda
+                if traced:
+                    tracemalloc.start()
+                start = time.perf_counter()
+                try:
+                    summary = exporter.export_movements(path)
+                except ImportError as e:
+                    if traced:
+                        tracemalloc.stop()
+                    print(f"  {fmt:<8} atlandı ({e})")
+                    break
+                elapsed = time.perf_counter() - start
+
+                if traced:
+                    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+                    tracemalloc.stop()
+                    print(f"           tepe {peak:5.1f} MB, {os.path.getsize(path) / 1024 / 1024:6.1f} MB dosya")
+                else:
+                    print(f"  {fmt:<8} {elapsed:6.2f} s  {summary['rows'] / elapsed:>9,.0f} satır/s")
+
+            if summary["rows"] != movements:
+                raise SystemExit(f"döküm eksik: {summary['rows']} / {movements}")
+
+        path = os.path.join(tmp, "filtreli.csv")
+        today = time.strftime("%Y-%m-%d")
+        start = time.perf_counter()
+        summary = exporter.export_movements(path, start=today, end=today, product_ids=ids[:5])
+        print(f"  filtreli csv (5 ürün, bugün) {summary['rows']:,} satır  "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+        db.close_connections()
+
+
+# ===============================
+# 💾 YEDEKLEME
+# ===============================
+def bench_backup(products=100_000):
+    import backup
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        ids = seed_products(products)
+
+        def write_latencies(stop):
+            # yedek sürerken ana thread'in yazma gecikmesi (ms)
+            values = []
+            while not stop.is_set():
+                start = time.perf_counter()
+                db.stock_in(ids[0], 1)
+                values.append((time.perf_counter() - start) * 1000)
+                time.sleep(0.002)
+            return values
+
+        print(f"\nYedekleme ({products:,} ürün)")
+        for title, run in (("yedek yok", False), ("yedek sürerken", True)):
+            stop = threading.Event()
+            result = {}
+            writer = threading.Thread(target=lambda: result.update(v=write_latencies(stop)))
+            writer.start()
+
+            start = time.perf_counter()
+            if run:
+                path = backup.create_backup(os.path.join(tmp, "backups"))
+            else:
+                time.sleep(1)
+            elapsed = time.perf_counter() - start
+            stop.set()
+            writer.join()
+
+            values = sorted(result["v"])
+            print(
+                f"  {title:<16} {elapsed:6.2f} s  yazma p50 {values[len(values) // 2]:6.2f} ms  "
+                f"maks {values[-1]:6.2f} ms  ({len(values)} yazma)"
+            )
+
+        check = backup.verify_backup(path)
+        print(f"  {path.name}: {path.stat().st_size / 1024:.0f} KB, integrity {check['integrity'][0]}")
+        db.close_connections()
+
+    if not check["ok"]:
+        raise SystemExit("yedek doğrulanamadı")
+
+
+# ===============================
+# 📊 HAREKET ÖZETLERİ
+# ===============================
+def bench_rollups(movements=300_000, products=1_000, days=365):
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        ids = seed_products(products)
+        rng = random.Random(3)
+
+        # Geçmiş bir yıla yayılmış hareketler (tetikleyiciler özeti doldurur)
+        start = time.perf_counter()
+        with db.transaction() as cur:
+            cur.executemany(
+                "INSERT INTO stock_movements (product_id, type, amount, date) VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        rng.choice(ids), rng.choice(db.MOVEMENT_TYPES), rng.randint(1, 20),
+                        f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00",
+                    )
+                    for _ in range(movements)
+                ),
+            )
+        print(f"\nHareket özetleri ({movements:,} hareket, {products:,} ürün)")
+        print(f"  yazma (tetikleyici dahil) {movements / (time.perf_counter() - start):>10,.0f} hareket/s")
+
+        conn = db.get_connection()
+        raw_daily = lambda: conn.execute(
+            "SELECT substr(date, 1, 10) AS day, "
+            "SUM(CASE WHEN type = 'IN' THEN amount ELSE 0 END), "
+            "SUM(CASE WHEN type = 'OUT' THEN amount ELSE 0 END), COUNT(*) "
+            "FROM stock_movements GROUP BY day ORDER BY day"
+        ).fetchall()
+        raw_product = lambda: conn.execute(
+            "SELECT SUM(CASE WHEN type = 'IN' THEN amount ELSE 0 END), COUNT(*) "
+            "FROM stock_movements WHERE product_id = ?", (ids[0],)
+        ).fetchall()
+
+        for title, fn in (
+            ("günlük rapor (tarama)", raw_daily),
+            ("günlük rapor (özet)", db.get_daily_movements),
+            ("ürün toplamı (tarama)", raw_product),
+            ("ürün toplamı (özet)", lambda: db.get_product_totals(ids[0])),
+            ("kategori, 1 ay (özet)", lambda: db.get_category_totals("2025-03-01", "2025-03-31")),
+        ):
+            fn()  # ilk çağrı: önbellek ısınsın
+            start = time.perf_counter()
+            fn()
+            print(f"  {title:<24} {(time.perf_counter() - start) * 1000:9.2f} ms")
+
+        start = time.perf_counter()
+        problems = db.check_rollups()
+        print(f"  tutarlılık kontrolü      {(time.perf_counter() - start) * 1000:9.2f} ms")
+        db.close_connections()
+
+    if problems:
+        raise SystemExit(f"özet tutarsız: {problems[:3]}")
+
+
+# ===============================
+# 🕘 HAREKET GEÇMİŞİ (detay ekranı)
+# ===============================
+def bench_history(movements=100_000, pages=20):
+    from ui.movement_model import MovementHistoryModel, movement_delta
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        pid = seed_products(1)[0]
+        rng = random.Random(5)
+
+        lines = [(pid, "IN" if rng.random() < 0.6 else "OUT", rng.randint(1, 5)) for _ in range(movements)]
+        for i in range(0, movements, 10_000):
+            db.apply_movements(lines[i:i + 10_000], atomic=False)
+
+        print(f"\nHareket geçmişi ({movements:,} hareketli ürün)")
+        for title, kwargs in (
+            ("filtresiz", {}),
+            ("sadece çıkış", {"move_type": "OUT"}),
+            ("tarih aralığı", {"end": time.strftime("%Y-%m-%d")}),
+        ):
+            start, end = db.day_bounds(kwargs.get("start"), kwargs.get("end"))
+            filters = {"move_type": kwargs.get("move_type"), "start": start, "end": end}
+
+            t = time.perf_counter()
+            balance = None if filters["move_type"] else db.get_balance_before(pid, end)
+            first = db.get_movements_page(pid, **filters)
+            first_ms = (time.perf_counter() - t) * 1000
+
+            data = []
+            model = MovementHistoryModel()
+            model.reset(data, balance)
+            model.append(data, first)
+
+            t = time.perf_counter()
+            page = first
+            for _ in range(pages - 1):
+                page = db.get_movements_page(pid, after=db.movement_cursor(page[-1]), **filters)
+                model.append(data, page)
+            page_ms = (time.perf_counter() - t) * 1000 / (pages - 1)
+
+            print(f"  {title:<14} ilk sayfa {first_ms:6.2f} ms   sonraki {page_ms:6.2f} ms/sayfa")
+
+        # Bakiye: en eskiye kadar yürüyünce seed stoğuna dönmeli
+        data = []
+        model.reset(data, db.get_balance_before(pid))
+        page = db.get_movements_page(pid, limit=movements)
+        model.append(data, page)
+        expected = db.get_product(pid)["quantity"] - sum(
+            movement_delta(m["type"], m["amount"]) for m in page
+        )
+        db.close_connections()
+
+    if model.balance != expected:
+        raise SystemExit(f"bakiye tutarsız: {model.balance} != {expected}")
+
+
+# ===============================
+# ⚠️ KRİTİK STOK UYARILARI
+# ===============================
+def bench_alerts(products=100_000, low_ratio=0.01):
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        ids = seed_products(products)
+        rng = random.Random(11)
+
+        # Her ürüne eşik; ~%1'i eşiğin altında
+        conn = db.get_connection()
+        with db.transaction() as cur:
+            cur.executemany(
+                "UPDATE products SET reorder_level = quantity + ? WHERE id = ?",
+                ((0 if rng.random() < low_ratio else -1 - rng.randint(0, 50), pid) for pid in ids),
+            )
+        alerts = db.count_low_stock()
+
+        print(f"\nKritik stok ({products:,} ürün, {alerts:,} uyarı)")
+        for title, fn in (
+            ("tam tarama", lambda: conn.execute(
+                "SELECT id FROM products NOT INDEXED "
+                "WHERE reorder_level IS NOT NULL AND quantity <= reorder_level"
+            ).fetchall()),
+            ("kısmi indeks: sayı", db.count_low_stock),
+            ("kısmi indeks: liste", db.get_low_stock_products),
+        ):
+            fn()
+            start = time.perf_counter()
+            fn()
+            print(f"  {title:<22} {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+        # Hareket anında eşik geçişi: abone sadece geçişte çağrılır
+        events = []
+
+        def on_alert(*args):
+            events.append(args)
+
+        db.subscribe_stock_alerts(on_alert)
+        try:
+            pid = ids[0]
+            db.set_reorder_level(pid, db.get_product(pid)["quantity"] - 1)
+            db.stock_out(pid, 1)   # eşiğe indi → low
+            db.stock_out(pid, 1)   # zaten altında → olay yok
+            db.stock_in(pid, 5)    # üstüne çıktı → ok
+            # Dış transaction geri alınırsa (ör. grup commit hatası) olay yok
+            try:
+                with db.transaction(immediate=True):
+                    db.stock_out(pid, 5)
+                    raise RuntimeError("geri al")
+            except RuntimeError:
+                pass
+        finally:
+            db.unsubscribe_stock_alerts(on_alert)
+
+        db.close_connections()
+
+    if [e[3] for e in events] != [True, False]:
+        raise SystemExit(f"eşik geçişleri hatalı: {events}")
+    print("  eşik geçişleri: altına indi → üstüne çıktı, geri alınan işte olay yok ✓")
+
+
+# ===============================
+# ⏰ SON KULLANMA TARİHİ
+# ===============================
+def bench_expiry(products=100_000):
+    from datetime import date, timedelta
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        ids = seed_products(products)
+        rng = random.Random(13)
+        today = date.today()
+
+        # Ürünlerin yarısında SKT: -30 .. +720 gün
+        with db.transaction() as cur:
+            cur.executemany(
+                "UPDATE products SET expiry_date = ? WHERE id = ?",
+                (
+                    ((today + timedelta(days=rng.randint(-30, 720))).isoformat(), pid)
+                    for pid in ids if rng.random() < 0.5
+                ),
+            )
+
+        conn = db.get_connection()
+        print(f"\nSon kullanma ({products:,} ürün)")
+        for title, fn in (
+            ("tam tarama (30 gün)", lambda: conn.execute(
+                "SELECT id FROM products NOT INDEXED "
+                "WHERE expiry_date IS NOT NULL AND expiry_date <= ? AND quantity > 0",
+                ((today + timedelta(days=30)).isoformat(),),
+            ).fetchall()),
+            ("indeks: 30 gün", lambda: db.get_expiring_products(30)),
+            ("indeks: süresi geçmiş", db.count_expired),
+        ):
+            fn()
+            start = time.perf_counter()
+            rows = fn()
+            n = rows if isinstance(rows, int) else len(rows)
+            print(f"  {title:<24} {(time.perf_counter() - start) * 1000:8.2f} ms  ({n:,})")
+
+        db.close_connections()
+
+
+# ===============================
+# 📦 LOTLAR (FIFO / FEFO)
+# ===============================
+def bench_lots(products=100, lots=1_000, moves=100_000, lot_size=100):
+    from datetime import date, timedelta
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        conn = db.get_connection()
+        rng = random.Random(17)
+        today = date.today()
+
+        ids = [db.add_product(f"L{i:05d}", f"Lot ürünü {i}", None, 0, None, None) for i in range(products)]
+
+        # Her ürüne derin lot kuyruğu: karışık SKT'li girişler
+        start = time.perf_counter()
+        for _ in range(lots):
+            db.apply_movements([
+                (pid, "IN", lot_size, None,
+                 (today + timedelta(days=rng.randint(1, 720))).isoformat(),
+                 round(rng.uniform(1, 50), 2))
+                for pid in ids
+            ])
+        elapsed = time.perf_counter() - start
+        print(f"\nLotlar ({products} ürün × {lots:,} lot, {moves:,} çıkış)")
+        print(f"  lot girişi              {products * lots / elapsed:10,.0f} lot/s")
+
+        # Çıkışlar: 1..2 lota yayılan miktarlar, toplam stokun ~yarısı
+        picks = [(rng.choice(ids), rng.randint(1, lot_size)) for _ in range(moves)]
+        windows = []
+        window = moves // 10
+        out_total = 0
+        for w in range(0, moves, window):
+            start = time.perf_counter()
+            for i, (pid, amount) in enumerate(picks[w:w + window]):
+                db.stock_out(pid, amount, policy="FIFO" if i % 2 else "FEFO")
+                out_total += amount
+            windows.append((time.perf_counter() - start) / window * 1_000_000)
+        print(f"  çıkış: ilk %10          {windows[0]:8.1f} µs/işlem")
+        print(f"  çıkış: son %10          {windows[-1]:8.1f} µs/işlem")
+
+        # Sıradaki lotu bulmak: kısmi indeks vs tam tarama
+        pid = ids[0]
+        for title, sql in (
+            ("tam tarama", "SELECT id FROM stock_lots NOT INDEXED "
+                           "WHERE product_id = ? AND location_id = ? AND remaining > 0 "
+                           f"ORDER BY {db.LOT_ORDER_BY['FEFO']} LIMIT {db.LOT_FETCH}"),
+            ("kısmi indeks", "SELECT id FROM stock_lots "
+                             "WHERE product_id = ? AND location_id = ? AND remaining > 0 "
+                             f"ORDER BY {db.LOT_ORDER_BY['FEFO']} LIMIT {db.LOT_FETCH}"),
+        ):
+            conn.execute(sql, (pid, db.DEFAULT_LOCATION_ID)).fetchall()
+            start = time.perf_counter()
+            conn.execute(sql, (pid, db.DEFAULT_LOCATION_ID)).fetchall()
+            print(f"  sıradaki lot: {title:<12} {(time.perf_counter() - start) * 1000:8.3f} ms")
+
+        problems = db.check_lots()
+        consumed = conn.execute("SELECT SUM(quantity) FROM lot_consumptions").fetchone()[0]
+        db.close_connections()
+
+    if problems:
+        raise SystemExit(f"lot toplamı tutarsız: {problems}")
+    if consumed != out_total:
+        raise SystemExit(f"tüketim kaydı eksik: {consumed} != {out_total}")
+    print("  lot toplamları = stok, tüketim kayıtları = çıkışlar ✓")
+
+
+# ===============================
+# 🏬 ŞUBELER
+# ===============================
+def bench_locations(products=100_000, branches=10, transfers=5_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        ids = seed_products(products)
+        rng = random.Random(19)
+        conn = db.get_connection()
+
+        locations = [db.DEFAULT_LOCATION_ID] + [db.add_location(f"Şube {i}") for i in range(1, branches)]
+
+        # Stok tüm şubelere dağıtılmış olsun
+        start = time.perf_counter()
+        for i in range(transfers):
+            db.transfer_stock(rng.choice(ids), rng.randint(1, 1000),
+                              db.DEFAULT_LOCATION_ID, rng.choice(locations[1:]))
+        elapsed = time.perf_counter() - start
+
+        with db.transaction() as cur:
+            cur.executemany(
+                "INSERT OR IGNORE INTO product_stock (product_id, location_id, quantity) VALUES (?, ?, 0)",
+                ((pid, loc) for pid in ids for loc in locations[1:]),
+            )
+        rows = conn.execute("SELECT count(*) FROM product_stock").fetchone()[0]
+
+        print(f"\nŞubeler ({products:,} ürün × {branches} şube, {rows:,} satır)")
+        print(f"  transfer                {transfers / elapsed:10,.0f} işlem/s")
+
+        pid = ids[len(ids) // 2]
+        for title, fn in (
+            ("toplam: GROUP BY", lambda: conn.execute(
+                "SELECT product_id, SUM(quantity) FROM product_stock GROUP BY product_id"
+            ).fetchall()),
+            ("toplam: tek ürün SUM", lambda: conn.execute(
+                "SELECT SUM(quantity) FROM product_stock WHERE product_id = ?", (pid,)
+            ).fetchone()),
+            ("toplam: products.quantity", lambda: db.get_product(pid)["quantity"]),
+            ("ürün şube dağılımı", lambda: db.get_product_stock(pid)),
+            ("şube stoğu (sayfa)", lambda: db.get_location_stock(locations[1])),
+        ):
+            fn()
+            start = time.perf_counter()
+            fn()
+            print(f"  {title:<26} {(time.perf_counter() - start) * 1000:8.3f} ms")
+
+        problems = db.check_stock()
+        db.close_connections()
+
+    if problems:
+        raise SystemExit(f"şube toplamı tutarsız: {problems}")
+    print("  products.quantity = şube toplamı ✓")
+
+
+# ===============================
+# 🔄 ÇOK CİHAZLI SENKRONİZASYON
+# ===============================
+def _use_device(tmp, name):
+    # Aynı süreçte cihaz değiştir: her cihazın kendi DB'si ve ayarları
+    db.close_connections()
+    db.DB_PATH = Path(tmp) / name
+    db.migrate()
+
+
+def _stock_by_code():
+    return dict(db.get_connection().execute("SELECT code, quantity FROM products").fetchall())
+
+
+def bench_sync(pending=(100, 1_000, 10_000, 50_000), products=1_000):
+    import sync
+    import sync_server
+
+    server, url = sync_server.serve()
+    rng = random.Random(23)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _use_device(tmp, "a.db")
+        db.upsert_products([
+            (f"S{i:05d}", f"Sync ürünü {i}", "Genel", 1_000, None, None, None)
+            for i in range(products)
+        ])
+        ids = [r[0] for r in db.get_connection().execute("SELECT id FROM products")]
+        sync.sync(url)
+        _use_device(tmp, "b.db")
+        sync.sync(url)
+
+        print(f"\nSenkronizasyon ({products:,} ürün, A → sunucu → B)")
+        print(f"  {'bekleyen':>8} {'gönder':>9} {'çek+uygula':>11} {'KB':>8} {'değişiklik/s':>13}")
+        for n in pending:
+            _use_device(tmp, "a.db")
+            for i in range(0, n, 500):
+                db.apply_movements([
+                    (rng.choice(ids), "IN" if rng.random() < 0.5 else "OUT", rng.randint(1, 3))
+                    for _ in range(min(500, n - i))
+                ], atomic=False)
+
+            start = time.perf_counter()
+            sent = sync.push(url)
+            push_time = time.perf_counter() - start
+
+            _use_device(tmp, "b.db")
+            start = time.perf_counter()
+            received = sync.pull(url)
+            pull_time = time.perf_counter() - start
+
+            kb = (sent["bytes"] + received["bytes"]) / 1024
+            print(
+                f"  {n:>8,} {push_time * 1000:>7.0f}ms {pull_time * 1000:>9.0f}ms "
+                f"{kb:>8.0f} {n / (push_time + pull_time):>13,.0f}"
+            )
+
+        # Çakışma: iki cihaz çevrimdışıyken aynı üründen satar
+        _use_device(tmp, "b.db")
+        db.stock_out(ids[0], 7)
+        _use_device(tmp, "a.db")
+        db.stock_out(ids[0], 5)
+        sync.sync(url)
+        _use_device(tmp, "b.db")
+        sync.sync(url)
+        stock_b = _stock_by_code()
+        problems = db.check_stock() + db.check_lots()
+        _use_device(tmp, "a.db")
+        sync.sync(url)
+        stock_a = _stock_by_code()
+        problems += db.check_stock() + db.check_lots()
+
+        # A'nın açtığı ürünü B düzenler, satar ve başka birini siler
+        db.upsert_products([
+            ("X1", "Eski ad", "Genel", 10, None, None, None),
+            ("X2", "Silinecek", "Genel", 0, None, None, None),
+        ])
+        sync.sync(url)
+        _use_device(tmp, "b.db")
+        sync.sync(url)
+        x1 = db.get_product_by_code("X1")
+        db.update_product(x1["id"], "X1", "Yeni ad", x1["category"], x1["quantity"], x1["note"])
+        db.stock_out(x1["id"], 3)
+        db.delete_product(db.get_product_by_code("X2")["id"])
+        sync.sync(url)
+        _use_device(tmp, "a.db")
+        sync.sync(url)
+        x1 = db.get_product_by_code("X1")
+        x2 = db.get_product_by_code("X2")
+
+        db.close_connections()
+    server.shutdown()
+
+    if (x1["name"], x1["quantity"]) != ("Yeni ad", 7) or x2 is not None:
+        raise SystemExit(f"B'nin değişikliği A'ya ulaşmadı: {dict(x1)}, X2 {'duruyor' if x2 else 'silindi'}")
+
+    if stock_a != stock_b:
+        diff = {k: (stock_a.get(k), stock_b.get(k)) for k in stock_a if stock_a.get(k) != stock_b.get(k)}
+        raise SystemExit(f"cihazlar farklı stokta: {list(diff.items())[:5]}")
+    if problems:
+        raise SystemExit(f"şube / lot toplamı tutarsız: {problems}")
+    print("  A ve B aynı stokta (çevrimdışı çakışan satışlar dahil) ✓")
+    print("  B'nin A ürünündeki düzenleme / satış / silmesi A'ya ulaştı ✓")
+
+
+# ===============================
+# 📷 BARKOD OKUTMA
+# ===============================
+def bench_scan(products=100_000, scans=20_000, hot=500):
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        seed_products(products)
+        conn = db.get_connection()
+        rng = random.Random(31)
+        # Dükkanda okutmaların çoğu az sayıda çok satan üründen gelir
+        hot_codes = [f"P{rng.randrange(products):07d}" for _ in range(hot)]
+        codes = [
+            rng.choice(hot_codes) if rng.random() < 0.8 else f"P{rng.randrange(products):07d}"
+            for _ in range(scans)
+        ]
+
+        def like(i):
+            conn.execute(
+                "SELECT * FROM products WHERE code LIKE ?", (f"%{codes[i]}%",)
+            ).fetchall()
+
+        rows = [
+            ("LIKE '%kod%' (eski)", ops_per_sec(like, 200)),
+            ("FTS arama", ops_per_sec(lambda i: db.search_products(codes[i]), 2_000)),
+        ]
+
+        rows.append(("birebir kod (UNIQUE indeks)", ops_per_sec(
+            lambda i: conn.execute("SELECT * FROM products WHERE code=?", (codes[i],)).fetchone(), scans
+        )))
+        for code in codes:
+            db.get_product_by_code(code)
+        rows.append(("get_product_by_code (LRU)", ops_per_sec(lambda i: db.get_product_by_code(codes[i]), scans)))
+        rows.append(("okut + stock_out", ops_per_sec(
+            lambda i: db.stock_out(db.get_product_by_code(codes[i])["id"], 1), scans // 4
+        )))
+
+        # Kod değişince önbellek eski kodu vermemeli
+        product = db.get_product_by_code(hot_codes[0])
+        db.update_product(product["id"], "YENI-KOD", product["name"], product["category"],
+                          product["quantity"], product["note"])
+        stale = db.get_product_by_code(hot_codes[0])
+        renamed = db.get_product_by_code("YENI-KOD")
+        db.close_connections()
+
+    report(f"Barkod okutma ({products:,} ürün, okutma/s)", rows)
+    if stale is not None or renamed is None or renamed["id"] != product["id"]:
+        raise SystemExit("kod önbelleği bayat sonuç verdi")
+    print("  kod değişikliği önbellekten düştü ✓")
+
+
+# ===============================
+# 👤 KULLANICILAR / YETKİLER
+# ===============================
+def bench_users(checks=200_000, moves=5_000, products=1_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        ids = seed_products(products)
+        conn = db.get_connection()
+        try:
+            db.add_user("kasa0", 3, "1234")  # PIN'li yönetici yokken giriş zorunlu olamaz
+            locked_out = False
+        except ValueError:
+            locked_out = True
+        db.set_user_pin(db.DEFAULT_USER_ID, "0000")
+        with db.acting_user(db.DEFAULT_USER_ID):
+            cashier = db.add_user("kasa", 3, "1234")  # Kasiyer: sadece stock.out
+            db.add_user("yedek", 3)  # PIN'siz: giriş zorunluyken giremez
+            editor = db.add_user("editor", db.add_role("Editör", ["product.edit"]), "5678")
+
+        # Düzenleme izni miktarı değiştirmeye yetmez (miktar farkı hareket olur)
+        product = db.get_product(ids[0])
+        with db.acting_user(editor):
+            db.update_product(ids[0], product["code"], "Yeni ad", product["category"],
+                              product["quantity"], product["note"])
+            try:
+                db.update_product(ids[0], product["code"], "Yeni ad", product["category"],
+                                  product["quantity"] + 5, product["note"])
+                edit_moves = True
+            except db.PermissionDenied:
+                edit_moves = False
+
+        def sql_check(i):
+            conn.execute(
+                """
+                SELECT 1 FROM users u
+                JOIN role_permissions rp ON rp.role_id = u.role_id
+                WHERE u.id = ? AND u.active AND rp.permission = ?
+                """,
+                (cashier, "stock.out"),
+            ).fetchone()
+
+        with db.acting_user(cashier):
+            rows = [
+                ("izin kontrolü (önbellek)", ops_per_sec(lambda i: db.require("stock.out"), checks)),
+                ("izin kontrolü (her seferinde SQL)", ops_per_sec(sql_check, checks // 10)),
+                ("stock_out (kasiyer)", ops_per_sec(lambda i: db.stock_out(ids[i % products], 1), moves)),
+            ]
+            stamped = conn.execute(
+                "SELECT COUNT(*) FROM stock_movements WHERE user_id = ?", (cashier,)
+            ).fetchone()[0]
+            try:
+                db.stock_in(ids[0], 1)
+                denied_in = False
+            except db.PermissionDenied:
+                denied_in = True
+
+        # PIN'li kullanıcı var: giriş yapmadan yazılamaz, yönetici PIN'siz girer
+        try:
+            db.stock_out(ids[0], 1)
+            denied_anon = False
+        except db.PermissionDenied:
+            denied_anon = True
+        try:
+            db.login("yedek", "")
+            empty_pin = True
+        except ValueError:
+            empty_pin = False
+        db.login(db.DEFAULT_USERNAME, "0000")
+        db.set_role_permissions(3, [])  # önbellek atılmalı
+        with db.acting_user(cashier):
+            revoked = not db.has_permission("stock.out")
+
+        # Başka süreç (ör. server.py) izni geri verir: önbellek bunu görmeli
+        other = sqlite3.connect(db.DB_PATH)
+        with other:
+            other.execute("INSERT INTO role_permissions (role_id, permission) VALUES (3, 'stock.out')")
+        other.close()
+        time.sleep(db.AUTH_RECHECK_SECONDS)
+        with db.acting_user(cashier):
+            regranted = db.has_permission("stock.out")
+        db.logout()
+        db.close_connections()
+
+    report("Yetki kontrolü (ops/s)", rows)
+    if stamped != moves or empty_pin or edit_moves or not (locked_out and denied_in and denied_anon and revoked and regranted):
+        raise SystemExit(
+            f"yetki hatası: damgalı {stamped}/{moves}, PIN'siz yönetici iken kilit {not locked_out}, "
+            f"boş PIN ile giriş {empty_pin}, düzenlemeyle stok girişi {edit_moves}, giriş reddi {denied_in}, "
+            f"girişsiz ret {denied_anon}, rol değişince geri alındı {revoked}, "
+            f"başka süreçteki değişiklik görüldü {regranted}"
+        )
+    print("  hareketler kullanıcıyla damgalı, rol değişikliği anında, başka süreçteki AUTH_RECHECK_SECONDS içinde geçerli ✓")
+
+
+# ===============================
+# 🖧 HTTP SUNUCUSU (yük testi)
+# ===============================
+def _server_requests(ids, n, seed=29):
+    # %80 okuma / %20 yazma karışımı, önceden hazırlanmış ham HTTP istekleri
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(n):
+        pid = rng.choice(ids)
+        r = rng.random()
+        if r < 0.55:
+            method, path, body = "GET", f"/products/{pid}", b""
+        elif r < 0.70:
+            method, path, body = "GET", f"/products?q={quote(rng.choice(WORDS[:16]))}&limit=20", b""
+        elif r < 0.80:
+            method, path, body = "GET", f"/products/{pid}/movements?limit=20", b""
+        else:
+            kind = "out" if r < 0.90 else "in"
+            method, path, body = "POST", f"/products/{pid}/{kind}", b'{"amount": 1}'
+        head = f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(body)}\r\n\r\n"
+        requests.append(head.encode("utf-8") + body)
+    return requests
+
+
+async def _load_client(port, requests, rate, connections):
+    # Açık döngü: i. istek start + i / rate anında gönderilir, gecikme o andan
+    # ölçülür (sunucu geride kalırsa kuyrukta bekleme de gecikmeye sayılır).
+    # Her bağlantı cevap beklemeden göndermeye devam eder (pipelining).
+    import asyncio
+
+    latencies = []
+    failures = [0]
+    start = time.perf_counter() + 0.05
+
+    async def worker(k):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        sent = asyncio.Queue()
+
+        async def receive():
+            while True:
+                due = await sent.get()
+                if due is None:
+                    return
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+                await reader.readexactly(length)
+                latencies.append(time.perf_counter() - due)
+                if not head.startswith(b"HTTP/1.1 200"):
+                    failures[0] += 1
+
+        receiver = asyncio.create_task(receive())
+        for i in range(k, len(requests), connections):
+            due = start + i / rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            writer.write(requests[i])
+            sent.put_nowait(due)
+        await sent.put(None)
+        await receiver
+        writer.close()
+
+    await asyncio.gather(*(worker(k) for k in range(connections)))
+    return latencies, failures[0], time.perf_counter() - start
+
+
+def bench_server(rates=(500, 1_000, 2_000), seconds=3, connections=16, products=10_000):
+    import asyncio
+    import server
+
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        ids = seed_products(products)
+        db.close_connections()
+        stock_server, _ = server.serve()
+
+        print(f"\nHTTP sunucusu ({products:,} ürün, {connections} bağlantı, %80 okuma / %20 yazma)")
+        print(f"  {'hedef/s':>8} {'gerçek/s':>9} {'p50':>8} {'p99':>8} {'hata':>5} {'yazma/commit':>13}")
+        for rate in rates:
+            requests = _server_requests(ids, rate * seconds, seed=rate)
+            groups, writes = stock_server.stats["groups"], stock_server.stats["writes"]
+            latencies, failures, elapsed = asyncio.run(
+                _load_client(stock_server.port, requests, rate, connections)
+            )
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[int(len(latencies) * 0.99)] * 1000
+            per_commit = (stock_server.stats["writes"] - writes) / max(stock_server.stats["groups"] - groups, 1)
+            print(
+                f"  {rate:>8,} {len(latencies) / elapsed:>9,.0f} {p50:>6.1f}ms {p99:>6.1f}ms "
+                f"{failures:>5} {per_commit:>13.1f}"
+            )
+
+        bad = {name: _raw_status(stock_server.port, raw) for name, raw in _bad_requests(ids[0])}
+        stock_server.shutdown()
+        problems = db.check_stock()  # seed_products lotsuz: check_lots burada anlamsız
+        db.close_connections()
+
+    if problems:
+        raise SystemExit(f"şube toplamı tutarsız: {problems}")
+    print("  products.quantity = şube toplamı ✓")
+    wrong = {name: status for name, status in bad.items() if status != 400}
+    if wrong:
+        raise SystemExit(f"bozuk istek 400 almadı: {wrong}")
+    print(f"  bozuk istekler ({', '.join(bad)}) → 400 ✓")
+
+
+def _bad_requests(product_id):
+    def post(path, body, *headers):
+        head = "".join(f"{h}\r\n" for h in headers) or f"Content-Length: {len(body)}\r\n"
+        return f"POST {path} HTTP/1.1\r\nHost: bench\r\n{head}\r\n".encode("latin-1") + body
+
+    return [
+        ("Content-Length", post(f"/products/{product_id}/in", b"", "Content-Length: abc")),
+        ("gzip", post(f"/products/{product_id}/in", b"nope!", "Content-Length: 5", "Content-Encoding: gzip")),
+        ("JSON dizi", post(f"/products/{product_id}/in", b"[1]")),
+        ("hareket satırı", post("/movements", b'{"movements": [[%d, "OUT", "1"]]}' % product_id)),
+        ("şube", post(f"/products/{product_id}/out", b'{"amount": 1, "location_id": "x"}')),
+    ]
+
+
+def _raw_status(port, raw):
+    import socket
+
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(raw)
+        return int(sock.recv(64).split(b" ", 2)[1])
+
+
+# ===============================
+# 📜 ÜRÜN LİSTESİ (Kivy gerekir)
+# ===============================
+def _measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def bench_list(sizes=(1_000, 10_000, 100_000), legacy_max=10_000):
+    os.environ.setdefault("KIVY_NO_ARGS", "1")
+    from kivy.base import EventLoop
+    from kivy.clock import Clock
+    from kivy.uix.gridlayout import GridLayout
+    from ui.product_card import ProductCard
+    from ui.product_model import product_to_data
+    from ui.product_list import ProductList
+
+    EventLoop.ensure_window()
+
+    def legacy(products):
+        # Eski yol: her ürün için tam bir ProductCard
+        layout = GridLayout(cols=1, spacing=6, size_hint_y=None)
+        for p in products:
+            card = ProductCard()
+            card.refresh_view_attrs(lst, 0, product_to_data(p))
+            layout.add_widget(card)
+
+    def virtual(products):
+        lst.set_products(products)
+        Clock.tick()  # layout + görünen kartların oluşturulması
+
+    print("\nÜrün listesi yenileme (ms / tepe bellek MB)")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            use_temp_db(tmp)
+            seed_products(n)
+            products = db.get_products()
+
+            lst = ProductList(on_open=lambda product_id: None, size=(480, 800))
+            ms, mb = _measure(lambda: virtual(products))
+            print(f"  RecycleView  {n:>7,}  {ms:9.1f} ms  {mb:7.1f} MB")
+
+            if n <= legacy_max:
+                ms, mb = _measure(lambda: legacy(products))
+                print(f"  kart/satır   {n:>7,}  {ms:9.1f} ms  {mb:7.1f} MB")
+
+            db.close_connections()
+
+
+# ===============================
+# 🔎 SORGU PLANLARI
+# ===============================
+def _traced_queries(fn):
+    # db fonksiyonunun çalıştırdığı SELECT'leri (parametreleri açılmış) topla
+    conn = db.get_connection()
+    queries = []
+    conn.set_trace_callback(queries.append)
+    try:
+        fn()
+    finally:
+        conn.set_trace_callback(None)
+    return [q for q in queries if q.lstrip().upper().startswith("SELECT")]
+
+
+def plan_cases(ids):
+    # (ad, fn): fn'nin çalıştırdığı her SELECT indeksle okunmalı.
+    # tests/test_query_plans.py de bunları kullanır
+    cases = [
+        ("get_movements", lambda: db.get_movements(ids[0])),
+        ("iter_movements [tarih]", lambda: list(db.iter_movements("2000-01-01", "2100-01-01"))),
+        ("get_daily_movements [ürün]", lambda: db.get_daily_movements("2000-01-01", "2100-01-01", ids[0])),
+        ("get_product_totals", lambda: db.get_product_totals(ids[0])),
+        ("get_movements_page", lambda: db.get_movements_page(ids[0], after=("2100-01-01", 1))),
+        ("get_movements_page [tür]", lambda: db.get_movements_page(ids[0], after=("2100-01-01", 1), move_type="OUT")),
+        ("get_movements_page [tarih]", lambda: db.get_movements_page(
+            ids[0], after=("2100-01-01", 1), start="2000-01-01", end="2100-01-01")),
+        ("get_balance_before", lambda: db.get_balance_before(ids[0], "2000-01-01")),
+        ("get_low_stock_products", db.get_low_stock_products),
+        ("count_low_stock", db.count_low_stock),
+        ("get_expiring_products", db.get_expiring_products),
+        ("count_expired", db.count_expired),
+        ("stock_out [FIFO]", lambda: db.stock_out(ids[0], 1, policy="FIFO")),
+        ("stock_out [FEFO]", lambda: db.stock_out(ids[0], 1, policy="FEFO")),
+        ("get_open_lots", lambda: db.get_open_lots(ids[0])),
+        ("get_movement_lots", lambda: db.get_movement_lots(1)),
+        ("transfer_stock", lambda: db.transfer_stock(
+            ids[0], 1, db.DEFAULT_LOCATION_ID, db.add_location("Plan Şubesi"))),
+        ("get_product_stock", lambda: db.get_product_stock(ids[0])),
+        ("get_product_by_code", lambda: db.get_product_by_code("P0000002")),
+        ("get_products_changed_since", lambda: db.get_products_changed_since(("2100-01-01", 0))),
+        ("get_location_stock", lambda: db.get_location_stock(db.DEFAULT_LOCATION_ID)),
+        ("update_product [lot eşitleme]", lambda: db.update_product(
+            ids[1], db.get_product(ids[1])["code"], "Lot", "Genel", 10, None)),
+    ]
+    for sort in db.PRODUCT_ORDER_BY:
+        cases.append((
+            f"get_products [{sort}]",
+            lambda sort=sort: (
+                db.set_setting("product_sort", sort),
+                db.get_products(),
+            ),
+        ))
+
+    for sort in db.PRODUCT_SORT_KEYS:
+        cases.append((
+            f"get_products_page [{sort}]",
+            lambda sort=sort: db.get_products_page(
+                after=db.page_cursor(db.get_products_page(limit=10, sort=sort)[-1]), sort=sort
+            ),
+        ))
+    return cases
+
+
+def seed_plan_db():
+    db.load_settings()  # açılışta bir kez, tam okuma beklenen durum
+    ids = seed_products(100)
+    db.stock_in(ids[0], 5)
+    return ids
+
+
+def query_plans(fn):
+    # fn'nin SELECT'leri → [(plan, kötü adımlar)]: tam tarama veya geçici sıralama
+    conn = db.get_connection()
+    plans = []
+    for sql in _traced_queries(fn):
+        plan = [r["detail"] for r in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+        bad = [
+            p for p in plan
+            if "TEMP B-TREE" in p
+            or (p.startswith("SCAN") and "USING" not in p)
+        ]
+        plans.append((plan, bad))
+    return plans
+
+
+def check_plans():
+    with tempfile.TemporaryDirectory() as tmp:
+        use_temp_db(tmp)
+        ids = seed_plan_db()
+
+        failed = False
+        print("\nSorgu planları")
+        for name, fn in plan_cases(ids):
+            for plan, bad in query_plans(fn):
+                failed = failed or bool(bad)
+                print(f"  {'HATA' if bad else 'OK  '} {name}: {' | '.join(plan)}")
+
+        db.close_connections()
+
+    if failed:
+        raise SystemExit("tam tarama veya geçici sıralama bulundu")
+
+
+BENCHMARKS = {
+    "pool": bench_pool,
+    "profiles": bench_profiles,
+    "stress": stress_stock_moves,
+    "batch": bench_batch,
+    "search": bench_search,
+    "pages": bench_pages,
+    "import": bench_import,
+    "export": bench_export,
+    "backup": bench_backup,
+    "rollups": bench_rollups,
+    "history": bench_history,
+    "alerts": bench_alerts,
+    "expiry": bench_expiry,
+    "lots": bench_lots,
+    "locations": bench_locations,
+    "sync": bench_sync,
+    "scan": bench_scan,
+    "users": bench_users,
+    "server": bench_server,
+    "list": bench_list,
+    "plans": check_plans,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="stok-takip benchmark")
+    parser.add_argument("names", nargs="*", help=", ".join(BENCHMARKS))
+    args = parser.parse_args()
+
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error("bilinmeyen benchmark: " + ", ".join(sorted(unknown)))
+
+    for name in args.names or BENCHMARKS:
+        try:
+            BENCHMARKS[name]()
+        except ImportError as e:
+            # Kivy / opsiyonel paket kurulu değilse o ölçümü atla
+            print(f"\n{name}: atlandı ({e})")
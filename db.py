@@ -1,360 +1,3479 @@
+import functools
+import hashlib
+import hmac
+import os
 import sqlite3
-from datetime import datetime
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
 DB_PATH = Path(__file__).parent / "stok.db"
 
-def init_settings():
+# -------------------- STORAGE PROFILES --------------------
+# journal_mode / synchronous / cache ayarları bağlantı açılırken uygulanır.
+# Seçim: STOK_DB_PROFILE ortam değişkeni > settings.storage_profile > varsayılan
+#   safe     → rollback journal + FULL fsync (eski davranış)
+#   balanced → WAL + NORMAL: commit'te fsync yok, okuyucu yazanı bekletmez
+#   fast     → WAL + OFF: elektrik kesilirse son işlemler kaybolabilir
+# wal_autocheckpoint: WAL bu kadar sayfaya ulaşınca otomatik checkpoint,
+# journal_size_limit: checkpoint sonrası WAL dosyası bu boyuta kırpılır.
+
+STORAGE_PROFILE_KEY = "storage_profile"
+STORAGE_PROFILE_ENV = "STOK_DB_PROFILE"
+DEFAULT_STORAGE_PROFILE = "balanced"
+
+STORAGE_PROFILES = {
+    "safe": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -2000,          # KiB (negatif = KiB)
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "wal_autocheckpoint": 1000,
+        "journal_size_limit": -1,
+    },
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -8000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000,
+        "journal_size_limit": 8 * 1024 * 1024,
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -32000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 4000,
+        "journal_size_limit": 32 * 1024 * 1024,
+    },
+}
+
+
+def _read_storage_profile(conn):
+    name = os.environ.get(STORAGE_PROFILE_ENV)
+
+    if not name:
+        try:
+            row = conn.execute(
+                "SELECT value FROM settings WHERE key=?",
+                (STORAGE_PROFILE_KEY,)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            row = None  # settings tablosu henüz yok (ilk açılış)
+        name = row[0] if row else None
+
+    return name if name in STORAGE_PROFILES else DEFAULT_STORAGE_PROFILE
+
+
+BUSY_TIMEOUT_MS = 5000
+
+
+def _apply_storage_profile(conn, name):
+    # Bağlantı başına pragma'lar. journal_mode dosyaya aittir: WAL'dan
+    # çıkmak için başka bağlantı açık olmamalı, bu yüzden burada sadece
+    # boşta ise denenir; profil değişiminde _switch_journal_mode() yapar
+    profile = STORAGE_PROFILES[name]
+
+    if conn.execute("PRAGMA journal_mode").fetchone()[0].upper() != profile["journal_mode"]:
+        conn.execute("PRAGMA busy_timeout = 0")
+        try:
+            conn.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+        except sqlite3.OperationalError:
+            pass  # SQLITE_BUSY: başka bağlantı açık, dosyanın modu kalır
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {profile['cache_size']}")
+    conn.execute(f"PRAGMA mmap_size = {profile['mmap_size']}")
+    conn.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+    conn.execute(f"PRAGMA wal_autocheckpoint = {profile['wal_autocheckpoint']}")
+    conn.execute(f"PRAGMA journal_size_limit = {profile['journal_size_limit']}")
+
+
+def get_storage_profile():
+    return _read_storage_profile(get_connection())
+
+
+def checkpoint(mode="PASSIVE"):
+    # WAL içeriğini ana dosyaya aktarır. PASSIVE kimseyi bekletmez,
+    # TRUNCATE (kapanışta) WAL dosyasını sıfırlar. WAL dışı modda etkisizdir.
+    if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+        raise ValueError("geçersiz checkpoint modu")
+
+    return get_connection().execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+
+
+# -------------------- TEXT FOLDING --------------------
+# Arama için Türkçe duyarlı katlama: "İ/I/ı" → "i", "Ş" → "s", "Ü" → "u" ...
+# Böylece "sut", "SÜT" ve "süt" aynı sonuca gider; klavyede Türkçe harf
+# olmasa da arama çalışır. Hem indekse yazarken hem sorguda kullanılır.
+
+_TR_DOTLESS = str.maketrans({"İ": "i", "I": "i", "ı": "i"})
+
+
+def fold_text(text):
+    if text is None:
+        return None
+
+    text = str(text)
+    if text.isascii():
+        return text.lower()  # ⚡ aksan yok: NFKD gereksiz (toplu içe aktarmada sıcak yol)
+
+    text = text.translate(_TR_DOTLESS).lower()
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+# -------------------- CONNECTION POOL --------------------
+# Her thread kendi uzun ömürlü bağlantısını kullanır (sqlite3 bağlantıları
+# thread'ler arasında paylaşılamaz). Bağlantı ilk kullanımda bir kez açılır,
+# pragma'lar bir kez uygulanır ve thread yaşadığı sürece tekrar kullanılır.
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pool = []
+_generation = 0  # close_connections() her çağrıldığında artar
+_pool_changed = threading.Condition(_pool_lock)
+_fence_owner = None  # fenced_connections() içindeki thread
+_active = 0          # açık (dış) transaction / reading() yapan thread sayısı
+
+
+def _open_connection():
+    # check_same_thread=False: bağlantı yine tek thread'de kullanılır,
+    # sadece close_connections() başka thread'den kapatabilsin diye
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+
+    # 🔴 MVP: foreign key engelini kapat
+    conn.execute("PRAGMA foreign_keys = OFF")
+
+    # FTS tetikleyicileri bu fonksiyonu kullanır, her bağlantıda olmalı
+    conn.create_function("tr_fold", 1, fold_text, deterministic=True)
+    # Değişiklik günlüğü tetikleyicileri (bkz. CHANGE LOG)
+    conn.create_function("hlc_now", 0, hlc_now)
+    conn.create_function("sync_local", 0, _sync_local)
+
+    _apply_storage_profile(conn, _read_storage_profile(conn))
+
+    return conn
+
+
+def get_connection():
+    # Transaction içindeki thread beklemez: fence zaten onun bitmesini bekliyor
+    if _fence_owner is not None and _fence_owner != threading.get_ident() \
+            and not getattr(_local, "leases", 0):
+        _wait_fence()
+
+    key = (DB_PATH, _generation)
+    conn = getattr(_local, "conn", None)
+
+    # DB_PATH değiştiyse (test / benchmark) veya havuz yenilendiyse yeniden aç.
+    # Eski bağlantıda açık transaction varsa o bitene kadar onu kullan
+    if conn is None or (_local.key != key and not _in_transaction(conn)):
+        if conn is not None:
+            with _pool_lock:
+                if conn in _pool:
+                    _pool.remove(conn)
+            conn.close()
+        conn = _open_connection()
+        _local.conn = conn
+        _local.key = key
+        _local.after_commit = []  # bkz. _after_commit
+        with _pool_lock:
+            _pool.append(conn)
+
+    return conn
+
+
+def _in_transaction(conn):
+    try:
+        return conn.in_transaction
+    except sqlite3.ProgrammingError:
+        return False  # close_connections() kapatmış
+
+
+def _wait_fence():
+    with _pool_changed:
+        _pool_changed.wait_for(lambda: _fence_owner in (None, threading.get_ident()))
+
+
+def _enter_pool():
+    # fenced_connections() sürerken başlamaz; başladıysa fence bunu bekler.
+    # Thread başına sayılır: iç içe girişler fence'i tekrar beklemez
+    global _active
+
+    leases = getattr(_local, "leases", 0)
+    if not leases:
+        with _pool_changed:
+            _pool_changed.wait_for(lambda: _fence_owner in (None, threading.get_ident()))
+            _active += 1
+    _local.leases = leases + 1
+
+
+def _leave_pool():
+    global _active
+
+    _local.leases -= 1
+    if not _local.leases:
+        with _pool_changed:
+            _active -= 1
+            if _fence_owner is not None:
+                _pool_changed.notify_all()
+
+
+@contextmanager
+def fenced_connections():
+    # DB dosyasını değiştiren işler (geri yükleme) için: yeni transaction ve
+    # bağlantı açılmaz, açık transaction'ların ve reading() okumalarının
+    # bitmesi beklenir, sonra tüm bağlantılar kapatılır. Bu sırada sadece çağıran thread DB'yi kullanır;
+    # çıkışta herkes yeni dosyaya yeni bağlantı açar.
+    global _fence_owner
+
+    with _pool_changed:
+        _pool_changed.wait_for(lambda: _fence_owner is None)
+        _fence_owner = threading.get_ident()
+        _pool_changed.wait_for(lambda: _active == 0)
+    try:
+        close_connections()
+        yield
+    finally:
+        close_connections()
+        with _pool_changed:
+            _fence_owner = None
+            _pool_changed.notify_all()
+
+
+def close_connections():
+    # Havuzdaki tüm bağlantıları kapatır (uygulama kapanışı, DB değişimi).
+    # Diğer thread'ler bir sonraki get_connection() çağrısında yenisini açar.
+    global _generation
+
+    global _settings
+
+    with _pool_lock:
+        conns = list(_pool)
+        _pool.clear()
+        _generation += 1
+        _settings = None  # ayar önbelleği de bu DB'ye ait
+
+    with _code_cache_lock:
+        _code_cache.clear()
+
+    _invalidate_auth()
+
+    for conn in conns:
+        conn.close()
+
+
+# Yazma işlemleri için: hata olursa rollback, yoksa commit.
+# immediate=True yazma kilidini en başta alır (oku-kontrol et-yaz akışları)
+# İç içe çağrılırsa (ör. server.py'nin grup commit'i) SAVEPOINT olur: hata
+# sadece içteki işi geri alır, commit'i dıştaki transaction yapar.
+@contextmanager
+def transaction(immediate=False):
+    conn = get_connection()
+    if conn.in_transaction:
+        mark = len(_local.after_commit)
+        conn.execute("SAVEPOINT nested")
+        try:
+            yield conn.cursor()
+        except BaseException:
+            conn.execute("ROLLBACK TO nested")
+            conn.execute("RELEASE nested")
+            del _local.after_commit[mark:]
+            raise
+        else:
+            conn.execute("RELEASE nested")
+        return
+
+    _enter_pool()
+    try:
+        conn = get_connection()  # bekleme sırasında havuz kapatılmış olabilir
+        _local.after_commit = []
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield conn.cursor()
+        except BaseException:
+            conn.rollback()
+            _local.after_commit = []
+            raise
+        else:
+            conn.commit()
+            callbacks, _local.after_commit = _local.after_commit, []
+    finally:
+        _leave_pool()
+
+    for callback in callbacks:
+        callback()
+
+
+@contextmanager
+def reading():
+    # Transaction dışında süren okumalar (arama thread'i, dışa aktarma
+    # üreteçleri, sunucu okuma havuzu): fenced_connections() bunların
+    # bitmesini bekler, kullanılan bağlantıyı kapatmaz
+    _enter_pool()
+    try:
+        yield get_connection()
+    finally:
+        _leave_pool()
+
+
+def _after_commit(fn, *args):
+    # Yan etkiler (stok uyarısı, önbellek silme) veri gerçekten yazılınca:
+    # dıştaki transaction açıksa onun commit'inden sonra çalışır, geri
+    # alınırsa atılır (ör. server.py grup commit'i başarısız olursa)
+    if get_connection().in_transaction:
+        _local.after_commit.append(functools.partial(fn, *args))
+    else:
+        fn(*args)
+
+
+# -------------------- SETTINGS --------------------
+# settings tablosu açılışta bir kez belleğe alınır; okumalar DB'ye gitmez.
+# set_setting önce DB'ye yazar, sonra önbelleği günceller ve o anahtara
+# abone olanları (ör. liste ekranı → product_sort) haberdar eder.
+# Önbellek her yazmada kopyalanıp değiştirilir, okuyucular kilit almaz.
+
+_settings = None
+_settings_lock = threading.Lock()
+_setting_listeners = {}  # key -> [callback(key, value)]
+
+
+def load_settings():
+    global _settings
+
+    rows = get_connection().execute("SELECT key, value FROM settings").fetchall()
+    with _settings_lock:
+        _settings = {row["key"]: row["value"] for row in rows}
+    return _settings
+
+
+def set_setting(key, value):
+    global _settings
+
+    if key == STORAGE_PROFILE_KEY and value not in STORAGE_PROFILES:
+        raise ValueError("Bilinmeyen depolama profili")
+
+    with transaction() as cur:
+        cur.execute(
+            "REPLACE INTO settings (key, value) VALUES (?, ?)",
+            (key, value)
+        )
+
+    with _settings_lock:
+        if _settings is not None:
+            _settings = {**_settings, key: value}
+
+    for callback in list(_setting_listeners.get(key, ())):
+        callback(key, value)
+
+
+def get_setting(key, default=None):
+    settings = _settings
+    if settings is None:
+        settings = load_settings()
+
+    return settings.get(key, default)
+
+
+def subscribe_setting(key, callback):
+    # ⚠️ callback set_setting'i çağıran thread'de çalışır
+    _setting_listeners.setdefault(key, []).append(callback)
+
+
+def unsubscribe_setting(key, callback):
+    listeners = _setting_listeners.get(key, [])
+    if callback in listeners:
+        listeners.remove(callback)
+
+
+def _switch_journal_mode():
+    # Açık transaction'lar biter, tüm bağlantılar kapanır; tek kalan
+    # bağlantı journal_mode'u değiştirir. Çıkışta herkes yeni profille açar
+    with fenced_connections():
+        get_connection()
+
+
+# Yeni depolama profili: journal_mode bir kez, diğer pragma'lar her bağlantıda
+subscribe_setting(STORAGE_PROFILE_KEY, lambda key, value: _after_commit(_switch_journal_mode))
+
+
+# -------------------- USERS / YETKİLER --------------------
+# Kullanıcı → rol → izin. Yetki her stok hareketinde kontrol edildiği için
+# izinler her seferinde join'le okunmaz: aktif kullanıcıların izin kümeleri ilk kontrolde bir kez
+# okunur (user_id → frozenset), kontrol tek dict + set aramasıdır. Kullanıcı,
+# rol veya izin değişince önbellek atılır, sonraki kontrol yeniden okur.
+# Başka süreçteki değişiklik için auth_version satırı (tetikleyicilerle artan
+# sayaç) en fazla AUTH_RECHECK_SECONDS'ta bir, girişte her seferinde okunur;
+# sürüm değiştiyse önbellek yenilenir.
+# Oturum: uygulamada cihaz başına bir giriş (login); sunucu / arka plan
+# işleri acting_user() ile thread'e özel kullanıcıyla çalışır. Hiçbir aktif
+# kullanıcının PIN'i yoksa giriş gerekmez, işlemler varsayılan yöneticiyle
+# yapılır (eski tek kullanıcılı davranış). Giriş zorunluyken PIN'siz kullanıcı
+# giremez; bu yüzden PIN'li aktif bir yönetici olmadan kimseye PIN verilemez.
+
+PERMISSIONS = {
+    "product.add": "Ürün ekleme / içe aktarma",
+    "product.edit": "Ürün düzenleme",
+    "product.delete": "Ürün silme",
+    "stock.in": "Stok girişi",
+    "stock.out": "Stok çıkışı",
+    "stock.transfer": "Şubeler arası transfer",
+    "locations.manage": "Şube yönetimi",
+    "users.manage": "Kullanıcı ve rol yönetimi",
+}
+
+ADMIN_ROLE_ID = 1
+DEFAULT_USER_ID = 1
+DEFAULT_USERNAME = "admin"
+DEFAULT_ROLES = [
+    (ADMIN_ROLE_ID, "Yönetici", list(PERMISSIONS)),
+    (2, "Depo", ["product.add", "product.edit", "stock.in", "stock.out", "stock.transfer"]),
+    (3, "Kasiyer", ["stock.out"]),
+]
+
+PIN_ITERATIONS = 100_000
+# Başka süreçteki (ör. server.py) rol / PIN değişikliği en geç bu kadar sonra
+# görülür; bu süreçteki değişiklikler commit'te önbelleği hemen atar
+AUTH_RECHECK_SECONDS = 1.0
+
+
+class PermissionDenied(ValueError):
+    pass
+
+
+_auth = None           # {"users": {user_id: frozenset(izin)}, "open": PIN'siz mod mu, "version", "checked"}
+_auth_lock = threading.Lock()
+_session_user = None   # login() ile giriş yapan kullanıcı
+_verified = {}         # (kullanıcı adı, HMAC(PIN)) → user_id, PBKDF2 istek başına tekrarlanmasın
+_verified_key = os.urandom(32)  # süreç başına: önbellekteki anahtardan PIN denenemesin
+_acting = threading.local()
+
+
+def _auth_version(conn):
+    return conn.execute("SELECT version FROM auth_version WHERE id = 1").fetchone()[0]
+
+
+def _load_auth():
+    global _auth
+
+    conn = get_connection()
+    # Sürüm önce okunur: arada değişiklik olursa sonraki kontrol yine yeniler
+    version = _auth_version(conn)
+    users = {}
+    for user_id, permission in conn.execute(
+        """
+        SELECT u.id, rp.permission
+        FROM users u
+        LEFT JOIN role_permissions rp ON rp.role_id = u.role_id
+        WHERE u.active
+        """
+    ):
+        perms = users.setdefault(user_id, set())
+        if permission:
+            perms.add(permission)
+
+    locked = conn.execute(
+        "SELECT EXISTS (SELECT 1 FROM users WHERE active AND pin_hash IS NOT NULL)"
+    ).fetchone()[0]
+
+    auth = {
+        "users": {user_id: frozenset(perms) for user_id, perms in users.items()},
+        "open": not locked,
+        "version": version,
+        "checked": time.monotonic(),
+    }
+    with _auth_lock:
+        _auth = auth
+        _verified.clear()  # PIN'ler de değişmiş olabilir
+    return auth
+
+
+def _current_auth(fresh=False):
+    # Kontroller bellekten; sürüm en fazla AUTH_RECHECK_SECONDS'ta bir okunur
+    auth = _auth
+    if auth is None:
+        return _load_auth()
+    now = time.monotonic()
+    if fresh or now - auth["checked"] >= AUTH_RECHECK_SECONDS:
+        if auth["version"] != _auth_version(get_connection()):
+            return _load_auth()
+        auth["checked"] = now
+    return auth
+
+
+def _invalidate_auth():
+    global _auth
+
+    with _auth_lock:
+        _auth = None
+        _verified.clear()
+
+
+def login_required():
+    return not _current_auth()["open"]
+
+
+def current_user_id():
+    user_id = getattr(_acting, "user_id", None)
+    if user_id is not None:
+        return user_id
+    if _session_user is not None:
+        return _session_user
+    return None if login_required() else DEFAULT_USER_ID
+
+
+@contextmanager
+def acting_user(user_id):
+    # Bu thread'deki işlemler user_id adına (sunucu isteği, toplu iş)
+    previous = getattr(_acting, "user_id", None)
+    _acting.user_id = user_id
+    try:
+        yield
+    finally:
+        _acting.user_id = previous
+
+
+def has_permission(permission, user_id=None):
+    auth = _current_auth()
+    if user_id is None:
+        user_id = current_user_id()
+    return permission in auth["users"].get(user_id, ())
+
+
+def require(permission):
+    if not has_permission(permission):
+        if current_user_id() is None:
+            raise PermissionDenied("Önce giriş yapın")
+        raise PermissionDenied(f"Yetkiniz yok: {PERMISSIONS[permission]}")
+
+
+def _hash_pin(pin):
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", pin.encode("utf-8"), salt, PIN_ITERATIONS)
+    return f"{salt.hex()}${digest.hex()}"
+
+
+def _check_pin(pin, stored):
+    if not stored:
+        # PIN'siz kullanıcı sadece giriş zorunlu değilken (kimsenin PIN'i yokken) girer
+        return not pin and not login_required()
+    salt, digest = stored.split("$")
+    candidate = hashlib.pbkdf2_hmac("sha256", (pin or "").encode("utf-8"),
+                                    bytes.fromhex(salt), PIN_ITERATIONS)
+    return hmac.compare_digest(candidate.hex(), digest)
+
+
+def authenticate(username, pin):
+    # Dönüş: kullanıcı id'si; hatalıysa ValueError (hangisinin yanlış olduğu söylenmez)
+    username = (username or "").strip()
+    key = (username, hmac.new(_verified_key, (pin or "").encode("utf-8"), "sha256").digest())
+    _current_auth(fresh=True)  # başka süreçte PIN / kullanıcı değiştiyse _verified boşalır
+    user_id = _verified.get(key)
+    if user_id is not None:
+        return user_id
+
+    row = get_connection().execute(
+        "SELECT id, pin_hash FROM users WHERE username = ? AND active",
+        (username,),
+    ).fetchone()
+    if not row or not _check_pin(pin, row["pin_hash"]):
+        raise ValueError("Kullanıcı adı veya PIN hatalı")
+
+    with _auth_lock:
+        _verified[key] = row["id"]
+    return row["id"]
+
+
+def login(username, pin):
+    global _session_user
+
+    _session_user = authenticate(username, pin)
+    return _session_user
+
+
+def logout():
+    global _session_user
+
+    _session_user = None
+
+
+def get_users():
+    return get_connection().execute(
+        """
+        SELECT u.id, u.username, u.role_id, r.name AS role, u.active,
+               u.pin_hash IS NOT NULL AS has_pin
+        FROM users u
+        JOIN roles r ON r.id = u.role_id
+        ORDER BY u.username
+        """
+    ).fetchall()
+
+
+def get_roles():
+    # Dönüş: [{"id", "name", "permissions": set}]
+    conn = get_connection()
+    roles = {
+        row["id"]: {"id": row["id"], "name": row["name"], "permissions": set()}
+        for row in conn.execute("SELECT id, name FROM roles ORDER BY id")
+    }
+    for role_id, permission in conn.execute("SELECT role_id, permission FROM role_permissions"):
+        if role_id in roles:
+            roles[role_id]["permissions"].add(permission)
+    return list(roles.values())
+
+
+def _check_permissions(permissions):
+    unknown = set(permissions) - set(PERMISSIONS)
+    if unknown:
+        raise ValueError(f"Bilinmeyen izin: {', '.join(sorted(unknown))}")
+
+
+def _check_admin_left(cur):
+    # Kendini kilitleme olmasın: kullanıcı yönetebilen aktif biri kalmalı
+    cur.execute(
+        """
+        SELECT 1 FROM users u
+        JOIN role_permissions rp ON rp.role_id = u.role_id
+        WHERE u.active AND rp.permission = 'users.manage'
+        LIMIT 1
+        """
+    )
+    if not cur.fetchone():
+        raise ValueError("En az bir aktif yönetici kalmalı")
+
+    # Biri PIN alınca giriş zorunlu olur; PIN'siz kullanıcı giremez. O zaman
+    # PIN'li bir yönetici yoksa kimse kullanıcıları yönetemezdi.
+    cur.execute(
+        """
+        SELECT EXISTS (SELECT 1 FROM users WHERE active AND pin_hash IS NOT NULL)
+           AND NOT EXISTS (
+               SELECT 1 FROM users u
+               JOIN role_permissions rp ON rp.role_id = u.role_id
+               WHERE u.active AND u.pin_hash IS NOT NULL AND rp.permission = 'users.manage'
+           )
+        """
+    )
+    if cur.fetchone()[0]:
+        raise ValueError("Önce bir yöneticiye PIN verin")
+
+
+def add_user(username, role_id, pin=None):
+    require("users.manage")
+    username = (username or "").strip()
+    if not username:
+        raise ValueError("Kullanıcı adı boş olamaz")
+
+    try:
+        with transaction() as cur:
+            cur.execute("SELECT 1 FROM roles WHERE id = ?", (role_id,))
+            if not cur.fetchone():
+                raise ValueError("Rol bulunamadı")
+            cur.execute(
+                "INSERT INTO users (username, role_id, pin_hash, created_at) VALUES (?, ?, ?, ?)",
+                (username, role_id, _hash_pin(pin) if pin else None, datetime.now().isoformat()),
+            )
+            user_id = cur.lastrowid
+            _check_admin_left(cur)
+    except sqlite3.IntegrityError:
+        raise ValueError("Bu kullanıcı adı zaten var")
+
+    _after_commit(_invalidate_auth)
+    return user_id
+
+
+def _update_user(user_id, column, value):
+    with transaction() as cur:
+        cur.execute(f"UPDATE users SET {column} = ? WHERE id = ?", (value, user_id))
+        if cur.rowcount == 0:
+            raise ValueError("Kullanıcı bulunamadı")
+        _check_admin_left(cur)
+    _after_commit(_invalidate_auth)
+
+
+def set_user_role(user_id, role_id):
+    require("users.manage")
+    if not get_connection().execute("SELECT 1 FROM roles WHERE id = ?", (role_id,)).fetchone():
+        raise ValueError("Rol bulunamadı")
+    _update_user(user_id, "role_id", role_id)
+
+
+def set_user_active(user_id, active):
+    require("users.manage")
+    _update_user(user_id, "active", 1 if active else 0)
+
+
+def set_user_pin(user_id, pin):
+    # Herkes kendi PIN'ini değiştirebilir; başkasınınki için yönetici olmalı
+    if user_id != current_user_id():
+        require("users.manage")
+    _update_user(user_id, "pin_hash", _hash_pin(pin) if pin else None)
+
+
+def add_role(name, permissions=()):
+    require("users.manage")
+    name = (name or "").strip()
+    if not name:
+        raise ValueError("Rol adı boş olamaz")
+    _check_permissions(permissions)
+
+    try:
+        with transaction() as cur:
+            cur.execute("INSERT INTO roles (name) VALUES (?)", (name,))
+            role_id = cur.lastrowid
+            cur.executemany(
+                "INSERT INTO role_permissions (role_id, permission) VALUES (?, ?)",
+                ((role_id, p) for p in set(permissions)),
+            )
+    except sqlite3.IntegrityError:
+        raise ValueError("Bu rol zaten var")
+
+    _after_commit(_invalidate_auth)
+    return role_id
+
+
+def set_role_permissions(role_id, permissions):
+    require("users.manage")
+    _check_permissions(permissions)
+
+    with transaction() as cur:
+        cur.execute("SELECT 1 FROM roles WHERE id = ?", (role_id,))
+        if not cur.fetchone():
+            raise ValueError("Rol bulunamadı")
+        cur.execute("DELETE FROM role_permissions WHERE role_id = ?", (role_id,))
+        cur.executemany(
+            "INSERT INTO role_permissions (role_id, permission) VALUES (?, ?)",
+            ((role_id, p) for p in set(permissions)),
+        )
+        _check_admin_left(cur)
+
+    _after_commit(_invalidate_auth)
+
+
+# -------------------- SCHEMA MIGRATIONS --------------------
+# Şema sürümü PRAGMA user_version içinde tutulur. Her adım kendi
+# transaction'ında çalışır ve sürümü aynı commit ile ilerletir; yarıda
+# kalan adım geri alınır ve bir sonraki açılışta tekrar denenir.
+# ⚠️ Yayınlanmış bir adım değiştirilmez, yeni adım listenin sonuna eklenir.
+
+def _migration_1_base_schema(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            code TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            category TEXT,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            location TEXT,
+            note TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT,
+            expiry_date TEXT
+        );
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stock_movements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            type TEXT NOT NULL,            -- IN / OUT
+            amount INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            description TEXT,
+            FOREIGN KEY(product_id) REFERENCES products(id)
+        );
+        """
+    )
+
+
+def _migration_2_indexes(cur):
+    # 📇 Liste sıralaması ve hareket geçmişi için indeksler.
+    # ORDER BY ifadeleri bu indekslerle birebir aynı olmalı, yoksa
+    # SQLite tabloyu tarayıp geçici B-tree ile sıralar.
+
+    # add_movement eskiden "YYYY-MM-DD HH:MM:SS" yazıyordu; isoformat ile
+    # aynı sırada dizilsin diye "T" ayracına çevir
+    cur.execute(
+        "UPDATE stock_movements SET date = replace(date, ' ', 'T') "
+        "WHERE date LIKE '____-__-__ %'"
+    )
+
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_movements_product_date "
+        "ON stock_movements(product_id, date)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_products_name "
+        "ON products(lower(name))"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_products_created "
+        "ON products(created_at)"
+    )
+
+
+def _migration_3_product_search(cur):
+    # 🔍 Trigram FTS: "%metin%" aramasını indeksten yapar.
+    # rowid = products.id, içerik tr_fold() ile katlanmış halde tutulur.
+    cur.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS products_fts
+        USING fts5(name, code, tokenize = 'trigram')
+        """
+    )
+
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS products_fts_ai
+        AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts (rowid, name, code)
+            VALUES (new.id, tr_fold(new.name), tr_fold(new.code));
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS products_fts_au
+        AFTER UPDATE OF name, code ON products BEGIN
+            UPDATE products_fts
+            SET name = tr_fold(new.name), code = tr_fold(new.code)
+            WHERE rowid = old.id;
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS products_fts_ad
+        AFTER DELETE ON products BEGIN
+            DELETE FROM products_fts WHERE rowid = old.id;
+        END
+        """
+    )
+
+    cur.execute("DELETE FROM products_fts")
+    cur.execute(
+        """
+        INSERT INTO products_fts (rowid, name, code)
+        SELECT id, tr_fold(name), tr_fold(code) FROM products
+        """
+    )
+
+
+def _migration_4_updated_at_index(cur):
+    # 🔁 Liste ekranı sadece değişen ürünleri çekebilsin diye
+    cur.execute(
+        "UPDATE products SET updated_at = replace(updated_at, ' ', 'T') "
+        "WHERE updated_at LIKE '____-__-__ %'"
+    )
+    cur.execute(
+        "UPDATE products SET updated_at = created_at WHERE updated_at IS NULL"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_products_updated "
+        "ON products(updated_at)"
+    )
+
+
+def _migration_5_fts_update_guard(cur):
+    # 📥 Toplu içe aktarma aynı ad/kod ile upsert yapınca FTS'e dokunma
+    cur.execute("DROP TRIGGER IF EXISTS products_fts_au")
+    cur.execute(
+        """
+        CREATE TRIGGER products_fts_au
+        AFTER UPDATE OF name, code ON products
+        WHEN old.name IS NOT new.name OR old.code IS NOT new.code
+        BEGIN
+            UPDATE products_fts
+            SET name = tr_fold(new.name), code = tr_fold(new.code)
+            WHERE rowid = old.id;
+        END
+        """
+    )
+
+
+def _migration_6_movement_date_index(cur):
+    # 📤 Muhasebe dökümü: ürün filtresi olmadan tarih aralığı
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_movements_date "
+        "ON stock_movements(date)"
+    )
+
+
+def _migration_7_movement_rollups(cur):
+    # 📊 Hareket özetleri: raporlar stock_movements'ı taramasın.
+    # Tetikleyiciler her yazma yolunu (tekli, toplu, ileride eklenecekler)
+    # aynı transaction içinde yakalar; özet asla hareketlerden geri kalmaz.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS movement_daily (
+            product_id INTEGER NOT NULL,
+            day TEXT NOT NULL,                -- YYYY-MM-DD
+            in_qty INTEGER NOT NULL DEFAULT 0,
+            out_qty INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (product_id, day)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_movement_daily_day "
+        "ON movement_daily(day)"
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS movement_days (
+            day TEXT PRIMARY KEY,             -- tüm ürünler
+            in_qty INTEGER NOT NULL DEFAULT 0,
+            out_qty INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS movement_totals (
+            product_id INTEGER PRIMARY KEY,
+            in_qty INTEGER NOT NULL DEFAULT 0,
+            out_qty INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+
+    for trigger in _ROLLUP_TRIGGERS:
+        cur.execute(trigger)
+
+    _rebuild_rollups(cur)
+
+
+# sign: +1 hareket eklendi, -1 hareket silindi
+def _rollup_apply_sql(row, sign):
+    return f"""
+            INSERT INTO movement_daily (product_id, day, in_qty, out_qty, count)
+            VALUES (
+                {row}.product_id, substr({row}.date, 1, 10),
+                {sign} * ({row}.type = 'IN') * {row}.amount,
+                {sign} * ({row}.type = 'OUT') * {row}.amount,
+                {sign}
+            )
+            ON CONFLICT (product_id, day) DO UPDATE SET
+                in_qty = in_qty + excluded.in_qty,
+                out_qty = out_qty + excluded.out_qty,
+                count = count + excluded.count;
+            INSERT INTO movement_days (day, in_qty, out_qty, count)
+            VALUES (
+                substr({row}.date, 1, 10),
+                {sign} * ({row}.type = 'IN') * {row}.amount,
+                {sign} * ({row}.type = 'OUT') * {row}.amount,
+                {sign}
+            )
+            ON CONFLICT (day) DO UPDATE SET
+                in_qty = in_qty + excluded.in_qty,
+                out_qty = out_qty + excluded.out_qty,
+                count = count + excluded.count;
+            INSERT INTO movement_totals (product_id, in_qty, out_qty, count)
+            VALUES (
+                {row}.product_id,
+                {sign} * ({row}.type = 'IN') * {row}.amount,
+                {sign} * ({row}.type = 'OUT') * {row}.amount,
+                {sign}
+            )
+            ON CONFLICT (product_id) DO UPDATE SET
+                in_qty = in_qty + excluded.in_qty,
+                out_qty = out_qty + excluded.out_qty,
+                count = count + excluded.count;"""
+
+
+_ROLLUP_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS movement_rollup_ai
+    AFTER INSERT ON stock_movements BEGIN{_rollup_apply_sql("new", 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS movement_rollup_ad
+    AFTER DELETE ON stock_movements BEGIN{_rollup_apply_sql("old", -1)}
+        DELETE FROM movement_daily
+        WHERE product_id = old.product_id AND day = substr(old.date, 1, 10) AND count = 0;
+        DELETE FROM movement_days WHERE day = substr(old.date, 1, 10) AND count = 0;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS movement_rollup_au
+    AFTER UPDATE OF product_id, type, amount, date ON stock_movements BEGIN{_rollup_apply_sql("old", -1)}{_rollup_apply_sql("new", 1)}
+        DELETE FROM movement_daily
+        WHERE product_id = old.product_id AND day = substr(old.date, 1, 10) AND count = 0;
+        DELETE FROM movement_days WHERE day = substr(old.date, 1, 10) AND count = 0;
+    END
+    """,
+]
+
+
+def _migration_8_movement_type_index(cur):
+    # 📜 Detay ekranı geçmişi tür filtresiyle de indeksten sıralı gelsin
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_movements_product_type_date "
+        "ON stock_movements(product_id, type, date)"
+    )
+
+
+def _migration_9_reorder_level(cur):
+    # ⚠️ Kritik stok: seviye NULL ise uyarı yok. Kısmi indeks sadece eşiğin
+    # altındaki ürünleri tutar; "ne sipariş edilmeli" sorusu O(uyarı).
+    columns = {row["name"] for row in cur.execute("PRAGMA table_info(products)")}
+    if "reorder_level" not in columns:
+        cur.execute("ALTER TABLE products ADD COLUMN reorder_level INTEGER")
+
+    cur.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_products_low_stock "
+        f"ON products(quantity - reorder_level, id) WHERE {LOW_STOCK_WHERE}"
+    )
+
+
+def _migration_10_expiry_index(cur):
+    # ⏰ SKT her zaman YYYY-MM-DD: metin sırası = tarih sırası.
+    # quantity indekste: "stokta, süresi geçmiş" sayımı tabloya hiç gitmez
+    cur.execute("UPDATE products SET expiry_date = NULL WHERE trim(expiry_date) = ''")
+    cur.execute(
+        """
+        UPDATE products
+        SET expiry_date = substr(expiry_date, 7, 4) || '-' || substr(expiry_date, 4, 2)
+                          || '-' || substr(expiry_date, 1, 2)
+        WHERE expiry_date GLOB '[0-9][0-9][./][0-9][0-9][./][0-9][0-9][0-9][0-9]'
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_products_expiry "
+        "ON products(expiry_date, quantity) WHERE expiry_date IS NOT NULL"
+    )
+
+
+def _migration_11_stock_lots(cur):
+    # 📦 Lot bazlı stok. products.quantity = açık lotların remaining toplamı.
+    # Kısmi indeksler sadece açık (remaining > 0) lotları tutar: tükenen
+    # lotlar indeksten düşer, sıradaki lotu bulmak O(log n) kalır.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stock_lots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            movement_id INTEGER,              -- açan giriş (açılış/düzeltmede NULL)
+            received_at TEXT NOT NULL,
+            expiry_date TEXT,
+            unit_cost REAL,
+            quantity_in INTEGER NOT NULL,
+            remaining INTEGER NOT NULL,
+            FOREIGN KEY(product_id) REFERENCES products(id)
+        )
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_lots_fifo "
+        "ON stock_lots(product_id, received_at) WHERE remaining > 0"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_lots_fefo "
+        f"ON stock_lots(product_id, {_LOT_EXPIRY_KEY}, received_at) WHERE remaining > 0"
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS lot_consumptions (
+            movement_id INTEGER NOT NULL,
+            lot_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            PRIMARY KEY (movement_id, lot_id)
+        ) WITHOUT ROWID
+        """
+    )
+
+    # Mevcut stok için açılış lotları
+    cur.execute(
+        """
+        INSERT INTO stock_lots (product_id, received_at, expiry_date, quantity_in, remaining)
+        SELECT id, ?, expiry_date, quantity, quantity
+        FROM products
+        WHERE quantity > 0
+        """,
+        (datetime.now().isoformat(),),
+    )
+
+
+def _migration_12_locations(cur):
+    # 🏬 Şubeler. product_stock şube başına miktarı tutar; products.quantity
+    # tüm şubelerin toplamı olarak her harekette aynı commit ile güncellenir.
+    # Mevcut stok, hareketler ve lotlar varsayılan şubeye (Merkez) yazılır.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS locations (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            created_at TEXT NOT NULL
+        )
+        """
+    )
+    cur.execute(
+        "INSERT OR IGNORE INTO locations (id, name, created_at) VALUES (?, ?, ?)",
+        (DEFAULT_LOCATION_ID, DEFAULT_LOCATION_NAME, datetime.now().isoformat()),
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS product_stock (
+            product_id INTEGER NOT NULL,
+            location_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (product_id, location_id)
+        ) WITHOUT ROWID
+        """
+    )
+    # Şube listesi sadece stoğu olan satırları gezer; tükenenler indekste yok
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_product_stock_location "
+        "ON product_stock(location_id, product_id) WHERE quantity != 0"
+    )
+    cur.execute(
+        """
+        INSERT OR IGNORE INTO product_stock (product_id, location_id, quantity)
+        SELECT id, ?, quantity FROM products WHERE quantity != 0
+        """,
+        (DEFAULT_LOCATION_ID,),
+    )
+
+    # Sabit DEFAULT'lu sütun eklemek mevcut satırları yeniden yazmaz
+    for table, columns in (
+        ("stock_movements", (
+            f"location_id INTEGER NOT NULL DEFAULT {DEFAULT_LOCATION_ID}",
+            "transfer_id INTEGER",
+        )),
+        ("stock_lots", (f"location_id INTEGER NOT NULL DEFAULT {DEFAULT_LOCATION_ID}",)),
+    ):
+        existing = {r[1] for r in cur.execute(f"PRAGMA table_info({table})")}
+        for column in columns:
+            if column.split()[0] not in existing:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+    # Lot sırası artık şube içinde
+    cur.execute("DROP INDEX IF EXISTS idx_lots_fifo")
+    cur.execute("DROP INDEX IF EXISTS idx_lots_fefo")
+    cur.execute(
+        "CREATE INDEX idx_lots_fifo "
+        "ON stock_lots(product_id, location_id, received_at) WHERE remaining > 0"
+    )
+    cur.execute(
+        "CREATE INDEX idx_lots_fefo "
+        f"ON stock_lots(product_id, location_id, {_LOT_EXPIRY_KEY}, received_at) WHERE remaining > 0"
+    )
+
+
+def _migration_13_change_log(cur):
+    # 🔄 Çok cihazlı senkronizasyon. Yerel her ürün / hareket değişikliği
+    # change_log'a HLC zaman damgasıyla eklenir (sadece ekleme, güncelleme yok).
+    # Başka cihazda doğmuş satırların küresel kimliği sync_uid'de; yerelde
+    # doğanlarınki "<cihaz>:<id>" (sütun boş kalır, yazma maliyeti yok).
+    for table, columns in (
+        ("products", ("sync_uid TEXT", "sync_version TEXT")),
+        ("stock_movements", ("sync_uid TEXT",)),
+    ):
+        existing = {r[1] for r in cur.execute(f"PRAGMA table_info({table})")}
+        for column in columns:
+            if column.split()[0] not in existing:
+                cur.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_products_sync_uid "
+        "ON products(sync_uid) WHERE sync_uid IS NOT NULL"
+    )
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_movements_sync_uid "
+        "ON stock_movements(sync_uid) WHERE sync_uid IS NOT NULL"
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL,          -- 'product' / 'movement'
+            row_id INTEGER NOT NULL,
+            gid TEXT,                      -- satırın sync_uid'i (yerel doğduysa NULL)
+            hlc TEXT NOT NULL
+        )
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_change_log_row ON change_log(entity, row_id, hlc)"
+    )
+    # Gönderirken girişin açtığı lotlar okunur
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_lots_movement "
+        "ON stock_lots(movement_id) WHERE movement_id IS NOT NULL"
+    )
+    # Aynı kodla iki cihazda ayrı ayrı açılmış ürün: uzak kimlik → yerel ürün
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sync_aliases (
+            gid TEXT PRIMARY KEY,
+            product_id INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+
+    # Miktar hareketlerden türetilebilsin: hareketle açıklanmayan stok
+    # (eski doğrudan düzenlemeler) için şube başına açılış düzeltmesi
+    cur.execute(
+        """
+        INSERT INTO stock_movements (product_id, location_id, type, amount, date, description)
+        SELECT s.product_id, s.location_id,
+               CASE WHEN s.quantity - ifnull(m.net, 0) > 0 THEN 'IN' ELSE 'OUT' END,
+               abs(s.quantity - ifnull(m.net, 0)),
+               ifnull(p.created_at, ?), ?
+        FROM product_stock s
+        JOIN products p ON p.id = s.product_id
+        LEFT JOIN (
+            SELECT product_id, location_id,
+                   SUM(CASE type WHEN 'IN' THEN amount ELSE -amount END) AS net
+            FROM stock_movements
+            GROUP BY product_id, location_id
+        ) m ON m.product_id = s.product_id AND m.location_id = s.location_id
+        WHERE s.quantity != ifnull(m.net, 0)
+        """,
+        (datetime.now().isoformat(), ADJUSTMENT_NOTE),
+    )
+
+    for trigger in _CHANGE_LOG_TRIGGERS:
+        cur.execute(trigger)
+
+    # Mevcut veri ilk senkronizasyonda gönderilsin
+    cur.execute(
+        "INSERT INTO change_log (entity, row_id, hlc) "
+        "SELECT 'product', id, hlc_now() FROM products ORDER BY id"
+    )
+    cur.execute(
+        "INSERT INTO change_log (entity, row_id, hlc) "
+        "SELECT 'movement', id, hlc_now() FROM stock_movements ORDER BY id"
+    )
+
+
+_CHANGE_LOG_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS change_log_product_ai
+    AFTER INSERT ON products WHEN sync_local() BEGIN
+        INSERT INTO change_log (entity, row_id, gid, hlc)
+        VALUES ('product', new.id, new.sync_uid, hlc_now());
+    END
+    """,
+    # quantity yok: miktar hareketlerle gider. expiry_date lotlardan türer.
+    """
+    CREATE TRIGGER IF NOT EXISTS change_log_product_au
+    AFTER UPDATE OF code, name, category, location, note, reorder_level ON products
+    WHEN sync_local() BEGIN
+        INSERT INTO change_log (entity, row_id, gid, hlc)
+        VALUES ('product', new.id, new.sync_uid, hlc_now());
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS change_log_product_ad
+    AFTER DELETE ON products WHEN sync_local() BEGIN
+        INSERT INTO change_log (entity, row_id, gid, hlc)
+        VALUES ('product', old.id, old.sync_uid, hlc_now());
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS change_log_movement_ai
+    AFTER INSERT ON stock_movements WHEN sync_local() BEGIN
+        INSERT INTO change_log (entity, row_id, gid, hlc)
+        VALUES ('movement', new.id, new.sync_uid, hlc_now());
+    END
+    """,
+]
+
+
+def _migration_14_users(cur):
+    # 👤 Kullanıcılar, roller, izinler. Varsayılan yönetici PIN'siz açılır:
+    # kimse PIN koymadıkça uygulama eskisi gibi girişsiz çalışır.
+    # Hareketler user_id ile damgalanır (eski hareketler ve senkronizasyonla
+    # gelenler NULL: başka cihazın kullanıcıları burada yok).
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS roles (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS role_permissions (
+            role_id INTEGER NOT NULL,
+            permission TEXT NOT NULL,
+            PRIMARY KEY (role_id, permission)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL UNIQUE,
+            role_id INTEGER NOT NULL,
+            pin_hash TEXT,
+            active INTEGER NOT NULL DEFAULT 1,
+            created_at TEXT NOT NULL
+        )
+        """
+    )
+
+    for role_id, name, permissions in DEFAULT_ROLES:
+        cur.execute("INSERT OR IGNORE INTO roles (id, name) VALUES (?, ?)", (role_id, name))
+        cur.executemany(
+            "INSERT OR IGNORE INTO role_permissions (role_id, permission) VALUES (?, ?)",
+            ((role_id, p) for p in permissions),
+        )
+    cur.execute(
+        "INSERT OR IGNORE INTO users (id, username, role_id, created_at) VALUES (?, ?, ?, ?)",
+        (DEFAULT_USER_ID, DEFAULT_USERNAME, ADMIN_ROLE_ID, datetime.now().isoformat()),
+    )
+
+    existing = {r[1] for r in cur.execute("PRAGMA table_info(stock_movements)")}
+    if "user_id" not in existing:
+        cur.execute("ALTER TABLE stock_movements ADD COLUMN user_id INTEGER")
+
+
+def _migration_15_auth_version(cur):
+    # Kullanıcı / rol / izin her değiştiğinde artan sayaç. Yetki önbelleği
+    # süreç içidir; aynı DB'yi kullanan başka süreçteki (server.py, ikinci
+    # uygulama) değişikliği önbellek bu tek satırdan anlar.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS auth_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+        """
+    )
+    cur.execute("INSERT OR IGNORE INTO auth_version (id, version) VALUES (1, 0)")
+
+    for table in ("users", "roles", "role_permissions"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cur.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS auth_version_{table}_{event.lower()}
+                AFTER {event} ON {table} BEGIN
+                    UPDATE auth_version SET version = version + 1;
+                END
+                """
+            )
+
+
+MIGRATIONS = [
+    _migration_1_base_schema,
+    _migration_2_indexes,
+    _migration_3_product_search,
+    _migration_4_updated_at_index,
+    _migration_5_fts_update_guard,
+    _migration_6_movement_date_index,
+    _migration_7_movement_rollups,
+    _migration_8_movement_type_index,
+    _migration_9_reorder_level,
+    _migration_10_expiry_index,
+    _migration_11_stock_lots,
+    _migration_12_locations,
+    _migration_13_change_log,
+    _migration_14_users,
+    _migration_15_auth_version,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def _schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate():
+    conn = get_connection()
+
+    # ⚡ Şema güncelse tek PRAGMA okuması ile çık
+    if _schema_version(conn) >= SCHEMA_VERSION:
+        return SCHEMA_VERSION
+
+    for version, step in enumerate(MIGRATIONS, start=1):
+        with transaction(immediate=True) as cur:
+            # başka bir süreç aynı adımı bitirmiş olabilir
+            if _schema_version(conn) >= version:
+                continue
+
+            step(cur)
+            cur.execute(f"PRAGMA user_version = {version}")
+
+    return SCHEMA_VERSION
+
+
+def init_db():
+    return migrate()
+
+
+# -------------------- PRODUCTS --------------------
+
+MAX_QUANTITY = 1_000_000_000  # form ve içe aktarma için üst sınır
+
+def add_product(code, name, category=None, quantity=0, location=None, note=None, expiry_date=None,
+                reorder_level=None):
+    require("product.add")
+    try:
+        with transaction() as cur:
+            cur.execute(
+                """
+                INSERT INTO products (
+                    code,
+                    name,
+                    category,
+                    quantity,
+                    location,
+                    note,
+                    created_at,
+                    updated_at,
+                    expiry_date,
+                    reorder_level
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    code,
+                    name,
+                    category,
+                    quantity,
+                    location,
+                    note,
+                    datetime.now().isoformat(),  # created_at
+                    datetime.now().isoformat(),  # updated_at ✅ KALIYOR
+                    expiry_date,
+                    reorder_level
+                ),
+            )
+            product_id = cur.lastrowid
+
+            if quantity:
+                _reconcile_stock(cur, "p.id = ?", (product_id,), datetime.now().isoformat())
+
+            return product_id
+
+    except sqlite3.IntegrityError:
+        raise ValueError("Bu ürün kodu zaten mevcut.")
+
+# idx_products_name / idx_products_created ile eşleşir (rowid = id indekste var)
+PRODUCT_SORT_KEYS = {
+    "name_asc": ("lower(name)", "ASC"),
+    "name_desc": ("lower(name)", "DESC"),
+    "date_desc": ("created_at", "DESC"),
+    "date_asc": ("created_at", "ASC"),
+}
+
+PRODUCT_ORDER_BY = {
+    sort: f"{expr} {direction}, id {direction}"
+    for sort, (expr, direction) in PRODUCT_SORT_KEYS.items()
+}
+
+PRODUCT_PAGE_SIZE = 50
+
+def get_products(search_text=None):
+    conn = get_connection()
+
+    sort = get_setting("product_sort", "name_asc")
+
+    order_by = PRODUCT_ORDER_BY.get(sort, PRODUCT_ORDER_BY["name_asc"])
+
+    match = _search_filter(search_text) if search_text else None
+
+    if match:
+        where, params = match
+        cur = conn.execute(
+            f"""
+            SELECT * FROM products
+            WHERE id IN (SELECT rowid FROM products_fts WHERE {where})
+            ORDER BY {order_by}
+            """,
+            params,
+        )
+    else:
+        cur = conn.execute(
+            f"""
+            SELECT * FROM products
+            ORDER BY {order_by}
+            """
+        )
+
+    return cur.fetchall()
+
+def get_products_page(after=None, limit=PRODUCT_PAGE_SIZE, sort=None):
+    # 📄 Keyset (seek) sayfalama: OFFSET yok, indeksten bir önceki sayfanın
+    # son satırına atlayıp devam eder. Her sayfa katalog boyutundan bağımsız.
+    # after: önceki sayfanın son satırı için page_cursor() değeri
+    if sort not in PRODUCT_SORT_KEYS:
+        sort = get_setting("product_sort", "name_asc")
+    expr, direction = PRODUCT_SORT_KEYS.get(sort, PRODUCT_SORT_KEYS["name_asc"])
+
+    where = ""
+    params = []
+    if after is not None:
+        # (expr, id) > (?, ?) satır karşılaştırması indeksi kullanmıyor;
+        # ilk koşul aralık araması (SEARCH) sağlar
+        op = ">" if direction == "ASC" else "<"
+        where = f"WHERE {expr} {op}= ? AND ({expr} {op} ? OR id {op} ?)"
+        params = [after[0], after[0], after[1]]
+
+    return get_connection().execute(
+        f"""
+        SELECT *, {expr} AS sort_key
+        FROM products
+        {where}
+        ORDER BY {expr} {direction}, id {direction}
+        LIMIT ?
+        """,
+        (*params, limit),
+    ).fetchall()
+
+
+def page_cursor(row):
+    return (row["sort_key"], row["id"])
+
+
+def get_products_changed_since(since):
+    # since: son görülen (updated_at, id). İçe aktarma binlerce ürüne aynı
+    # updated_at'i yazar; id de imlece girdiği için onlar tekrar gelmez.
+    # Koşul get_products_page ile aynı biçimde: idx_products_updated'da aralık
+    return get_connection().execute(
+        """
+        SELECT * FROM products
+        WHERE updated_at >= ? AND (updated_at > ? OR id > ?)
+        ORDER BY updated_at, id
+        """,
+        (since[0], since[0], since[1]),
+    ).fetchall()
+
+# -------------------- SEARCH --------------------
+# 3+ karakterli kelimeler trigram indeksinden MATCH ile aranır.
+# 1-2 karakterli kelimeler trigram ile aranamaz; onlar katlanmış FTS
+# içeriğinde LIKE ile süzülür (MATCH varsa sadece eşleşen satırlarda).
+#
+# Sıralama: bm25 tüm eşleşmeleri puanlar ("p00" gibi yaygın trigramlarda
+# 50k satır = ~100 ms). Bunun yerine ilk SEARCH_CANDIDATES eşleşme alınır
+# ve kod/isim başlangıç eşleşmesine göre sıralanır; yazmaya devam ettikçe
+# aday kümesi daralır. FTS adayları rowid sırasıyla gelir; aranan kodla
+# birebir / başlayan ürünler ilk 400'ün dışında kalmasın diye tek kelimelik
+# aramada bunlar UNIQUE code indeksinden aralık taramasıyla ayrıca eklenir.
+
+SEARCH_LIMIT = 100
+SEARCH_CANDIDATES = 400
+
+
+def _like_escape(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search_filter(search_text):
+    terms = fold_text(search_text).split()
+    if not terms:
+        return None
+
+    long_terms = [t for t in terms if len(t) >= 3]
+    short_terms = [t for t in terms if len(t) < 3]
+
+    clauses = []
+    params = []
+
+    if long_terms:
+        clauses.append("products_fts MATCH ?")
+        params.append(" ".join('"' + t.replace('"', '""') + '"' for t in long_terms))
+
+    for t in short_terms:
+        pattern = f"%{_like_escape(t)}%"
+        clauses.append(
+            "(products_fts.name LIKE ? ESCAPE '\\' "
+            "OR products_fts.code LIKE ? ESCAPE '\\')"
+        )
+        params.extend([pattern, pattern])
+
+    return " AND ".join(clauses), params
+
+
+def search_products(search_text, limit=SEARCH_LIMIT):
+    match = _search_filter(search_text)
+    if not match:
+        return []
+
+    where, params = match
+    query = fold_text(search_text).strip()
+    prefix = f"{_like_escape(query)}%"
+
+    # Kod büyük/küçük harf duyarlı saklanır: yazıldığı gibi ve büyük harfle
+    text = search_text.strip()
+    code_ranges = []
+    if len(text.split()) == 1:
+        for variant in dict.fromkeys((text, text.upper())):
+            code_ranges += [variant, variant[:-1] + chr(ord(variant[-1]) + 1), limit]
+    by_code = """
+            UNION
+            SELECT * FROM (
+                SELECT id FROM products WHERE code >= ? AND code < ? ORDER BY code LIMIT ?
+            )""" * (len(code_ranges) // 3)
+
+    return get_connection().execute(
+        f"""
+        SELECT p.*
+        FROM (
+            SELECT * FROM (
+                SELECT rowid AS id FROM products_fts WHERE {where} LIMIT ?
+            ){by_code}
+        ) AS c
+        JOIN products p ON p.id = c.id
+        JOIN products_fts f ON f.rowid = c.id
+        ORDER BY
+            f.code = ? DESC,
+            f.code LIKE ? ESCAPE '\\' DESC,
+            f.name LIKE ? ESCAPE '\\' DESC,
+            lower(p.name),
+            p.id
+        LIMIT ?
+        """,
+        (*params, max(limit, SEARCH_CANDIDATES), *code_ranges, query, prefix, prefix, limit),
+    ).fetchall()
+
+
+def get_product(product_id):
+    return get_connection().execute(
+        "SELECT * FROM products WHERE id=?",
+        (product_id,)
+    ).fetchone()
+
+
+# -------------------- BARKOD --------------------
+# Okutulan kod birebir aranır (UNIQUE code indeksi), LIKE / FTS yok.
+# Sık okutulan kodlar için kod → id LRU önbelleği: satırın kendisi
+# saklanmaz (stok her harekette değişir), id ile PK'dan okunur. PK okuması
+# kodu da doğrular; başka yoldan (senkronizasyon, içe aktarma) değişmiş
+# bir kod bayat sonuç vermez, sadece önbellekten düşer.
+
+CODE_CACHE_SIZE = 4096
+
+_code_cache = OrderedDict()  # code -> product_id
+_code_cache_lock = threading.Lock()
+
+
+def get_product_by_code(code):
+    code = (code or "").strip()
+    if not code:
+        return None
+
     conn = get_connection()
-    cur = conn.cursor()
+    with _code_cache_lock:
+        product_id = _code_cache.get(code)
+        if product_id is not None:
+            _code_cache.move_to_end(code)
+
+    if product_id is not None:
+        row = conn.execute(
+            "SELECT * FROM products WHERE id=? AND code=?",
+            (product_id, code)
+        ).fetchone()
+        if row:
+            return row
+
+    row = conn.execute("SELECT * FROM products WHERE code=?", (code,)).fetchone()
+
+    with _code_cache_lock:
+        if row:
+            _code_cache[code] = row["id"]
+            _code_cache.move_to_end(code)
+            if len(_code_cache) > CODE_CACHE_SIZE:
+                _code_cache.popitem(last=False)
+        else:
+            _code_cache.pop(code, None)
+    return row
+
+
+def _forget_product_codes(product_id):
+    # update_product / delete_product: ürünün önbellekteki kodlarını at
+    with _code_cache_lock:
+        for code in [c for c, pid in _code_cache.items() if pid == product_id]:
+            del _code_cache[code]
+
+
+def delete_product(product_id):
+    require("product.delete")
+    with transaction(immediate=True) as cur:
+        cur.execute(
+            "SELECT quantity FROM products WHERE id=?",
+            (product_id,)
+        )
+        row = cur.fetchone()
+
+        if not row:
+            raise ValueError("Ürün bulunamadı")
+
+        if row["quantity"] > 0:
+            raise ValueError("Stokta ürün varken silinemez")
+
+        cur.execute(
+            "DELETE FROM products WHERE id=?",
+            (product_id,)
+        )
+
+        if cur.rowcount == 0:
+            raise ValueError("Ürün silinemedi (DB engelledi)")
+
+        # Şube satırları (hepsi 0) ürünle gider
+        cur.execute("DELETE FROM product_stock WHERE product_id=?", (product_id,))
+
+    _after_commit(_forget_product_codes, product_id)
+
+# update_product'te verilmeyen alanlar (eski 6 argümanlı çağrılar) değişmez
+_KEEP = object()
+
+
+def update_product(product_id, code, name, category, quantity, note, reorder_level=_KEEP,
+                   expiry_date=_KEEP):
+    require("product.edit")
+    columns = {
+        "code": code,
+        "name": name,
+        "category": category,
+        "quantity": quantity,
+        "note": note,
+        "reorder_level": reorder_level,
+        "expiry_date": expiry_date,
+    }
+    columns = {k: v for k, v in columns.items() if v is not _KEEP}
+    columns["updated_at"] = datetime.now().isoformat()
+    with transaction() as cur:
+        cur.execute(
+            f"UPDATE products SET {', '.join(f'{k} = ?' for k in columns)} WHERE id = ?",
+            (*columns.values(), product_id),
+        )
+        _reconcile_stock(cur, "p.id = ?", (product_id,), datetime.now().isoformat())
+
+    _after_commit(_forget_product_codes, product_id)
+
+def upsert_products(rows):
+    # 📥 İçe aktarma: kod varsa günceller, yoksa ekler (tek transaction).
+    # rows: (code, name, category, quantity, location, note, expiry_date)
+    # Dönüş: (yazılan satır sayısı, [(rows indeksi, hata), ...]). Stok
+    # eşitlemesinde reddedilen satır (izin yok, diğer şubelerdeki stoktan az)
+    # yazılmaz, diğerleri yazılır
+    require("product.add")
+    require("product.edit")
+    now = datetime.now().isoformat()
+
+    try:
+        with transaction(immediate=True) as cur:
+            for i in range(0, len(rows), BATCH_CHUNK):
+                _upsert_chunk(cur, rows[i:i + BATCH_CHUNK], now)
+        return len(rows), []
+    except ValueError:
+        pass  # hepsi geri alındı; SAVEPOINT'li yavaş yoldan tekrar
+
+    errors = []
+    with transaction(immediate=True):
+        for i in range(0, len(rows), BATCH_CHUNK):
+            chunk = rows[i:i + BATCH_CHUNK]
+            try:
+                with transaction() as cur:  # SAVEPOINT: hata sadece bu parçayı geri alır
+                    _upsert_chunk(cur, chunk, now)
+            except ValueError:
+                # Parçada reddedilen satır var: satır satır tekrar
+                for j, row in enumerate(chunk):
+                    try:
+                        with transaction() as cur:
+                            _upsert_chunk(cur, [row], now)
+                    except ValueError as e:
+                        errors.append((i + j, str(e)))
+
+    return len(rows) - len(errors), errors
+
+
+def _upsert_chunk(cur, rows, now):
+    cur.executemany(
+        """
+        INSERT INTO products (
+            code, name, category, quantity, location, note, expiry_date,
+            created_at, updated_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(code) DO UPDATE SET
+            name = excluded.name,
+            category = excluded.category,
+            quantity = excluded.quantity,
+            location = excluded.location,
+            note = excluded.note,
+            expiry_date = excluded.expiry_date,
+            updated_at = excluded.updated_at
+        """,
+        ((*row, now, now) for row in rows),
+    )
+    codes = [row[0] for row in rows]
+    _reconcile_stock(cur, f"p.code IN ({','.join('?' * len(codes))})", codes, now)
+
+
+# -------------------- EXPIRY --------------------
+# expiry_date "YYYY-MM-DD" metni; idx_products_expiry kısmi indeksi sadece
+# SKT'si olan ürünleri tutar. "N gün içinde bitenler" bir aralık aramasıdır.
+
+EXPIRY_WARNING_DAYS = 30
+
+
+def get_expiring_products(days=EXPIRY_WARNING_DAYS, limit=100, today=None, in_stock=True):
+    # SKT'si geçmiş veya days gün içinde dolacak ürünler, en yakın SKT başta.
+    # days_left < 0 → süresi geçmiş
+    today = today or date.today()
+    until = (today + timedelta(days=days)).isoformat()
+
+    return get_connection().execute(
+        f"""
+        SELECT id, code, name, quantity, expiry_date,
+               CAST(julianday(expiry_date) - julianday(?) AS INTEGER) AS days_left
+        FROM products
+        WHERE expiry_date IS NOT NULL AND expiry_date <= ?
+        {"AND quantity > 0" if in_stock else ""}
+        ORDER BY expiry_date, quantity, id
+        LIMIT ?
+        """,
+        (today.isoformat(), until, limit),
+    ).fetchall()
+
+
+def count_expired(today=None):
+    # Stokta olup SKT'si geçmiş ürün sayısı (açılış kontrolü)
+    today = today or date.today()
+    return get_connection().execute(
+        """
+        SELECT COUNT(*) FROM products
+        WHERE expiry_date IS NOT NULL AND expiry_date < ? AND quantity > 0
+        """,
+        (today.isoformat(),),
+    ).fetchone()[0]
+
+
+# -------------------- STOCK ALERTS --------------------
+# Eşik geçişleri hareket anında yakalanır (polling yok): _stock_move ve
+# apply_movements commit'ten sonra aboneleri çağırır.
+#   callback(product_id, quantity, reorder_level, low)
+#   low=True → eşiğin altına indi, low=False → tekrar üstüne çıktı
+# ⚠️ callback hareketi yazan thread'de çalışır
+
+LOW_STOCK_WHERE = "reorder_level IS NOT NULL AND quantity <= reorder_level"
+
+_stock_alert_listeners = []
+
+
+def subscribe_stock_alerts(callback):
+    _stock_alert_listeners.append(callback)
+
+
+def unsubscribe_stock_alerts(callback):
+    if callback in _stock_alert_listeners:
+        _stock_alert_listeners.remove(callback)
+
+
+def _crossing(before, after, level):
+    if level is None:
+        return None
+    was_low, is_low = before <= level, after <= level
+    return is_low if was_low != is_low else None
+
+
+def _notify_stock_alerts(crossings):
+    for product_id, quantity, level, low in crossings:
+        for callback in list(_stock_alert_listeners):
+            callback(product_id, quantity, level, low)
+
+
+def get_low_stock_products(limit=100):
+    # En acil (eşiğin en altındaki) başta; idx_products_low_stock'tan okunur
+    return get_connection().execute(
+        f"""
+        SELECT id, code, name, quantity, reorder_level
+        FROM products
+        WHERE {LOW_STOCK_WHERE}
+        ORDER BY quantity - reorder_level, id
+        LIMIT ?
+        """,
+        (limit,),
+    ).fetchall()
+
+
+def count_low_stock():
+    return get_connection().execute(
+        f"SELECT COUNT(*) FROM products WHERE {LOW_STOCK_WHERE}"
+    ).fetchone()[0]
+
+
+def set_reorder_level(product_id, level):
+    require("product.edit")
+    if level is not None and (level < 0 or level > MAX_QUANTITY):
+        raise ValueError("Geçersiz kritik stok seviyesi")
+
+    with transaction() as cur:
+        cur.execute(
+            "UPDATE products SET reorder_level = ?, updated_at = ? WHERE id = ?",
+            (level, datetime.now().isoformat(), product_id),
+        )
+        if cur.rowcount == 0:
+            raise ValueError("Ürün bulunamadı")
+
+
+# -------------------- LOCATIONS --------------------
+# Şube başına miktar product_stock'ta, tüm şubelerin toplamı products.quantity'de.
+# Her hareket ikisini aynı transaction'da aynı miktarla günceller: "X'ten
+# toplam ne kadar var" tek satır okumasıdır, şubeler üzerinde GROUP BY yok.
+# Şube verilmeyen hareketler bu cihazın şubesine (current_location) yazılır.
+
+DEFAULT_LOCATION_ID = 1
+DEFAULT_LOCATION_NAME = "Merkez"
+CURRENT_LOCATION_KEY = "current_location"
+ADJUSTMENT_NOTE = "Stok düzeltme"
+
+
+def current_location():
+    return int(get_setting(CURRENT_LOCATION_KEY, DEFAULT_LOCATION_ID))
+
+
+def add_location(name):
+    require("locations.manage")
+    name = (name or "").strip()
+    if not name:
+        raise ValueError("Şube adı boş olamaz")
+
+    try:
+        with transaction() as cur:
+            cur.execute(
+                "INSERT INTO locations (name, created_at) VALUES (?, ?)",
+                (name, datetime.now().isoformat()),
+            )
+            return cur.lastrowid
+    except sqlite3.IntegrityError:
+        raise ValueError("Bu şube zaten mevcut.")
+
+
+def rename_location(location_id, name):
+    require("locations.manage")
+    name = (name or "").strip()
+    if not name:
+        raise ValueError("Şube adı boş olamaz")
+
+    try:
+        with transaction() as cur:
+            cur.execute("UPDATE locations SET name = ? WHERE id = ?", (name, location_id))
+            if cur.rowcount == 0:
+                raise ValueError("Şube bulunamadı")
+    except sqlite3.IntegrityError:
+        raise ValueError("Bu şube zaten mevcut.")
+
+
+def get_locations():
+    return get_connection().execute(
+        "SELECT id, name, created_at FROM locations ORDER BY id"
+    ).fetchall()
+
+
+def _check_location(cur, location_id):
+    cur.execute("SELECT 1 FROM locations WHERE id = ?", (location_id,))
+    if not cur.fetchone():
+        raise ValueError("location not found")
+
+
+def get_product_stock(product_id):
+    # Ürünün şube şube miktarı (hiç hareket görmemiş şubeler listede yok)
+    return get_connection().execute(
+        """
+        SELECT s.location_id, l.name, s.quantity
+        FROM product_stock s
+        JOIN locations l ON l.id = s.location_id
+        WHERE s.product_id = ?
+        ORDER BY s.location_id
+        """,
+        (product_id,),
+    ).fetchall()
+
+
+def get_location_stock(location_id, limit=PRODUCT_PAGE_SIZE, after_id=0):
+    # Şubedeki ürünler, id sırasıyla sayfa sayfa (idx_product_stock_location)
+    return get_connection().execute(
+        """
+        SELECT p.id, p.code, p.name, s.quantity, p.quantity AS total
+        FROM product_stock s
+        JOIN products p ON p.id = s.product_id
+        WHERE s.location_id = ? AND s.product_id > ? AND s.quantity != 0
+        ORDER BY s.product_id
+        LIMIT ?
+        """,
+        (location_id, after_id, limit),
+    ).fetchall()
+
+
+def _reconcile_stock(cur, where, params, now):
+    # products.quantity'yi doğrudan yazan yollar için (ürün ekleme/düzenleme,
+    # içe aktarma). where (p = products) ile seçilen ürünlerde:
+    # 1) şube toplamı ≠ quantity ise fark varsayılan şubeye bir düzeltme
+    #    hareketi olarak yazılır (miktar her zaman hareketlerden türetilebilir)
+    # 2) her şubede lot toplamı o şubenin miktarına eşitlenir
+    diffs = f"""
+        SELECT p.id, p.quantity - (
+            SELECT ifnull(SUM(s.quantity), 0) FROM product_stock s
+            WHERE s.product_id = p.id
+        ) AS diff
+        FROM products p
+        WHERE {where}
+    """
+    # Miktarı elle değiştirmek bir stok hareketidir: ürün izninin yanında
+    # giriş / çıkış izni de gerekir (hata transaction'ı / savepoint'i geri alır)
+    for (increase,) in cur.execute(
+        f"SELECT DISTINCT diff > 0 FROM ({diffs}) WHERE diff != 0", params
+    ).fetchall():
+        require("stock.in" if increase else "stock.out")
+
+    cur.execute(
+        f"""
+        INSERT INTO stock_movements (product_id, location_id, type, amount, date, description,
+                                     user_id)
+        SELECT id, ?, CASE WHEN diff > 0 THEN 'IN' ELSE 'OUT' END, abs(diff), ?, ?, ?
+        FROM ({diffs})
+        WHERE diff != 0
+        """,
+        (DEFAULT_LOCATION_ID, now, ADJUSTMENT_NOTE, current_user_id(), *params),
+    )
+    cur.execute(
+        f"""
+        INSERT INTO product_stock (product_id, location_id, quantity)
+        SELECT id, ?, diff FROM ({diffs})
+        WHERE diff != 0
+        ON CONFLICT (product_id, location_id) DO UPDATE SET
+            quantity = quantity + excluded.quantity
+        """,
+        (DEFAULT_LOCATION_ID, *params),
+    )
+    cur.execute(
+        f"""
+        SELECT 1 FROM products p
+        JOIN product_stock s ON s.product_id = p.id AND s.location_id = ?
+        WHERE {where} AND s.quantity < 0
+        LIMIT 1
+        """,
+        (DEFAULT_LOCATION_ID, *params),
+    )
+    if cur.fetchone():
+        raise ValueError("Miktar diğer şubelerdeki stoktan az olamaz")
+
+    _reconcile_lots(cur, where, params, now)
+
+
+# -------------------- STOCK LOTS --------------------
+# Her giriş bir lot açar; çıkış o şubedeki açık lotları FIFO (ilk giren) veya
+# FEFO (son kullanma tarihi en yakın, SKT'siz lotlar en sona) sırasıyla tüketir.
+# Hangi çıkışın hangi lottan ne kadar aldığı lot_consumptions'ta: maliyet
+# (unit_cost) buradan hesaplanır. Şube miktarını doğrudan değiştiren yollar
+# lotları _reconcile_lots ile eşitler. Eksiye düşmüş şube stoğunun
+# (senkronizasyonda iki cihazın aynı malı satması) lotu yoktur: lot toplamı
+# = max(şube miktarı, 0).
+
+LOT_POLICY_KEY = "lot_policy"
+DEFAULT_LOT_POLICY = "FEFO"
+LOT_FETCH = 4  # tüketirken tek sorguda okunan lot sayısı (çoğu çıkış 1-2 lot)
+
+_LOT_EXPIRY_KEY = "ifnull(expiry_date, '9999-12-31')"
+
+# idx_lots_fifo / idx_lots_fefo ile birebir aynı (rowid = id indekste var)
+LOT_ORDER_BY = {
+    "FIFO": "received_at, id",
+    "FEFO": f"{_LOT_EXPIRY_KEY}, received_at, id",
+}
+
+
+def _lot_order(policy=None):
+    policy = policy or get_setting(LOT_POLICY_KEY, DEFAULT_LOT_POLICY)
+    if policy not in LOT_ORDER_BY:
+        raise ValueError("invalid lot policy")
+    return LOT_ORDER_BY[policy]
+
+
+def _add_lot(cur, product_id, location_id, amount, received_at, expiry_date=None,
+             unit_cost=None, movement_id=None):
+    cur.execute(
+        """
+        INSERT INTO stock_lots (
+            product_id, location_id, movement_id, received_at, expiry_date, unit_cost,
+            quantity_in, remaining
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (product_id, location_id, movement_id, received_at, expiry_date, unit_cost,
+         amount, amount),
+    )
+    if expiry_date:
+        # Yeni lot en yakın SKT'yi sadece öne çekebilir
+        cur.execute(
+            """
+            UPDATE products SET expiry_date = ?
+            WHERE id = ? AND (expiry_date IS NULL OR expiry_date > ?)
+            """,
+            (expiry_date, product_id, expiry_date),
+        )
+
+
+def _consume_lots(cur, product_id, location_id, amount, order, movement_id=None):
+    # Açık lotlardan sırayla amount kadar düşer. Tüketilen lot kısmi
+    # indeksten çıkar; sonraki sorgu doğrudan sıradaki lota iner.
+    # Dönüş: [(lot_id, miktar), ...]
+    taken = []
+    touched_expiry = False
+    need = amount
 
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS settings (
-            key TEXT PRIMARY KEY,
-            value TEXT
+    while need > 0:
+        lots = cur.execute(
+            f"""
+            SELECT id, remaining, expiry_date
+            FROM stock_lots
+            WHERE product_id = ? AND location_id = ? AND remaining > 0
+            ORDER BY {order}
+            LIMIT ?
+            """,
+            (product_id, location_id, LOT_FETCH),
+        ).fetchall()
+
+        batch = []
+        for lot in lots:
+            qty = min(need, lot["remaining"])
+            batch.append((lot["id"], qty))
+            touched_expiry = touched_expiry or lot["expiry_date"] is not None
+            need -= qty
+            if need == 0:
+                break
+
+        cur.executemany(
+            "UPDATE stock_lots SET remaining = remaining - ? WHERE id = ?",
+            ((qty, lot_id) for lot_id, qty in batch),
         )
-    """)
+        taken.extend(batch)
+
+        if len(lots) < LOT_FETCH:
+            break  # lotlar bitti (eşitlenmemiş eski stok): kalan lotsuz çıkar
 
-    conn.commit()
-    conn.close()
+    if movement_id is not None and taken:
+        cur.executemany(
+            "INSERT INTO lot_consumptions (movement_id, lot_id, quantity) VALUES (?, ?, ?)",
+            ((movement_id, lot_id, qty) for lot_id, qty in taken),
+        )
+    if touched_expiry:
+        _refresh_product_expiry(cur, product_id)
 
+    return taken
 
-def set_setting(key, value):
-    conn = get_connection()
-    cur = conn.cursor()
 
+def _refresh_product_expiry(cur, product_id):
+    # Ürünün SKT'si = açık lotlar içindeki en yakın SKT. Her şubede
+    # idx_lots_fefo'nun ilk satırı; ürünün tüm lotları taranmaz.
     cur.execute(
-        "REPLACE INTO settings (key, value) VALUES (?, ?)",
-        (key, value)
+        f"""
+        UPDATE products SET expiry_date = (
+            SELECT min((
+                SELECT expiry_date FROM stock_lots l
+                WHERE l.product_id = s.product_id AND l.location_id = s.location_id
+                  AND l.remaining > 0
+                ORDER BY {LOT_ORDER_BY["FEFO"]}
+                LIMIT 1
+            ))
+            FROM product_stock s
+            WHERE s.product_id = ?
+        )
+        WHERE id = ?
+        """,
+        (product_id, product_id),
     )
 
-    conn.commit()
-    conn.close()
-
-
-def get_setting(key, default=None):
-    conn = get_connection()
-    cur = conn.cursor()
 
+def _reconcile_lots(cur, where, params, now):
+    # where (p = products) ile seçilen ürünlerin her şubesinde lot toplamını
+    # şube miktarına eşitler: eksikse açılış/düzeltme lotu açar, fazlaysa
+    # sıradaki lotlardan düşer.
+    open_total = (
+        "(SELECT ifnull(SUM(remaining), 0) FROM stock_lots l "
+        "WHERE l.product_id = s.product_id AND l.location_id = s.location_id "
+        "AND l.remaining > 0)"
+    )
     cur.execute(
-        "SELECT value FROM settings WHERE key=?",
-        (key,)
+        f"""
+        INSERT INTO stock_lots (
+            product_id, location_id, received_at, expiry_date, quantity_in, remaining
+        )
+        SELECT product_id, location_id, ?, expiry_date, diff, diff FROM (
+            SELECT s.product_id, s.location_id, p.expiry_date,
+                   max(s.quantity, 0) - {open_total} AS diff
+            FROM products p
+            JOIN product_stock s ON s.product_id = p.id
+            WHERE {where}
+        )
+        WHERE diff > 0
+        """,
+        (now, *params),
     )
 
-    row = cur.fetchone()
-    conn.close()
+    surplus = cur.execute(
+        f"""
+        SELECT product_id, location_id, excess FROM (
+            SELECT s.product_id, s.location_id, {open_total} - max(s.quantity, 0) AS excess
+            FROM products p
+            JOIN product_stock s ON s.product_id = p.id
+            WHERE {where}
+        )
+        WHERE excess > 0
+        """,
+        params,
+    ).fetchall()
+    if surplus:
+        order = _lot_order()
+        for row in surplus:
+            _consume_lots(cur, row["product_id"], row["location_id"], row["excess"], order)
+
+
+def get_open_lots(product_id, policy=None, location_id=None):
+    # Tüketilecek sırayla açık lotlar; şube verilmezse şube şube
+    if location_id is None:
+        where, params = "", (product_id,)
+    else:
+        where, params = "AND location_id = ?", (product_id, location_id)
 
-    return row[0] if row else default
+    return get_connection().execute(
+        f"""
+        SELECT id, location_id, movement_id, received_at, expiry_date, unit_cost,
+               quantity_in, remaining
+        FROM stock_lots
+        WHERE product_id = ? {where} AND remaining > 0
+        ORDER BY location_id, {_lot_order(policy)}
+        """,
+        params,
+    ).fetchall()
 
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+def get_movement_lots(movement_id):
+    # Bir çıkışın hangi lotlardan karşılandığı ve maliyeti
+    return get_connection().execute(
+        """
+        SELECT l.id AS lot_id, l.received_at, l.expiry_date, l.unit_cost,
+               c.quantity, c.quantity * l.unit_cost AS cost
+        FROM lot_consumptions c
+        JOIN stock_lots l ON l.id = c.lot_id
+        WHERE c.movement_id = ?
+        ORDER BY c.lot_id
+        """,
+        (movement_id,),
+    ).fetchall()
 
-    # 🔴 MVP: foreign key engelini kapat
-    conn.execute("PRAGMA foreign_keys = OFF")
 
-    return conn
+def check_lots(limit=20):
+    # Şube miktarı (eksiyse 0) ile o şubedeki açık lot toplamı farklı satırlar.
+    # Boş liste = tutarlı.
+    return [
+        dict(r) for r in get_connection().execute(
+            """
+            SELECT s.product_id, s.location_id, s.quantity, ifnull(l.total, 0) AS lots_total
+            FROM product_stock s
+            LEFT JOIN (
+                SELECT product_id, location_id, SUM(remaining) AS total
+                FROM stock_lots WHERE remaining > 0
+                GROUP BY product_id, location_id
+            ) l ON l.product_id = s.product_id AND l.location_id = s.location_id
+            WHERE max(s.quantity, 0) != ifnull(l.total, 0)
+            LIMIT ?
+            """,
+            (limit,),
+        )
+    ]
+
+
+def check_stock(limit=20):
+    # products.quantity ile şube toplamı farklı ürünler. Boş liste = tutarlı.
+    return [
+        dict(r) for r in get_connection().execute(
+            """
+            SELECT p.id AS product_id, p.quantity, ifnull(s.total, 0) AS locations_total
+            FROM products p
+            LEFT JOIN (
+                SELECT product_id, SUM(quantity) AS total
+                FROM product_stock
+                GROUP BY product_id
+            ) s ON s.product_id = p.id
+            WHERE p.quantity != ifnull(s.total, 0)
+            LIMIT ?
+            """,
+            (limit,),
+        )
+    ]
 
-def init_db():
-    conn = get_connection()
-    cur = conn.cursor()
 
+# -------------------- STOCK MOVEMENTS --------------------
+
+# Kontrol + güncelleme tek koşullu UPDATE ile yapılır: iki cihaz/thread
+# aynı anda çıkış yapsa da stok eksiye düşemez (oku-kontrol et-yaz yarışı yok).
+# BEGIN IMMEDIATE yazma kilidini baştan alır, hareket kaydı aynı commit'te.
+
+MOVEMENT_TYPES = ("IN", "OUT")
+
+
+def stock_in(product_id, amount, description=None, expiry_date=None, unit_cost=None,
+             location_id=None):
+    return _stock_move(product_id, amount, "IN", description, location_id=location_id,
+                       expiry_date=expiry_date, unit_cost=unit_cost)
+
+
+def stock_out(product_id, amount, description=None, policy=None, location_id=None):
+    return _stock_move(product_id, amount, "OUT", description, location_id=location_id,
+                       policy=policy)
+
+
+def _take_from_location(cur, product_id, location_id, amount):
+    # Şubeden koşullu düşüş; dönüş şubede kalan miktar
     cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            code TEXT UNIQUE NOT NULL,
-            name TEXT NOT NULL,
-            category TEXT,
-            quantity INTEGER NOT NULL DEFAULT 0,
-            location TEXT,
-            note TEXT,
-            created_at TEXT NOT NULL,
-            updated_at TEXT,
-            expiry_date TEXT
-        );
-        """
+        UPDATE product_stock
+        SET quantity = quantity - ?
+        WHERE product_id = ? AND location_id = ? AND quantity >= ?
+        RETURNING quantity
+        """,
+        (amount, product_id, location_id, amount),
     )
+    row = cur.fetchone()
+    if not row:
+        # ya ürün / şube yok ya da şubede stok yetersiz
+        cur.execute("SELECT 1 FROM products WHERE id=?", (product_id,))
+        if not cur.fetchone():
+            raise ValueError("product not found")
+        _check_location(cur, location_id)
+        raise ValueError("insufficient stock")
+    return row["quantity"]
 
+
+def _put_to_location(cur, product_id, location_id, amount):
     cur.execute(
         """
-        CREATE TABLE IF NOT EXISTS stock_movements (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            product_id INTEGER NOT NULL,
-            type TEXT NOT NULL,            -- IN / OUT
-            amount INTEGER NOT NULL,
-            date TEXT NOT NULL,
-            description TEXT,
-            FOREIGN KEY(product_id) REFERENCES products(id)
-        );
-        """
+        INSERT INTO product_stock (product_id, location_id, quantity)
+        VALUES (?, ?, ?)
+        ON CONFLICT (product_id, location_id) DO UPDATE SET
+            quantity = quantity + excluded.quantity
+        RETURNING quantity
+        """,
+        (product_id, location_id, amount),
     )
+    return cur.fetchone()["quantity"]
 
-    conn.commit()
-    conn.close()
 
+def _stock_move(product_id, amount, move_type, description=None, location_id=None,
+                expiry_date=None, unit_cost=None, policy=None):
+    if move_type not in MOVEMENT_TYPES:
+        raise ValueError("invalid movement type")
 
-# -------------------- PRODUCTS --------------------
+    if amount <= 0:
+        raise ValueError("amount must be > 0")
 
-def add_product(code, name, category=None, quantity=0, location=None, note=None, expiry_date=None):
-    conn = get_connection()
-    try:
-        cur = conn.cursor()
+    require("stock.in" if move_type == "IN" else "stock.out")
+    user_id = current_user_id()
+    location_id = location_id or current_location()
+    order = _lot_order(policy) if move_type == "OUT" else None
+    now = datetime.now().isoformat()
+
+    with transaction(immediate=True) as cur:
+        if move_type == "IN":
+            cur.execute(
+                """
+                UPDATE products
+                SET quantity = quantity + ?, updated_at = ?
+                WHERE id = ?
+                RETURNING quantity, reorder_level
+                """,
+                (amount, now, product_id),
+            )
+            row = cur.fetchone()
+            if not row:
+                raise ValueError("product not found")
+            _check_location(cur, location_id)
+            here = _put_to_location(cur, product_id, location_id, amount)
+        else:
+            # Şube yeterliyse toplam da yeterli: products'ta koşul gerekmez
+            _take_from_location(cur, product_id, location_id, amount)
+            cur.execute(
+                """
+                UPDATE products
+                SET quantity = quantity - ?, updated_at = ?
+                WHERE id = ?
+                RETURNING quantity, reorder_level
+                """,
+                (amount, now, product_id),
+            )
+            row = cur.fetchone()
 
         cur.execute(
             """
-            INSERT INTO products (
-                code,
-                name,
-                category,
-                quantity,
-                location,
-                note,
-                created_at,
-                updated_at,
-                expiry_date
+            INSERT INTO stock_movements (
+                product_id, location_id, type, amount, date, description, user_id
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             """,
-            (
-                code,
-                name,
-                category,
-                quantity,
-                location,
-                note,
-                datetime.now().isoformat(),  # created_at
-                datetime.now().isoformat(),  # updated_at ✅ KALIYOR
-                expiry_date
-            ),
-        )
-
-        product_id = cur.lastrowid
-        conn.commit()
-        return product_id
-
-    except sqlite3.IntegrityError:
-        raise ValueError("Bu ürün kodu zaten mevcut.")
-
-    finally:
-        conn.close()
-
-def get_products(search_text=None):
-    conn = get_connection()
-    cur = conn.cursor()
+            (product_id, location_id, move_type, amount, now, description, user_id),
+        )
+        movement_id = cur.lastrowid
+
+        if move_type == "IN":
+            if here > 0:
+                # şube eksideyse giriş önce açığı kapatır
+                _add_lot(cur, product_id, location_id, min(amount, here), now,
+                         expiry_date, unit_cost, movement_id)
+        else:
+            _consume_lots(cur, product_id, location_id, amount, order, movement_id)
+
+    quantity, level = row["quantity"], row["reorder_level"]
+    before = quantity - amount if move_type == "IN" else quantity + amount
+    low = _crossing(before, quantity, level)
+    if low is not None:
+        _after_commit(_notify_stock_alerts, [(product_id, quantity, level, low)])
+
+    return quantity
+
+
+def transfer_stock(product_id, amount, from_location_id, to_location_id, description=None,
+                   policy=None):
+    # 🔁 Şubeler arası transfer: kaynakta OUT, hedefte IN, aynı commit.
+    # İki hareket transfer_id (= OUT hareketinin id'si) ile eşlenir. Toplam
+    # (products.quantity) değişmez; taşınan lotlar hedefte aynı giriş
+    # tarihi / SKT / maliyetle yeniden açılır, FIFO/FEFO sırası korunur.
+    # Dönüş: (kaynakta kalan, hedefteki yeni miktar)
+    if amount <= 0:
+        raise ValueError("amount must be > 0")
+    if from_location_id == to_location_id:
+        raise ValueError("source and destination are the same")
+
+    require("stock.transfer")
+    user_id = current_user_id()
+    order = _lot_order(policy)
+    now = datetime.now().isoformat()
+
+    with transaction(immediate=True) as cur:
+        _check_location(cur, to_location_id)
+        source_left = _take_from_location(cur, product_id, from_location_id, amount)
+        target = _put_to_location(cur, product_id, to_location_id, amount)
+
+        movement_ids = []
+        for location_id, move_type in ((from_location_id, "OUT"), (to_location_id, "IN")):
+            cur.execute(
+                """
+                INSERT INTO stock_movements (
+                    product_id, location_id, type, amount, date, description, transfer_id,
+                    user_id
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (product_id, location_id, move_type, amount, now, description,
+                 movement_ids[0] if movement_ids else None, user_id),
+            )
+            movement_ids.append(cur.lastrowid)
+        out_id, in_id = movement_ids
+        cur.execute("UPDATE stock_movements SET transfer_id = ? WHERE id = ?", (out_id, out_id))
+
+        # Hedef eksideyse taşınanın bir kısmı açığı kapatır, o kadar lot açılmaz
+        need = min(amount, max(target, 0))
+        moved = 0
+        for lot_id, qty in _consume_lots(cur, product_id, from_location_id, amount, order, out_id):
+            qty = min(qty, need - moved)
+            if qty <= 0:
+                break
+            cur.execute(
+                """
+                INSERT INTO stock_lots (
+                    product_id, location_id, movement_id, received_at, expiry_date,
+                    unit_cost, quantity_in, remaining
+                )
+                SELECT product_id, ?, ?, received_at, expiry_date, unit_cost, ?, ?
+                FROM stock_lots WHERE id = ?
+                """,
+                (to_location_id, in_id, qty, qty, lot_id),
+            )
+            moved += qty
+        if moved < need:
+            _add_lot(cur, product_id, to_location_id, need - moved, now, movement_id=in_id)
+        _refresh_product_expiry(cur, product_id)
 
-    sort = get_setting("product_sort", "name_asc")
+    return source_left, target
 
-    order_by = {
-        "name_asc": "LOWER(name) ASC",
-        "name_desc": "LOWER(name) DESC",
-        "date_desc": "datetime(created_at) DESC",
-        "date_asc": "datetime(created_at) ASC",
-    }.get(sort, "LOWER(name) ASC")
 
-    if search_text:
-        cur.execute(
-            f"""
-            SELECT * FROM products
-            WHERE name LIKE ? OR code LIKE ?
-            ORDER BY {order_by}
+def add_movement(product_id, mtype, amount, description=None):
+    # Eskiden stok kontrolü olmadan ayrı bir yol izliyordu; artık aynı motor
+    return _stock_move(product_id, amount, mtype, description)
+
+# -------------------- BATCH MOVEMENTS --------------------
+# Palet kabul / sevkiyat: yüzlerce hareket tek transaction, tek commit.
+# Yazma kilidi (BEGIN IMMEDIATE) baştan alındığı için stoklar bir kez
+# okunup satırlar sırayla Python'da doğrulanır; sonra hareketler ve yeni
+# stoklar executemany ile yazılır.
+#   atomic=True  → bir satır bile hatalıysa hiçbir şey yazılmaz
+#   atomic=False → hatalı satırlar atlanır, geçerliler yazılır
+
+BATCH_CHUNK = 500  # IN (...) sorgusu başına ürün sayısı
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_movement(movement):
+    # Tek satırı doğrular (sunucudan gelen ham JSON da buradan geçer).
+    # Dönüş: (6'lı tuple, None) veya (None, hata); hatalı satır partiyi bozmaz
+    if not isinstance(movement, (list, tuple)) or not 3 <= len(movement) <= 6:
+        return None, "invalid movement line"
+    line = tuple(movement) + (None,) * (6 - len(movement))
+    product_id, move_type, amount, description, expiry_date, unit_cost = line
+
+    if not _is_int(product_id):
+        return None, "invalid product id"
+    if not isinstance(move_type, str) or move_type not in MOVEMENT_TYPES:
+        return None, "invalid movement type"
+    if not _is_int(amount):
+        return None, "amount must be an integer"
+    if amount <= 0:
+        return None, "amount must be > 0"
+    if amount > MAX_QUANTITY:
+        return None, "amount too large"
+    if not isinstance(description, (str, type(None))):
+        return None, "invalid description"
+    if not isinstance(expiry_date, (str, type(None))):
+        return None, "invalid expiry date"
+    if unit_cost is not None and not (isinstance(unit_cost, (int, float)) and not isinstance(unit_cost, bool)):
+        return None, "invalid unit cost"
+    return line, None
+
+
+def apply_movements(movements, atomic=True, policy=None, location_id=None):
+    # movements: [(product_id, type, amount[, description[, expiry_date[, unit_cost]]]), ...]
+    # Partinin tamamı tek şubeye (location_id, verilmezse bu cihazın şubesi) yazılır.
+    # Dönüş: satır başına {"index", "product_id", "ok", "quantity", "error"}
+    #   quantity: ürünün tüm şubelerdeki toplamı
+    parsed = [parse_movement(m) for m in movements]
+    lines = [line for line, error in parsed if error is None]
+    for move_type in {line[1] for line in lines}:
+        require("stock.in" if move_type == "IN" else "stock.out")
+    user_id = current_user_id()
+    location_id = location_id or current_location()
+    order = _lot_order(policy)
+    now = datetime.now().isoformat()
+    results = []
+
+    with transaction(immediate=True) as cur:
+        _check_location(cur, location_id)
+
+        ids = list({line[0] for line in lines})
+        quantities = {}
+        here = {}   # şubedeki miktar
+        levels = {}
+        for i in range(0, len(ids), BATCH_CHUNK):
+            chunk = ids[i:i + BATCH_CHUNK]
+            cur.execute(
+                f"""
+                SELECT p.id, p.quantity, p.reorder_level, ifnull(s.quantity, 0) AS here
+                FROM products p
+                LEFT JOIN product_stock s ON s.product_id = p.id AND s.location_id = ?
+                WHERE p.id IN ({','.join('?' * len(chunk))})
+                """,
+                (location_id, *chunk),
+            )
+            for row in cur:
+                quantities[row["id"]] = row["quantity"]
+                here[row["id"]] = row["here"]
+                levels[row["id"]] = row["reorder_level"]
+        initial = dict(quantities)
+        lot_here = dict(here)
+
+        accepted = []
+        for index, (line, error) in enumerate(parsed):
+            product_id, move_type, amount, description, expiry_date, unit_cost = line or (None,) * 6
+            if error is not None:
+                pass
+            elif product_id not in quantities:
+                error = "product not found"
+            elif move_type == "OUT" and here[product_id] < amount:
+                error = "insufficient stock"
+
+            if error is None:
+                delta = amount if move_type == "IN" else -amount
+                quantities[product_id] += delta
+                here[product_id] += delta
+                accepted.append((product_id, move_type, amount, now, description, expiry_date, unit_cost))
+
+            results.append({
+                "index": index,
+                "product_id": product_id,
+                "ok": error is None,
+                "quantity": quantities.get(product_id) if error is None else None,
+                "error": error,
+            })
+
+        if atomic and len(accepted) != len(parsed):
+            for result in results:
+                if result["ok"]:
+                    result.update(ok=False, quantity=None, error="batch rejected")
+            return results
+
+        changed = {line[0] for line in accepted}
+        cur.executemany(
+            "UPDATE products SET quantity = ?, updated_at = ? WHERE id = ?",
+            ((quantities[pid], now, pid) for pid in changed),
+        )
+        cur.executemany(
+            """
+            INSERT INTO product_stock (product_id, location_id, quantity)
+            VALUES (?, ?, ?)
+            ON CONFLICT (product_id, location_id) DO UPDATE SET quantity = excluded.quantity
             """,
-            (f"%{search_text}%", f"%{search_text}%"),
+            ((pid, location_id, here[pid]) for pid in changed),
         )
-    else:
-        cur.execute(
-            f"""
-            SELECT * FROM products
-            ORDER BY {order_by}
+        # Yazma kilidi bizde: yeni hareketlerin id'leri last_id'den büyük olanlar
+        last_id = cur.execute("SELECT ifnull(max(id), 0) FROM stock_movements").fetchone()[0]
+        cur.executemany(
             """
+            INSERT INTO stock_movements (
+                product_id, type, amount, date, description, location_id, user_id
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            ((*line[:5], location_id, user_id) for line in accepted),
         )
+        cur.execute("SELECT id FROM stock_movements WHERE id > ? ORDER BY id", (last_id,))
+        movement_ids = [r[0] for r in cur.fetchall()]
+
+        # Lotlar satır sırasıyla: aynı partide önce giren lot sonra çıkılabilir
+        for (product_id, move_type, amount, _, _, expiry_date, unit_cost), movement_id in zip(accepted, movement_ids):
+            if move_type == "IN":
+                lot_here[product_id] += amount
+                if lot_here[product_id] > 0:
+                    _add_lot(cur, product_id, location_id, min(amount, lot_here[product_id]), now,
+                             expiry_date, unit_cost, movement_id)
+            else:
+                lot_here[product_id] -= amount
+                _consume_lots(cur, product_id, location_id, amount, order, movement_id)
+
+    # Satır satır değil, partinin net etkisi: önce / sonra
+    crossings = []
+    for pid in changed:
+        low = _crossing(initial[pid], quantities[pid], levels[pid])
+        if low is not None:
+            crossings.append((pid, quantities[pid], levels[pid], low))
+    _after_commit(_notify_stock_alerts, crossings)
+
+    return results
+
+def get_movements(product_id, order="DESC"):
+    return get_connection().execute(
+        f"""
+        SELECT *
+        FROM stock_movements
+        WHERE product_id=?
+        ORDER BY date {order}, id {order}
+        """,
+        (product_id,),
+    ).fetchall()
+
+MOVEMENT_PAGE_SIZE = 50
+
+
+def day_bounds(start=None, end=None):
+    # Kullanıcının girdiği gün aralığı (ikisi de dahil) -> [start, end) ISO sınırları
+    def parse(value):
+        if value is None or value == "":
+            return None
+        if isinstance(value, date):
+            return value
+        try:
+            return date.fromisoformat(str(value)[:10])
+        except ValueError:
+            raise ValueError("Tarih YYYY-AA-GG olmalı")
+
+    start, end = parse(start), parse(end)
+    if start and end and start > end:
+        raise ValueError("Başlangıç tarihi bitişten sonra olamaz")
+
+    return (
+        start.isoformat() if start else None,
+        (end + timedelta(days=1)).isoformat() if end else None,
+    )
 
-    rows = cur.fetchall()
-    conn.close()
-    return rows
 
-def get_product(product_id):
-    conn = get_connection()
-    cur = conn.cursor()
+def get_movements_page(product_id, after=None, limit=MOVEMENT_PAGE_SIZE,
+                       move_type=None, start=None, end=None):
+    # 📜 Hareket geçmişi, en yeni başta. Keyset: (date, id) < önceki sayfanın
+    # son satırı. start / end: day_bounds() sınırları ([start, end)).
+    where = ["product_id = ?"]
+    params = [product_id]
+
+    if move_type:
+        where.append("type = ?")
+        params.append(move_type)
+    if start:
+        where.append("date >= ?")
+        params.append(start)
+    if end:
+        where.append("date < ?")
+        params.append(end)
+    if after is not None:
+        where.append("date <= ? AND (date < ? OR id < ?)")
+        params += [after[0], after[0], after[1]]
+
+    return get_connection().execute(
+        f"""
+        SELECT id, type, amount, date, description,
+               (SELECT username FROM users WHERE users.id = user_id) AS username
+        FROM stock_movements
+        WHERE {" AND ".join(where)}
+        ORDER BY date DESC, id DESC
+        LIMIT ?
+        """,
+        (*params, limit),
+    ).fetchall()
+
+
+def movement_cursor(row):
+    return (row["date"], row["id"])
 
+
+def get_balance_before(product_id, end=None):
+    # end anından hemen önceki stok (end yoksa güncel stok).
+    # Sonraki hareketlerin net etkisi gün özetinden düşülür: O(gün).
+    row = get_connection().execute(
+        "SELECT quantity FROM products WHERE id = ?", (product_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    if not end:
+        return row["quantity"]
+
+    later = get_connection().execute(
+        """
+        SELECT COALESCE(SUM(in_qty - out_qty), 0)
+        FROM movement_daily
+        WHERE product_id = ? AND day >= ?
+        """,
+        (product_id, end[:10]),
+    ).fetchone()[0]
+    return row["quantity"] - later
+
+
+# -------------------- ROLLUPS --------------------
+# movement_daily (ürün × gün), movement_days (gün) ve movement_totals (ürün)
+# tetikleyicilerle
+# güncellenir (bkz. _migration_7). Raporlar bu tablolardan okur:
+# maliyet hareket sayısına değil gün / ürün sayısına bağlıdır.
+
+_ROLLUP_DAILY_SQL = """
+    SELECT product_id, substr(date, 1, 10) AS day,
+           SUM(CASE WHEN type = 'IN' THEN amount ELSE 0 END) AS in_qty,
+           SUM(CASE WHEN type = 'OUT' THEN amount ELSE 0 END) AS out_qty,
+           COUNT(*) AS count
+    FROM stock_movements
+    GROUP BY product_id, day
+"""
+
+_ROLLUP_DAYS_SQL = """
+    SELECT substr(date, 1, 10) AS day,
+           SUM(CASE WHEN type = 'IN' THEN amount ELSE 0 END) AS in_qty,
+           SUM(CASE WHEN type = 'OUT' THEN amount ELSE 0 END) AS out_qty,
+           COUNT(*) AS count
+    FROM stock_movements
+    GROUP BY day
+"""
+
+_ROLLUP_TOTALS_SQL = """
+    SELECT product_id,
+           SUM(CASE WHEN type = 'IN' THEN amount ELSE 0 END) AS in_qty,
+           SUM(CASE WHEN type = 'OUT' THEN amount ELSE 0 END) AS out_qty,
+           COUNT(*) AS count
+    FROM stock_movements
+    GROUP BY product_id
+"""
+
+
+def _rebuild_rollups(cur):
+    cur.execute("DELETE FROM movement_daily")
+    cur.execute("DELETE FROM movement_days")
+    cur.execute("DELETE FROM movement_totals")
     cur.execute(
-        "SELECT * FROM products WHERE id=?",
-        (product_id,)
+        f"INSERT INTO movement_daily (product_id, day, in_qty, out_qty, count) {_ROLLUP_DAILY_SQL}"
+    )
+    cur.execute(
+        f"INSERT INTO movement_days (day, in_qty, out_qty, count) {_ROLLUP_DAYS_SQL}"
+    )
+    cur.execute(
+        f"INSERT INTO movement_totals (product_id, in_qty, out_qty, count) {_ROLLUP_TOTALS_SQL}"
     )
-    row = cur.fetchone()
-    conn.close()
-    return row
 
-def delete_product(product_id):
+
+def rebuild_rollups():
+    # Özetleri stock_movements'tan baştan hesaplar (tek transaction)
+    with transaction(immediate=True) as cur:
+        _rebuild_rollups(cur)
+        cur.execute("SELECT COUNT(*) FROM movement_daily")
+        return cur.fetchone()[0]
+
+
+def check_rollups(limit=20):
+    # Özet ile hareketlerden hesaplanan değer farklı olan satırlar.
+    # Boş liste = tutarlı. Tam tarama yapar: bakım / test içindir.
     conn = get_connection()
-    cur = conn.cursor()
+    mismatches = []
+
+    for table, key, fresh in (
+        ("movement_daily", "product_id, day", _ROLLUP_DAILY_SQL),
+        ("movement_days", "day", _ROLLUP_DAYS_SQL),
+        ("movement_totals", "product_id", _ROLLUP_TOTALS_SQL),
+    ):
+        columns = f"{key}, in_qty, out_qty, count"
+        rows = conn.execute(
+            f"""
+            SELECT '{table}' AS rollup, 'eksik/yanlış' AS problem, * FROM (
+                {fresh} EXCEPT SELECT {columns} FROM {table}
+            )
+            UNION ALL
+            SELECT '{table}', 'fazla/yanlış', * FROM (
+                SELECT {columns} FROM {table} EXCEPT {fresh}
+            )
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+        mismatches.extend(dict(r) for r in rows)
+
+    return mismatches
+
+
+def get_daily_movements(start=None, end=None, product_id=None):
+    # Gün başına giriş / çıkış / hareket sayısı. start / end: "YYYY-MM-DD", dahil.
+    # product_id yoksa tüm ürünlerin gün özeti (movement_days) okunur.
+    where = []
+    params = []
+    if product_id is not None:
+        where.append("product_id = ?")
+        params.append(product_id)
+    if start:
+        where.append("day >= ?")
+        params.append(start)
+    if end:
+        where.append("day <= ?")
+        params.append(end)
+
+    table = "movement_daily" if product_id is not None else "movement_days"
+    return get_connection().execute(
+        f"""
+        SELECT day, in_qty, out_qty, count
+        FROM {table}
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY day
+        """,
+        params,
+    ).fetchall()
 
-    cur.execute(
-        "SELECT quantity FROM products WHERE id=?",
-        (product_id,)
-    )
-    row = cur.fetchone()
 
-    if not row:
-        conn.close()
-        raise ValueError("Ürün bulunamadı")
+def get_product_totals(product_id):
+    row = get_connection().execute(
+        "SELECT in_qty, out_qty, count FROM movement_totals WHERE product_id = ?",
+        (product_id,),
+    ).fetchone()
+    return row or {"in_qty": 0, "out_qty": 0, "count": 0}
 
-    if row["quantity"] > 0:
-        conn.close()
-        raise ValueError("Stokta ürün varken silinemez")
 
-    cur.execute(
-        "DELETE FROM products WHERE id=?",
-        (product_id,)
-    )
+def get_category_totals(start=None, end=None):
+    # Kategori başına giriş / çıkış. Tarih yoksa ürün toplamlarından okunur.
+    if not start and not end:
+        return get_connection().execute(
+            """
+            SELECT p.category, SUM(t.in_qty) AS in_qty, SUM(t.out_qty) AS out_qty,
+                   SUM(t.count) AS count
+            FROM movement_totals t
+            JOIN products p ON p.id = t.product_id
+            GROUP BY p.category
+            ORDER BY p.category
+            """
+        ).fetchall()
 
-    if cur.rowcount == 0:
-        conn.close()
-        raise ValueError("Ürün silinemedi (DB engelledi)")
+    return get_connection().execute(
+        """
+        SELECT p.category, SUM(d.in_qty) AS in_qty, SUM(d.out_qty) AS out_qty,
+               SUM(d.count) AS count
+        FROM movement_daily d
+        JOIN products p ON p.id = d.product_id
+        WHERE d.day >= ? AND d.day <= ?
+        GROUP BY p.category
+        ORDER BY p.category
+        """,
+        (start or "0000-00-00", end or "9999-99-99"),
+    ).fetchall()
 
-    conn.commit()
-    conn.close()
 
-def update_product(product_id, code, name, category, quantity, note):
-    conn = get_connection()
-    cur = conn.cursor()
+# -------------------- CHANGE LOG (SYNC) --------------------
+# Cihazlar arası eşitleme için veri katmanı; protokol sync.py'de.
+# - Her yerel ürün / hareket değişikliği tetikleyicilerle change_log'a düşer.
+# - Zaman damgası HLC (hybrid logical clock): duvar saati ms + sayaç. Saati
+#   geri kalan cihaz da, gördüğü en büyük damgayı geçerek sıralamayı korur.
+# - Ürün alanları son yazan kazanır ("hlc cihaz" karşılaştırması). Miktar ise
+#   asla kopyalanmaz: uzak hareketler yerelde yeniden uygulanır. Hareketler
+#   toplanabilir olduğundan her cihaz aynı hareket kümesinde aynı stoğa varır
+#   (iki cihaz aynı malı satmışsa stok eksiye düşebilir, bu gerçek durumdur).
+# - Şubeler cihazlar arasında adla eşlenir.
 
-    cur.execute("""
-        UPDATE products
-        SET
-            code = ?,
-            name = ?,
-            category = ?,
-            quantity = ?,
-            note = ?,
-            updated_at = ?
-        WHERE id = ?
-    """, (
-        code,
-        name,
-        category,
-        quantity,
-        note,
-        datetime.now().isoformat(),
-        product_id
-    ))
-
-    conn.commit()
-    conn.close()
+_hlc_lock = threading.Lock()
+_hlc_last = (0, 0)  # (ms, sayaç)
 
-# -------------------- STOCK MOVEMENTS --------------------
+_sync_state = threading.local()
 
-def stock_in(product_id, amount, description=None):
-    _stock_move(product_id, amount, "IN", description)
 
+def hlc_now():
+    global _hlc_last
 
-def stock_out(product_id, amount, description=None):
-    _stock_move(product_id, amount, "OUT", description)
+    wall = int(time.time() * 1000)
+    with _hlc_lock:
+        ms, counter = _hlc_last
+        _hlc_last = (wall, 0) if wall > ms else (ms, counter + 1)
+        return f"{_hlc_last[0]:013d}.{_hlc_last[1]:06d}"
 
 
-def _stock_move(product_id, amount, move_type, description=None):
-    if amount <= 0:
-        raise ValueError("amount must be > 0")
+def hlc_observe(value):
+    global _hlc_last
 
-    conn = get_connection()
-    cur = conn.cursor()
+    if not value:
+        return
+    ms, counter = (int(x) for x in value.split("."))
+    with _hlc_lock:
+        if (ms, counter) > _hlc_last:
+            _hlc_last = (ms, counter)
 
-    # current quantity
-    cur.execute("SELECT quantity FROM products WHERE id=?", (product_id,))
-    row = cur.fetchone()
-    if not row:
-        conn.close()
-        raise ValueError("product not found")
 
-    current_qty = row["quantity"]
+def last_change_hlc():
+    row = get_connection().execute(
+        "SELECT hlc FROM change_log ORDER BY seq DESC LIMIT 1"
+    ).fetchone()
+    return row["hlc"] if row else None
 
-    if move_type == "OUT" and current_qty < amount:
-        conn.close()
-        raise ValueError("insufficient stock")
 
-    new_qty = current_qty + amount if move_type == "IN" else current_qty - amount
+def _sync_local():
+    # Tetikleyiciler için: uzak değişiklik uygulanırken günlüğe yazma
+    return 0 if getattr(_sync_state, "applying", False) else 1
 
-    # update product quantity
-    cur.execute(
-        "UPDATE products SET quantity=? WHERE id=?",
-        (new_qty, product_id),
+
+def _own_gid(device, row_id):
+    return f"{device}:{row_id}"
+
+
+def get_pending_changes(after, limit, device):
+    # change_log'da seq > after olan en fazla limit kayıt → gönderilecek değişiklikler.
+    # Dönüş: (changes, son seq). Aynı ürünün partideki tekrarları ilk sırada
+    # tek kayıt olur (içerik zaten güncel hali); hareketler ürünlerinden sonra kalır.
+    conn = get_connection()
+    entries = conn.execute(
+        "SELECT seq, entity, row_id, gid, hlc FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?",
+        (after, limit),
+    ).fetchall()
+    if not entries:
+        return [], after
+
+    def fetch(sql, ids):
+        rows = {}
+        ids = list(ids)
+        for i in range(0, len(ids), BATCH_CHUNK):
+            chunk = ids[i:i + BATCH_CHUNK]
+            for row in conn.execute(sql.format(",".join("?" * len(chunk))), chunk):
+                rows[row["id"]] = row
+        return rows
+
+    products = fetch(
+        """
+        SELECT id, code, name, category, location, note, reorder_level, expiry_date, created_at
+        FROM products WHERE id IN ({})
+        """,
+        {e["row_id"] for e in entries if e["entity"] == "product"},
+    )
+    movement_ids = {e["row_id"] for e in entries if e["entity"] == "movement"}
+    movements = fetch(
+        """
+        SELECT m.id, m.product_id, m.type, m.amount, m.date, m.description,
+               p.sync_uid AS product_uid, l.name AS location,
+               t.id AS transfer_id, t.sync_uid AS transfer_uid
+        FROM stock_movements m
+        LEFT JOIN products p ON p.id = m.product_id
+        LEFT JOIN locations l ON l.id = m.location_id
+        LEFT JOIN stock_movements t ON t.id = m.transfer_id
+        WHERE m.id IN ({})
+        """,
+        movement_ids,
     )
+    lots = {}
+    for lot in fetch(
+        """
+        SELECT id, movement_id, received_at, expiry_date, unit_cost, quantity_in
+        FROM stock_lots WHERE movement_id IN ({})
+        """,
+        movement_ids,
+    ).values():
+        lots.setdefault(lot["movement_id"], []).append(
+            [lot["received_at"], lot["expiry_date"], lot["unit_cost"], lot["quantity_in"]]
+        )
 
-    # insert movement
+    changes = []
+    product_index = {}
+    for e in entries:
+        gid = e["gid"] or _own_gid(device, e["row_id"])
+        change = {"entity": e["entity"], "gid": gid, "hlc": e["hlc"], "origin": device}
+
+        if e["entity"] == "product":
+            if gid in product_index:
+                changes[product_index[gid]]["hlc"] = e["hlc"]
+                continue
+            row = products.get(e["row_id"])
+            if row is None:
+                change["deleted"] = True
+            else:
+                change["data"] = {k: row[k] for k in row.keys() if k != "id"}
+            product_index[gid] = len(changes)
+        else:
+            m = movements.get(e["row_id"])
+            if m is None:
+                continue
+            change["data"] = {
+                "product": m["product_uid"] or _own_gid(device, m["product_id"]),
+                "location": m["location"] or DEFAULT_LOCATION_NAME,
+                "type": m["type"],
+                "amount": m["amount"],
+                "date": m["date"],
+                "description": m["description"],
+                "transfer": (
+                    (m["transfer_uid"] or _own_gid(device, m["transfer_id"]))
+                    if m["transfer_id"] else None
+                ),
+                "lots": lots.get(m["id"], []),
+            }
+        changes.append(change)
+
+    return changes, entries[-1]["seq"]
+
+
+_OPTIONAL_TEXT = (str, type(None))
+_REMOTE_PRODUCT_FIELDS = ("category", "location", "note", "expiry_date", "created_at")
+
+
+def check_remote_change(change):
+    # Ağdan gelen tek değişikliğin şekli (get_pending_changes çıktısı).
+    # Dönüş: hata metni veya None. Merkez (server.py --hub) kabul etmeden bakar
+    if not isinstance(change, dict):
+        return "change must be an object"
+    entity = change.get("entity")
+    if entity not in ("product", "movement"):
+        return "invalid entity"
+    for key in ("gid", "hlc", "origin"):
+        if not isinstance(change.get(key), str) or not change[key]:
+            return f"invalid {key}"
+
+    if entity == "product" and change.get("deleted") is True:
+        return None
+    data = change.get("data")
+    if not isinstance(data, dict):
+        return "invalid data"
+
+    if entity == "product":
+        if not isinstance(data.get("code"), str) or not data["code"].strip():
+            return "invalid code"
+        if not isinstance(data.get("name"), str):
+            return "invalid name"
+        for key in _REMOTE_PRODUCT_FIELDS:
+            if not isinstance(data.get(key), _OPTIONAL_TEXT):
+                return f"invalid {key}"
+        if data.get("reorder_level") is not None and not _is_int(data["reorder_level"]):
+            return "invalid reorder_level"
+        return None
+
+    for key in ("product", "location", "date"):
+        if not isinstance(data.get(key), str) or not data[key]:
+            return f"invalid {key}"
+    if data.get("type") not in MOVEMENT_TYPES:
+        return "invalid movement type"
+    if not _is_int(data.get("amount")) or not 0 < data["amount"] <= MAX_QUANTITY:
+        return "invalid amount"
+    for key in ("description", "transfer"):
+        if not isinstance(data.get(key), _OPTIONAL_TEXT):
+            return f"invalid {key}"
+    lots = data.get("lots")
+    if lots is not None:
+        if not isinstance(lots, list):
+            return "invalid lots"
+        for lot in lots:
+            if (
+                not isinstance(lot, list) or len(lot) != 4
+                or not isinstance(lot[0], str) or not isinstance(lot[1], _OPTIONAL_TEXT)
+                or not (lot[2] is None or (isinstance(lot[2], (int, float)) and not isinstance(lot[2], bool)))
+                or not _is_int(lot[3]) or lot[3] <= 0
+            ):
+                return "invalid lot"
+    return None
+
+
+@contextmanager
+def _applying_remote():
+    _sync_state.applying = True
+    try:
+        yield
+    finally:
+        _sync_state.applying = False
+
+
+def apply_remote_changes(changes, device):
+    # Başka cihazlardan gelen değişiklikleri tek transaction'da uygular.
+    # Tekrar gelen değişiklik etkisizdir (hareket sync_uid ile, ürün sürümle).
+    # Dönüş: uygulanan değişiklik sayısı
+    applied = 0
+    before = {}   # product_id -> ilk miktar
+    after = {}    # product_id -> (son miktar, eşik)
+    locations = {}  # ad -> id (parti boyunca)
+
+    with _applying_remote(), transaction(immediate=True) as cur:
+        order = _lot_order()
+        now = datetime.now().isoformat()
+
+        for change in changes:
+            hlc_observe(change["hlc"])
+            if change["origin"] == device:
+                continue  # kendi değişikliğimiz geri geldi
+
+            if change["entity"] == "product":
+                applied += _apply_remote_product(cur, change, device, now)
+            else:
+                applied += _apply_remote_movement(cur, change, device, order, now, before, after,
+                                                  locations)
+
+    crossings = []
+    for pid, (quantity, level) in after.items():
+        low = _crossing(before[pid], quantity, level)
+        if low is not None:
+            crossings.append((pid, quantity, level, low))
+    _after_commit(_notify_stock_alerts, crossings)
+
+    return applied
+
+
+def _resolve_product(cur, gid, device):
+    origin, _, row_id = gid.partition(":")
+    if origin == device:
+        row = cur.execute("SELECT id FROM products WHERE id = ?", (int(row_id),)).fetchone()
+    else:
+        row = cur.execute("SELECT id FROM products WHERE sync_uid = ?", (gid,)).fetchone()
+        if row is None:
+            row = cur.execute(
+                "SELECT product_id AS id FROM sync_aliases WHERE gid = ?", (gid,)
+            ).fetchone()
+    return row["id"] if row else None
+
+
+def _resolve_movement(cur, gid, device):
+    origin, _, row_id = gid.partition(":")
+    if origin == device:
+        return int(row_id)
+    row = cur.execute("SELECT id FROM stock_movements WHERE sync_uid = ?", (gid,)).fetchone()
+    return row["id"] if row else None
+
+
+def _location_by_name(cur, name):
+    row = cur.execute("SELECT id FROM locations WHERE name = ?", (name,)).fetchone()
+    if row:
+        return row["id"]
     cur.execute(
+        "INSERT INTO locations (name, created_at) VALUES (?, ?)",
+        (name, datetime.now().isoformat()),
+    )
+    return cur.lastrowid
+
+
+def _apply_remote_product(cur, change, device, now):
+    gid = change["gid"]
+    version = f"{change['hlc']} {change['origin']}"
+    product_id = _resolve_product(cur, gid, device)
+
+    if change.get("deleted"):
+        # Bu arada buraya hareket gelmişse (stok ≠ 0) silme yok sayılır
+        if product_id is not None:
+            cur.execute("DELETE FROM products WHERE id = ? AND quantity = 0", (product_id,))
+            if cur.rowcount:
+                cur.execute("DELETE FROM product_stock WHERE product_id = ?", (product_id,))
+        return 1
+
+    data = change["data"]
+    if product_id is None:
+        row = cur.execute("SELECT id FROM products WHERE code = ?", (data["code"],)).fetchone()
+        if row is None:
+            cur.execute(
+                """
+                INSERT INTO products (
+                    code, name, category, quantity, location, note, reorder_level,
+                    expiry_date, created_at, updated_at, sync_uid, sync_version
+                )
+                VALUES (?, ?, ?, 0, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (data["code"], data["name"], data["category"], data["location"],
+                 data["note"], data["reorder_level"], data["expiry_date"],
+                 data["created_at"] or now, now, gid, version),
+            )
+            return 1
+
+        # Aynı kod iki cihazda ayrı açılmış: tek ürün say
+        product_id = row["id"]
+        cur.execute(
+            "INSERT OR IGNORE INTO sync_aliases (gid, product_id) VALUES (?, ?)",
+            (gid, product_id),
+        )
+
+    # Son yazan kazanır: uygulanmış uzak sürüm veya son yerel değişiklik
+    row = cur.execute("SELECT sync_version FROM products WHERE id = ?", (product_id,)).fetchone()
+    local = cur.execute(
         """
-        INSERT INTO stock_movements (product_id, type, amount, date, description)
-        VALUES (?, ?, ?, ?, ?)
+        SELECT hlc FROM change_log
+        WHERE entity = 'product' AND row_id = ?
+        ORDER BY hlc DESC LIMIT 1
+        """,
+        (product_id,),
+    ).fetchone()
+    current = max(row["sync_version"] or "", f"{local['hlc']} {device}" if local else "")
+    if version <= current:
+        return 0
+
+    fields = ["name", "category", "location", "note", "reorder_level"]
+    try:
+        cur.execute("SAVEPOINT remote_product")
+        _update_remote_product(cur, product_id, data, ["code"] + fields, version, now)
+        cur.execute("RELEASE remote_product")
+    except sqlite3.IntegrityError:
+        # Yeni kod burada başka ürünün: kod hariç uygula
+        cur.execute("ROLLBACK TO remote_product")
+        cur.execute("RELEASE remote_product")
+        _update_remote_product(cur, product_id, data, fields, version, now)
+    return 1
+
+
+def _update_remote_product(cur, product_id, data, fields, version, now):
+    cur.execute(
+        f"""
+        UPDATE products SET {', '.join(f'{f} = ?' for f in fields)},
+            sync_version = ?, updated_at = ?
+        WHERE id = ?
         """,
-        (product_id, move_type, amount, datetime.now().isoformat(), description),
+        (*(data[f] for f in fields), version, now, product_id),
     )
 
-    conn.commit()
-    conn.close()
 
-def add_movement(product_id, mtype, amount, description=None):
-    conn = get_connection()
-    cur = conn.cursor()
+def _apply_remote_movement(cur, change, device, order, now, before, after, locations):
+    gid = change["gid"]
+    if cur.execute("SELECT 1 FROM stock_movements WHERE sync_uid = ?", (gid,)).fetchone():
+        return 0
+
+    data = change["data"]
+    product_id = _resolve_product(cur, data["product"], device)
+    if product_id is None:
+        return 0  # ürün silinmiş: geçmiş hareket
+
+    location_id = locations.get(data["location"])
+    if location_id is None:
+        location_id = locations[data["location"]] = _location_by_name(cur, data["location"])
+    amount = data["amount"]
+    delta = amount if data["type"] == "IN" else -amount
+
+    row = cur.execute(
+        """
+        UPDATE products SET quantity = quantity + ?, updated_at = ?
+        WHERE id = ?
+        RETURNING quantity, reorder_level
+        """,
+        (delta, now, product_id),
+    ).fetchone()
+    before.setdefault(product_id, row["quantity"] - delta)
+    after[product_id] = (row["quantity"], row["reorder_level"])
+    here = _put_to_location(cur, product_id, location_id, delta)
 
-    # 1️⃣ Stok hareketini kaydet
     cur.execute(
         """
-        INSERT INTO stock_movements
-        (product_id, type, amount, description, date)
-        VALUES (?, ?, ?, ?, datetime('now', '+3 hours'))
+        INSERT INTO stock_movements (
+            product_id, location_id, type, amount, date, description, sync_uid
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?)
         """,
-        (product_id, mtype, amount, description),
+        (product_id, location_id, data["type"], amount, data["date"], data["description"], gid),
     )
+    movement_id = cur.lastrowid
 
-    # 2️⃣ Ürün stok + updated_at güncelle
-    if mtype == "IN":
-        cur.execute(
-            """
-            UPDATE products
-            SET quantity = quantity + ?,
-                updated_at = datetime('now', '+3 hours')
-            WHERE id=?
-            """,
-            (amount, product_id)
+    if data["transfer"]:
+        transfer_id = (
+            movement_id if data["transfer"] == gid
+            else _resolve_movement(cur, data["transfer"], device)
         )
-    elif mtype == "OUT":
         cur.execute(
-            """
-            UPDATE products
-            SET quantity = quantity - ?,
-                updated_at = datetime('now', '+3 hours')
-            WHERE id=?
-            """,
-            (amount, product_id)
+            "UPDATE stock_movements SET transfer_id = ? WHERE id = ?",
+            (transfer_id, movement_id),
         )
 
-    conn.commit()
-    conn.close()
+    if data["type"] == "OUT":
+        _consume_lots(cur, product_id, location_id, amount, order, movement_id)
+        return 1
+
+    # Giriş: gönderenin lotları aynen (şube eksideyse açığı kapatan kısım hariç)
+    need = min(amount, max(here, 0))
+    opened = 0
+    for received_at, expiry_date, unit_cost, quantity in data["lots"] or [[data["date"], None, None, amount]]:
+        qty = min(quantity, need - opened)
+        if qty <= 0:
+            break
+        _add_lot(cur, product_id, location_id, qty, received_at, expiry_date, unit_cost, movement_id)
+        opened += qty
+    if opened < need:
+        _add_lot(cur, product_id, location_id, need - opened, data["date"], movement_id=movement_id)
+    return 1
+
+
+# -------------------- EXPORT --------------------
+# Dışa aktarma tabloyu asla tek seferde belleğe almaz: tek bir SELECT
+# açılır ve fetchmany ile parça parça okunur. WAL modunda bu tek sorgu
+# tutarlı bir anlık görüntü okur, yazanları da bloklamaz.
+
+EXPORT_CHUNK = 1000
+
+PRODUCT_EXPORT_COLUMNS = (
+    "id", "code", "name", "category", "quantity", "reorder_level", "location",
+    "note", "expiry_date", "created_at", "updated_at",
+)
+
+MOVEMENT_EXPORT_COLUMNS = (
+    "id", "date", "product_id", "product_code", "product_name",
+    "type", "amount", "description", "location_id", "transfer_id", "user_id",
+)
+
+
+def _iter_chunks(cur, chunk_size):
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+def _movement_filter(start=None, end=None, product_ids=None):
+    # start dahil, end hariç: "YYYY-MM-DD" veya isoformat
+    where = []
+    params = []
+
+    if start:
+        where.append("m.date >= ?")
+        params.append(start)
+    if end:
+        where.append("m.date < ?")
+        params.append(end)
+    if product_ids:
+        product_ids = list(product_ids)
+        where.append(f"m.product_id IN ({', '.join('?' * len(product_ids))})")
+        params.extend(product_ids)
+
+    return (" WHERE " + " AND ".join(where) if where else ""), params
+
+
+def get_product_ids(codes):
+    # Dışa aktarma filtresi: kullanıcı ürün kodlarını yazar
+    codes = [c for c in codes if c]
+    if not codes:
+        return []
+    rows = get_connection().execute(
+        f"SELECT id FROM products WHERE code IN ({', '.join('?' * len(codes))})",
+        codes,
+    ).fetchall()
+    return [r["id"] for r in rows]
+
+
+def count_products():
+    return get_connection().execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+
+def iter_products(chunk_size=EXPORT_CHUNK):
+    with reading() as conn:
+        cur = conn.execute(
+            f"SELECT {', '.join(PRODUCT_EXPORT_COLUMNS)} FROM products ORDER BY id"
+        )
+        yield from _iter_chunks(cur, chunk_size)
 
-def get_movements(product_id, order="DESC"):
-    conn = get_connection()
-    cur = conn.cursor()
 
-    cur.execute(
-        f"""
-        SELECT *
-        FROM stock_movements
-        WHERE product_id=?
-        ORDER BY datetime(date) {order}
-        """,
-        (product_id,),
-    )
+def count_movements(start=None, end=None, product_ids=None):
+    where, params = _movement_filter(start, end, product_ids)
+    return get_connection().execute(
+        f"SELECT COUNT(*) FROM stock_movements m{where}", params
+    ).fetchone()[0]
 
-    rows = cur.fetchall()
-    conn.close()
-    return rows
 
+def iter_movements(start=None, end=None, product_ids=None, chunk_size=EXPORT_CHUNK):
+    where, params = _movement_filter(start, end, product_ids)
+    with reading() as conn:
+        cur = conn.execute(
+            f"""
+            SELECT m.id, m.date, m.product_id, p.code, p.name,
+                   m.type, m.amount, m.description, m.location_id, m.transfer_id,
+                   m.user_id
+            FROM stock_movements m
+            LEFT JOIN products p ON p.id = m.product_id
+            {where}
+            ORDER BY m.date, m.id
+            """,
+            params,
+        )
+        yield from _iter_chunks(cur, chunk_size)
 
 
 # -------------------- QUICK TEST --------------------
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="stok-takip veritabanı bakımı")
+    parser.add_argument("--db", help="veritabanı dosyası (varsayılan: stok.db)")
+    parser.add_argument(
+        "command", nargs="?", default="init",
+        choices=("init", "rebuild-rollups", "check-rollups", "check-lots", "check-stock"),
+    )
+    args = parser.parse_args()
+
+    if args.db:
+        DB_PATH = Path(args.db)
     init_db()
-    print("DB initialized at", DB_PATH)
+
+    if args.command == "init":
+        print("DB initialized at", DB_PATH)
+    elif args.command == "rebuild-rollups":
+        print(f"✅ {rebuild_rollups()} ürün-gün özeti yeniden hesaplandı")
+    elif args.command in ("check-lots", "check-stock"):
+        problems = check_lots() if args.command == "check-lots" else check_stock()
+        for p in problems:
+            print("❌", p)
+        print("✅ tutarlı" if not problems else f"{len(problems)} tutarsızlık")
+        raise SystemExit(1 if problems else 0)
+    else:
+        problems = check_rollups()
+        for p in problems:
+            print("❌", p)
+        print("✅ özetler tutarlı" if not problems else f"{len(problems)} tutarsızlık")
+        raise SystemExit(1 if problems else 0)
 
@@ -0,0 +1,149 @@
+import csv
+import json
+import os
+
+import db
+
+
+# ===============================
+# 📤 DIŞA AKTARMA (CSV / JSONL / PARQUET)
+# ===============================
+# db.iter_products / db.iter_movements tek sorguyu fetchmany ile parça
+# parça okur; her parça hemen dosyaya yazılır. Bellekte en fazla bir parça
+# (db.EXPORT_CHUNK satır) bulunur. Dosya önce ".part" olarak yazılır,
+# bitince yerine taşınır: yarım kalan döküm asla gerçek dosya gibi görünmez.
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+
+# Parquet şeması: bunlar dışındaki sütunlar metin
+INTEGER_COLUMNS = {
+    "id", "product_id", "quantity", "reorder_level", "amount", "location_id", "transfer_id",
+    "user_id",
+}
+
+
+def detect_format(path):
+    ext = os.path.splitext(str(path))[1].lower().lstrip(".")
+    if ext == "json":
+        ext = "jsonl"
+    if ext not in EXPORT_FORMATS:
+        raise ValueError(f"Desteklenmeyen dosya türü: {ext or '?'}")
+    return ext
+
+
+# -------------------------------
+# ✍️ YAZICILAR
+# -------------------------------
+def write_csv(path, columns, chunks):
+    # Türkçe Excel: BOM + ";" ile doğrudan açılır (importer da okur)
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+
+
+def write_jsonl(path, columns, chunks):
+    with open(path, "w", encoding="utf-8") as f:
+        for rows in chunks:
+            f.writelines(
+                json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n"
+                for row in rows
+            )
+
+
+def write_parquet(path, columns, chunks):
+    # pyarrow opsiyonel: sadece Parquet dökümünde gerekir
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet için pyarrow kurulu olmalı (pip install pyarrow)")
+
+    schema = pa.schema([
+        (c, pa.int64() if c in INTEGER_COLUMNS else pa.string()) for c in columns
+    ])
+
+    # Her parça ayrı bir row group olur
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in chunks:
+            arrays = [
+                pa.array(values, type=field.type)
+                for values, field in zip(zip(*rows), schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+WRITERS = {
+    "csv": write_csv,
+    "jsonl": write_jsonl,
+    "parquet": write_parquet,
+}
+
+
+# -------------------------------
+# 🚚 DIŞA AKTAR
+# -------------------------------
+def _export(path, fmt, columns, chunks, total, on_progress, cancel):
+    # on_progress(0..1) ve cancel() worker thread'den çağrılır.
+    # Dönüş: {"rows", "path", "cancelled"}
+    fmt = fmt or detect_format(path)
+    writer = WRITERS.get(fmt)
+    if writer is None:
+        raise ValueError(f"Desteklenmeyen format: {fmt}")
+
+    summary = {"rows": 0, "path": str(path), "cancelled": False}
+
+    def tracked():
+        for rows in chunks:
+            if cancel and cancel():
+                summary["cancelled"] = True
+                return
+            summary["rows"] += len(rows)
+            yield rows
+            if on_progress:
+                on_progress(summary["rows"] / (total or 1))
+
+    tmp = f"{path}.part"
+    try:
+        writer(tmp, columns, tracked())
+    except BaseException:
+        _remove(tmp)
+        raise
+
+    if summary["cancelled"]:
+        _remove(tmp)
+        return summary
+
+    os.replace(tmp, path)
+    if on_progress:
+        on_progress(1.0)
+    return summary
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def export_products(path, fmt=None, on_progress=None, cancel=None):
+    return _export(
+        path, fmt, db.PRODUCT_EXPORT_COLUMNS,
+        db.iter_products(), db.count_products(),
+        on_progress, cancel,
+    )
+
+
+def export_movements(path, start=None, end=None, product_ids=None,
+                     fmt=None, on_progress=None, cancel=None):
+    # start / end: gün olarak, ikisi de dahil
+    start, end = db.day_bounds(start, end)
+
+    return _export(
+        path, fmt, db.MOVEMENT_EXPORT_COLUMNS,
+        db.iter_movements(start, end, product_ids),
+        db.count_movements(start, end, product_ids),
+        on_progress, cancel,
+    )
@@ -0,0 +1,211 @@
+import csv
+import io
+import os
+from datetime import date, datetime
+from functools import lru_cache
+
+import db
+
+
+# ===============================
+# 📥 ÜRÜN İÇE AKTARMA (CSV / XLSX)
+# ===============================
+# Dosya satır satır okunur (generator), doğrulanır ve CHUNK_SIZE'lık
+# parçalar halinde tek transaction + executemany ile yazılır.
+# Bellekte hiçbir zaman tüm dosya tutulmaz; sadece mükerrer kod kontrolü
+# için görülen kodlar kümesi büyür.
+
+CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 100
+
+# Başlık → alan. Türkçe ve İngilizce başlıklar kabul edilir.
+HEADER_ALIASES = {
+    "code": "code", "kod": "code", "urun kodu": "code", "barkod": "code",
+    "name": "name", "ad": "name", "isim": "name", "urun adi": "name",
+    "category": "category", "kategori": "category",
+    "quantity": "quantity", "adet": "quantity", "miktar": "quantity", "stok": "quantity",
+    "location": "location", "konum": "location", "raf": "location",
+    "note": "note", "not": "note", "aciklama": "note",
+    "expiry_date": "expiry_date", "skt": "expiry_date", "son kullanma": "expiry_date",
+}
+
+FIELDS = ("code", "name", "category", "quantity", "location", "note", "expiry_date")
+
+
+def _map_header(header):
+    mapping = {}
+    for i, title in enumerate(header):
+        key = db.fold_text(str(title or "")).strip().replace("_", " ")
+        field = HEADER_ALIASES.get(key) or HEADER_ALIASES.get(key.replace(" ", "_"))
+        if field and field not in mapping:
+            mapping[field] = i
+
+    missing = [f for f in ("code", "name", "quantity") if f not in mapping]
+    if missing:
+        raise ValueError("Eksik sütun: " + ", ".join(missing))
+    return mapping
+
+
+# -------------------------------
+# 📄 OKUYUCULAR (generator)
+# -------------------------------
+def read_csv(path, on_progress=None):
+    size = os.path.getsize(path) or 1
+
+    with open(path, "rb") as raw:
+        text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel  # Türkçe Excel ";" kullanır, sniff bulur
+
+        reader = csv.reader(text, dialect)
+        header = next(reader, None)
+        if header is None:
+            return
+        mapping = _map_header(header)
+
+        for row in reader:
+            if on_progress and reader.line_num % CHUNK_SIZE == 0:
+                on_progress(raw.tell() / size)
+            yield reader.line_num, {f: _cell(row, i) for f, i in mapping.items()}
+
+
+def read_xlsx(path, on_progress=None):
+    # openpyxl opsiyonel: sadece XLSX içe aktarırken gerekir
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("XLSX için openpyxl kurulu olmalı (pip install openpyxl)")
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        total = ws.max_row or 1
+        rows = ws.iter_rows(values_only=True)
+
+        header = next(rows, None)
+        if header is None:
+            return
+        mapping = _map_header(header)
+
+        for line, row in enumerate(rows, start=2):
+            if on_progress and line % CHUNK_SIZE == 0:
+                on_progress(line / total)
+            yield line, {f: _cell(row, i) for f, i in mapping.items()}
+    finally:
+        wb.close()
+
+
+def _cell(row, i):
+    value = row[i] if i < len(row) else None
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # Excel sayıları float verir
+    return str(value).strip()
+
+
+# -------------------------------
+# ✅ DOĞRULAMA (save_product ile aynı kurallar)
+# -------------------------------
+@lru_cache(maxsize=4096)
+def parse_date(text):
+    # SKT'ler dosyada çok tekrar eder: cache + strptime'sız hızlı yol
+    if not text:
+        return None
+
+    parts = text.replace("/", ".").split(".")
+    if len(parts) == 3 and all(p.isdigit() for p in parts) and len(parts[2]) == 4:
+        try:
+            return date(int(parts[2]), int(parts[1]), int(parts[0])).isoformat()
+        except ValueError:
+            raise ValueError("Tarih anlaşılamadı")
+
+    for fmt in ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            pass
+    raise ValueError("Tarih anlaşılamadı")
+
+
+def validate_row(row):
+    if not row["code"] or not row["name"] or not row["quantity"]:
+        raise ValueError("Zorunlu alan boş")
+
+    try:
+        qty = int(row["quantity"])
+    except ValueError:
+        raise ValueError("Ürün adedi sayı olmalıdır")
+
+    if qty < 0 or qty > db.MAX_QUANTITY:
+        raise ValueError("Geçersiz adet")
+
+    return (
+        row["code"],
+        row["name"],
+        row.get("category") or None,
+        qty,
+        row.get("location") or None,
+        row.get("note") or None,
+        parse_date(row.get("expiry_date")),
+    )
+
+
+# -------------------------------
+# 🚚 İÇE AKTAR
+# -------------------------------
+def import_products(path, chunk_size=CHUNK_SIZE, on_progress=None, cancel=None):
+    # on_progress(0..1) ve cancel() worker thread'den çağrılır.
+    # Dönüş: {"imported", "failed", "errors": [(satır, mesaj), ...]}
+    reader = read_xlsx if str(path).lower().endswith(".xlsx") else read_csv
+
+    seen = set()
+    chunk, lines = [], []
+    summary = {"imported": 0, "failed": 0, "errors": [], "cancelled": False}
+
+    def fail(line, message):
+        summary["failed"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append((line, message))
+
+    def flush():
+        # DB'nin reddettiği satırlar (stok izni, şube stoğu) da rapora girer
+        count, errors = db.upsert_products(chunk)
+        summary["imported"] += count
+        for index, message in errors:
+            fail(lines[index], message)
+        chunk.clear()
+        lines.clear()
+
+    for line, row in reader(path, on_progress):
+        try:
+            product = validate_row(row)
+        except ValueError as e:
+            fail(line, str(e))
+            continue
+
+        if product[0] in seen:
+            fail(line, "Bu ürün kodu dosyada tekrar ediyor")
+            continue
+        seen.add(product[0])
+
+        chunk.append(product)
+        lines.append(line)
+        if len(chunk) >= chunk_size:
+            flush()
+
+            if cancel and cancel():
+                summary["cancelled"] = True
+                return summary
+
+    if chunk:
+        flush()
+
+    if on_progress:
+        on_progress(1.0)
+    return summary
@@ -8,11 +8,14 @@ from kivy.uix.textinput import TextInput
 from kivy.uix.scrollview import ScrollView
 from kivy.uix.gridlayout import GridLayout
 from kivy.core.window import Window
+from kivy.clock import Clock
 from kivy.utils import platform
-from datetime import datetime
+from datetime import date, datetime
+import sqlite3
 from kivy.graphics import Color, RoundedRectangle
 
 import db
+from importer import parse_date
 
 if platform == "android":
     Window.softinput_mode = "below_target"
@@ -159,6 +162,28 @@ class ProductListScreen(Screen):
         )
         sort_btn.bind(on_release=self.open_sort_menu)
 
+        # ⚠️ KRİTİK STOK
+        self.alert_btn = Button(
+            text="⚠️",
+            size_hint_x=None,
+            width=64,
+            background_normal="",
+            background_color=(0.12, 0.12, 0.12, 1),
+            color=(1, 1, 1, 1)
+        )
+        self.alert_btn.bind(on_release=self.open_alerts)
+
+        # 📷 BARKOD OKUTMA
+        scan_btn = Button(
+            text="📷",
+            size_hint_x=None,
+            width=44,
+            background_normal="",
+            background_color=(0.12, 0.12, 0.12, 1),
+            color=(1, 1, 1, 1)
+        )
+        scan_btn.bind(on_release=lambda x: setattr(self.manager, "current", "scan"))
+
         # 🟢 STOK GİRİŞ
         stock_in_btn = RoundedButton(
             text="⬇️",
@@ -195,6 +220,8 @@ class ProductListScreen(Screen):
         # 📦 LAYOUT'A EKLEME
         top_bar.add_widget(menu_btn)
         top_bar.add_widget(sort_btn)
+        top_bar.add_widget(self.alert_btn)
+        top_bar.add_widget(scan_btn)
         top_bar.add_widget(BoxLayout())  # spacer
         top_bar.add_widget(right_actions)
 
@@ -217,20 +244,31 @@ class ProductListScreen(Screen):
             foreground_color=(0.95, 0.95, 0.95, 1),   # yazılan metin
             hint_text_color=(0.92, 0.92, 0.92, 1)         # Kivy karartsa bile okunur
         )
-        self.search.bind(text=self.refresh)
+        self.search.bind(text=self.on_search_text)
         root.add_widget(self.search)
 
-        # 📜 LİSTE
-        scroll = ScrollView()
-        self.layout = GridLayout(
-            cols=1,
-            spacing=6,
-            padding=[0, 6, 0, 6],
-            size_hint_y=None
+        # ⇅ sıralama nereden değişirse değişsin listeyi yenile
+        db.subscribe_setting("product_sort", self.on_sort_changed)
+
+        # ⚠️ eşik geçişi hangi thread'de olursa olsun rozeti ana thread'de güncelle
+        db.subscribe_stock_alerts(
+            lambda *args: Clock.schedule_once(self.update_alert_badge)
         )
-        self.layout.bind(minimum_height=self.layout.setter("height"))
-        scroll.add_widget(self.layout)
-        root.add_widget(scroll)
+
+        # ⏳ debounce + arka plan sorgusu + bayat sonuç eleme
+        from ui.async_search import AsyncSearch
+        self.searcher = AsyncSearch(
+            query=self.query_products,
+            on_results=self.show_products
+        )
+
+        # 📜 LİSTE (RecycleView: sadece görünen satırlar çizilir)
+        from ui.product_list import ProductList
+        self.product_list = ProductList(
+            on_open=self.open_product,
+            load_page=lambda cursor: db.get_products_page(after=cursor)
+        )
+        root.add_widget(self.product_list)
 
         # ➕ YENİ ÜRÜN
         root.add_widget(Button(
@@ -253,21 +291,52 @@ class ProductListScreen(Screen):
     # 🔁 LIFECYCLE
     # ===============================
     def on_enter(self):
-        self.refresh()
+        self.refresh_changed()
+        self.update_alert_badge()
 
-    def refresh(self, *args):
-        self.layout.clear_widgets()
-        products = db.get_products(self.search.text.strip() or None)
+    def on_sort_changed(self, key, value):
+        # set_setting başka thread'den de çağrılabilir
+        Clock.schedule_once(lambda dt: self.refresh())
 
+    def on_search_text(self, instance, text):
+        self.start_search(text)
 
-        from ui.product_card import ProductCard
+    def refresh(self, *args):
+        # Debounce yok ama sorgu yine arka planda
+        self.start_search(self.search.text, debounce=False)
+
+    def start_search(self, text, debounce=True):
+        # Liste uzunluğu burada (ana thread) okunur, worker'a değeri gider
+        limit = max(db.PRODUCT_PAGE_SIZE, len(self.product_list.data))
+        self.searcher.search((text.strip(), limit), debounce=debounce)
+
+    def query_products(self, request):
+        # ⚠️ Worker thread'de çalışır, widget'a dokunma
+        search_text, limit = request
+        # 🔍 Arama varsa FTS'ten sıralı ve limitli sonuç
+        if search_text:
+            return db.search_products(search_text)
+
+        # 📄 İlk sayfa (kaydırılmışsa yüklü olan kadar)
+        return db.get_products_page(limit=limit)
+
+    def refresh_changed(self):
+        # 🔁 Detaydan dönüş / stok hareketi: sadece updated_at'i değişenler
+        model = self.product_list.model
+        if model.synced_at is not None and not self.search.text.strip():
+            changed = db.get_products_changed_since(model.synced_at)
+            if self.product_list.patch_products(changed):
+                return
+
+        # yeni ürün, isim değişikliği vb. → tam sorgu + fark
+        self.refresh()
+
+    def show_products(self, products):
+        self.product_list.set_products(
+            products,
+            complete=not self.search.text.strip()
+        )
 
-        for p in products:
-            card = ProductCard(
-                product=p,
-                on_open=self.open_product
-            )
-            self.layout.add_widget(card)
     # ===============================
     # 👆 CARD TOUCH
     # ===============================
@@ -391,7 +460,7 @@ class ProductListScreen(Screen):
             else:
                 db.stock_out(self.selected_product_id, qty)
 
-            self.refresh()
+            self.refresh_changed()
 
         except Exception as e:
             Popup(
@@ -434,9 +503,50 @@ class ProductListScreen(Screen):
         popup.open()
 
     def set_sort(self, sort_key, popup):
-        db.set_setting("product_sort", sort_key)
         popup.dismiss()
-        self.refresh()
+        db.set_setting("product_sort", sort_key)  # → on_sort_changed
+
+    # ===============================
+    # ⚠️ KRİTİK STOK UYARILARI
+    # ===============================
+    def update_alert_badge(self, *args):
+        # Kısmi indeks sayımı: O(uyarı), katalog boyutundan bağımsız
+        count = db.count_low_stock()
+        self.alert_btn.text = f"⚠️ {count}" if count else "⚠️"
+        self.alert_btn.background_color = (
+            (0.6, 0.35, 0.1, 1) if count else (0.12, 0.12, 0.12, 1)
+        )
+
+    def open_alerts(self, instance):
+        from kivy.uix.popup import Popup
+
+        products = db.get_low_stock_products()
+
+        box = GridLayout(cols=1, spacing=6, padding=6, size_hint_y=None)
+        box.bind(minimum_height=box.setter("height"))
+
+        scroll = ScrollView()
+        scroll.add_widget(box)
+
+        popup = Popup(
+            title="Kritik Stok",
+            content=scroll,
+            size_hint=(0.9, 0.7),
+            separator_color=(0.8, 0.5, 0.1, 1)
+        )
+
+        if not products:
+            box.add_widget(Label(text="Kritik seviyede ürün yok 👍", size_hint_y=None, height=44))
+
+        for p in products:
+            box.add_widget(Button(
+                text=f"{p['name']} ({p['code']})  —  {p['quantity']} / {p['reorder_level']}",
+                size_hint_y=None,
+                height=44,
+                on_release=lambda x, pid=p["id"]: (popup.dismiss(), self.open_product(pid))
+            ))
+
+        popup.open()
 
     # ===============================
     # ☰ HAMBURGER MENU
@@ -454,11 +564,18 @@ class ProductListScreen(Screen):
             title="Menü",
             content=box,
             size_hint=(0.72, None),
-            height=220,
+            height=272,
             separator_color=(0.25, 0.6, 0.8, 1),
             background_color=(0.08, 0.08, 0.08, 1)
         )
 
+        box.add_widget(Button(
+            text="⏰  SKT Yaklaşanlar",
+            size_hint_y=None,
+            height=44,
+            on_release=lambda x: (popup.dismiss(), self.open_expiring())
+        ))
+
         box.add_widget(Button(
             text="ℹ️  Uygulama Hakkında",
             size_hint_y=None,
@@ -482,6 +599,11 @@ class ProductListScreen(Screen):
 
         popup.open()
 
+    def open_expiring(self, *args):
+        from ui.expiry_popup import ExpiryPopup
+
+        ExpiryPopup(on_open_product=self.open_product).open()
+
     def open_and_close(self, screen_name, popup):
         popup.dismiss()
         self.manager.current = screen_name
@@ -551,6 +673,21 @@ class AddProductScreen(Screen):
             height=42,
         )
 
+        self.reorder_level = TextInput(
+            hint_text="Kritik Stok Seviyesi (boş = uyarı yok)",
+            input_filter="int",
+            multiline=False,
+            size_hint_y=None,
+            height=42,
+        )
+
+        self.expiry = TextInput(
+            hint_text="Son Kullanma Tarihi (GG.AA.YYYY, opsiyonel)",
+            multiline=False,
+            size_hint_y=None,
+            height=42,
+        )
+
         self.note = TextInput(
             hint_text="Not",
             size_hint_y=None,
@@ -562,6 +699,8 @@ class AddProductScreen(Screen):
         root.add_widget(self.product_name)
         root.add_widget(self.category)
         root.add_widget(self.quantity)
+        root.add_widget(self.reorder_level)
+        root.add_widget(self.expiry)
         root.add_widget(self.note)
 
         # 🔘 BUTONLAR
@@ -622,6 +761,13 @@ class AddProductScreen(Screen):
         self.product_name.text = product["name"] or ""
         self.category.text = product["category"] or ""
         self.quantity.text = str(product["quantity"])
+        self.reorder_level.text = (
+            "" if product["reorder_level"] is None else str(product["reorder_level"])
+        )
+        self.expiry.text = (
+            date.fromisoformat(product["expiry_date"]).strftime("%d.%m.%Y")
+            if product["expiry_date"] else ""
+        )
         self.note.text = product["note"] or ""
 
     # ===============================
@@ -706,6 +852,8 @@ class AddProductScreen(Screen):
             self.product_name.text = ""
             self.category.text = ""
             self.quantity.text = ""
+            self.reorder_level.text = ""
+            self.expiry.text = ""
             self.note.text = ""
             self.delete_btn.opacity = 0
             self.delete_btn.disabled = True
@@ -749,7 +897,7 @@ class AddProductScreen(Screen):
             return
 
         # ❌ LIMIT KORUMA
-        if qty < 0 or qty > 1_000_000_000:
+        if qty < 0 or qty > db.MAX_QUANTITY:
             Popup(
                 title="Geçersiz Adet",
                 content=Label(text="Ürün adedi çok büyük."),
@@ -758,6 +906,34 @@ class AddProductScreen(Screen):
             ).open()
             return
 
+        # ⚠️ KRİTİK SEVİYE (opsiyonel)
+        level_text = self.reorder_level.text.strip()
+        try:
+            reorder_level = int(level_text) if level_text else None
+        except ValueError:
+            reorder_level = -1
+
+        if reorder_level is not None and not 0 <= reorder_level <= db.MAX_QUANTITY:
+            Popup(
+                title="Geçersiz Seviye",
+                content=Label(text="Kritik stok seviyesi 0 veya pozitif bir sayı olmalı."),
+                size_hint=(0.7, None),
+                height=160
+            ).open()
+            return
+
+        # ⏰ SKT (opsiyonel, içe aktarmayla aynı formatlar)
+        try:
+            expiry_date = parse_date(self.expiry.text.strip())
+        except ValueError:
+            Popup(
+                title="Hatalı Tarih",
+                content=Label(text="Son kullanma tarihi GG.AA.YYYY olmalı."),
+                size_hint=(0.7, None),
+                height=160
+            ).open()
+            return
+
         # 💾 DB KAYIT
         try:
             if self.edit_mode:
@@ -767,7 +943,9 @@ class AddProductScreen(Screen):
                     name=self.product_name.text.strip(),
                     category=self.category.text.strip(),
                     quantity=qty,
-                    note=self.note.text.strip()
+                    note=self.note.text.strip(),
+                    reorder_level=reorder_level,
+                    expiry_date=expiry_date
                 )
             else:
                 db.add_product(
@@ -775,11 +953,20 @@ class AddProductScreen(Screen):
                     name=self.product_name.text.strip(),
                     category=self.category.text.strip(),
                     quantity=qty,
-                    note=self.note.text.strip()
+                    note=self.note.text.strip(),
+                    reorder_level=reorder_level,
+                    expiry_date=expiry_date
                 )
 
             self.manager.current = "list"
 
+        except db.PermissionDenied as e:
+            Popup(
+                title="Yetki Yok",
+                content=Label(text=str(e)),
+                size_hint=(0.8, None),
+                height=160
+            ).open()
 
         except Exception:
             Popup(
@@ -910,7 +1097,7 @@ class AddProductScreen(Screen):
         # --------------------------------
         # ❌ INTEGER OVERFLOW / MANTIK KORUMA
         # --------------------------------
-        if qty < 0 or qty > 1_000_000_000:
+        if qty < 0 or qty > db.MAX_QUANTITY:
             # MVP: sessiz
             # ULTRA: popup + log + cloud reject
             return
@@ -950,6 +1137,15 @@ class AddProductScreen(Screen):
 
                 self.manager.current = "list"
 
+        except db.PermissionDenied as e:
+            from kivy.uix.popup import Popup
+            Popup(
+                title="Yetki Yok",
+                content=Label(text=str(e)),
+                size_hint=(0.8, None),
+                height=160
+            ).open()
+
         except Exception:
         # MVP: sessiz
         # ULTRA: popup + hata raporu
@@ -1011,8 +1207,19 @@ class ProductDetailScreen(Screen):
         )
         edit_btn.bind(on_release=lambda x: self.open_edit())
 
+        transfer_btn = Button(
+            text="🔁",
+            size_hint_x=None,
+            width=48,
+            background_normal="",
+            background_color=(0.18, 0.18, 0.18, 1),
+            color=(1, 1, 1, 1)
+        )
+        transfer_btn.bind(on_release=lambda x: self.open_transfer())
+
         header.add_widget(back_btn)
         header.add_widget(self.title_lbl)
+        header.add_widget(transfer_btn)
         header.add_widget(edit_btn)
 
         root.add_widget(header)
@@ -1064,7 +1271,7 @@ class ProductDetailScreen(Screen):
         # ===============================
         # 📜 BİLGİLER
         # ===============================
-        self.scroll = ScrollView()
+        self.scroll = ScrollView(size_hint_y=None, height=150)
         self.content = BoxLayout(
             orientation="vertical",
             spacing=10,
@@ -1075,6 +1282,46 @@ class ProductDetailScreen(Screen):
         self.scroll.add_widget(self.content)
         root.add_widget(self.scroll)
 
+        # ===============================
+        # 🕘 HAREKET GEÇMİŞİ
+        # ===============================
+        from kivy.uix.togglebutton import ToggleButton
+        from ui.movement_list import MovementList
+
+        filters = BoxLayout(size_hint_y=None, height=38, spacing=4)
+
+        self.type_btns = {}
+        for move_type, text in ((None, "Tümü"), ("IN", "Giriş"), ("OUT", "Çıkış")):
+            btn = ToggleButton(
+                text=text,
+                group="movement_type",
+                allow_no_selection=False,
+                size_hint_x=None,
+                width=64,
+                on_release=lambda x: self.load_movements()
+            )
+            self.type_btns[move_type] = btn
+            filters.add_widget(btn)
+        self.type_btns[None].state = "down"
+
+        self.start_input = TextInput(hint_text="Baş. YYYY-AA-GG", multiline=False)
+        self.end_input = TextInput(hint_text="Bitiş YYYY-AA-GG", multiline=False)
+        for w in (self.start_input, self.end_input):
+            w.bind(on_text_validate=lambda x: self.load_movements())
+            filters.add_widget(w)
+
+        filters.add_widget(Button(
+            text="🔍",
+            size_hint_x=None,
+            width=44,
+            on_release=lambda x: self.load_movements()
+        ))
+
+        root.add_widget(filters)
+
+        self.movements = MovementList()
+        root.add_widget(self.movements)
+
         self.add_widget(root)
 
     # ===============================
@@ -1085,6 +1332,11 @@ class ProductDetailScreen(Screen):
         add.load_for_edit(self.product_id)
         self.manager.current = "add"
 
+    def open_transfer(self):
+        from ui.location_popup import TransferPopup
+
+        TransferPopup(self.product_id, on_done=self.refresh).open()
+
     # ===============================
     # 🔁 DATA
     # ===============================
@@ -1138,15 +1390,190 @@ class ProductDetailScreen(Screen):
         self.add_row("Ürün Kodu", product["code"])
         self.add_row("Kategori", product["category"] or "-")
 
+        branches = db.get_product_stock(self.product_id)
+        if len(branches) > 1:
+            self.add_row("Şubeler", "  ".join(f"{b['name']}: {b['quantity']}" for b in branches))
+
         if product["created_at"]:
             dt = datetime.fromisoformat(product["created_at"])
             self.add_row("İlk Kayıt", dt.strftime("%d.%m.%Y %H:%M"))
 
         # ❌ Son Güncelleme KALDIRILDI
 
+        if product["expiry_date"]:
+            from ui.expiry_popup import expiry_text
+            self.add_row("Son Kullanma", expiry_text(product["expiry_date"]))
+
         if product["note"]:
             self.add_row("Not", product["note"])
 
+        self.load_movements()
+
+    def load_movements(self):
+        from kivy.uix.popup import Popup
+
+        move_type = next(t for t, b in self.type_btns.items() if b.state == "down")
+        try:
+            self.movements.load(
+                self.product_id,
+                move_type=move_type,
+                start=self.start_input.text.strip() or None,
+                end=self.end_input.text.strip() or None
+            )
+        except ValueError as e:
+            Popup(
+                title="Hata",
+                content=Label(text=str(e)),
+                size_hint=(0.8, None),
+                height=180
+            ).open()
+
+
+# ===============================
+# 📷 BARKOD OKUTMA
+# ===============================
+# El tipi okuyucu klavye gibi yazar ve Enter gönderir. Her okutma popup'sız
+# tek hareket: kod birebir aranır (db.get_product_by_code) ve seçili yönde
+# stoğa işlenir; kod alanı odağı hiç bırakmaz, okuyucu arka arkaya basabilir.
+SCAN_HISTORY = 30
+
+
+class ScanScreen(Screen):
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        from kivy.uix.togglebutton import ToggleButton
+
+        root = BoxLayout(
+            orientation="vertical",
+            padding=10,
+            spacing=8
+        )
+
+        # 🔝 ÜST BAR
+        top_bar = BoxLayout(size_hint_y=None, height=44, spacing=6)
+        top_bar.add_widget(Button(
+            text="← Geri",
+            size_hint_x=None,
+            width=90,
+            on_release=lambda x: setattr(self.manager, "current", "list")
+        ))
+        top_bar.add_widget(Label(text="📷 Barkod Okutma", font_size=18, bold=True))
+        root.add_widget(top_bar)
+
+        # ⬇️⬆️ YÖN + ADET
+        mode_row = BoxLayout(size_hint_y=None, height=44, spacing=6)
+        self.mode_btns = {}
+        for move_type, text, color in (
+            ("IN", "⬇️ Giriş", (0.18, 0.55, 0.18, 1)),
+            ("OUT", "⬆️ Çıkış", (0.75, 0.15, 0.15, 1)),
+        ):
+            btn = ToggleButton(
+                text=text,
+                group="scan_mode",
+                allow_no_selection=False,
+                background_color=color,
+                on_release=lambda x: self.focus_code()
+            )
+            self.mode_btns[move_type] = btn
+            mode_row.add_widget(btn)
+        self.mode_btns["OUT"].state = "down"
+
+        self.amount_input = TextInput(
+            text="1",
+            input_filter="int",
+            multiline=False,
+            size_hint_x=None,
+            width=80
+        )
+        mode_row.add_widget(self.amount_input)
+        root.add_widget(mode_row)
+
+        # 🔢 KOD
+        self.code_input = TextInput(
+            hint_text="Barkodu okutun",
+            multiline=False,
+            text_validate_unfocus=False,
+            font_size=20,
+            size_hint_y=None,
+            height=50
+        )
+        self.code_input.bind(on_text_validate=self.on_scan)
+        root.add_widget(self.code_input)
+
+        self.status = Label(
+            text="",
+            font_size=17,
+            bold=True,
+            size_hint_y=None,
+            height=48
+        )
+        root.add_widget(self.status)
+
+        # 🕘 SON OKUTMALAR (en yeni üstte)
+        scroll = ScrollView()
+        self.history = GridLayout(cols=1, spacing=2, size_hint_y=None)
+        self.history.bind(minimum_height=self.history.setter("height"))
+        scroll.add_widget(self.history)
+        root.add_widget(scroll)
+
+        self.add_widget(root)
+
+    def on_enter(self):
+        self.focus_code()
+
+    def focus_code(self, *args):
+        Clock.schedule_once(lambda dt: setattr(self.code_input, "focus", True))
+
+    def on_scan(self, instance):
+        code = instance.text.strip()
+        instance.text = ""
+        if not code:
+            return
+
+        move_type = "IN" if self.mode_btns["IN"].state == "down" else "OUT"
+        try:
+            amount = max(int(self.amount_input.text or 1), 1)
+        except ValueError:
+            amount = 1
+
+        try:
+            product = db.get_product_by_code(code)
+        except sqlite3.Error as e:
+            self.show(f"❌ {code}: {e}", ok=False)  # ör. veritabanı kilitli
+            return
+        if product is None:
+            self.show(f"❌ {code}: ürün bulunamadı", ok=False)
+            return
+
+        try:
+            if move_type == "IN":
+                quantity = db.stock_in(product["id"], amount)
+            else:
+                quantity = db.stock_out(product["id"], amount)
+        except (ValueError, sqlite3.Error) as e:
+            self.show(f"❌ {product['name']}: {e}", ok=False)
+            return
+
+        arrow = "⬇️" if move_type == "IN" else "⬆️"
+        self.show(f"{arrow} {product['name']} × {amount}  →  stok {quantity}")
+
+    def show(self, text, ok=True):
+        self.status.text = text
+        self.status.color = (0.5, 0.9, 0.5, 1) if ok else (1, 0.45, 0.45, 1)
+
+        self.history.add_widget(Label(
+            text=f"{datetime.now():%H:%M:%S}  {text}",
+            font_size=14,
+            color=(0.85, 0.85, 0.85, 1) if ok else (1, 0.45, 0.45, 1),
+            size_hint_y=None,
+            height=26
+        ), index=len(self.history.children))
+
+        if len(self.history.children) > SCAN_HISTORY:
+            self.history.remove_widget(self.history.children[0])
+
 
 # ===============================
 # ⚙️ SETTINGS / AYARLAR
@@ -1171,11 +1598,7 @@ class SettingsScreen(Screen):
         ))
 
         features = [
-            "🔒 Çoklu Cihaz",
-            "🔒 Şube Bazlı Stok",
-            "🔒 Otomatik Raporlar",
-            "🔒 Barkod Okutma",
-            "🔒 Kullanıcı Yetkileri"
+            "🔒 Otomatik Raporlar"
         ]
 
         for f in features:
@@ -1189,6 +1612,55 @@ class SettingsScreen(Screen):
             )
             root.add_widget(btn)
 
+        root.add_widget(Button(
+            text="📷 Barkod Okutma",
+            size_hint_y=None,
+            height=44,
+            on_release=lambda x: setattr(self.manager, "current", "scan")
+        ))
+
+        root.add_widget(Button(
+            text="📥 Ürünleri İçe Aktar (CSV / XLSX)",
+            size_hint_y=None,
+            height=44,
+            on_release=self.open_import
+        ))
+
+        root.add_widget(Button(
+            text="📤 Dışa Aktar (CSV / JSONL / Parquet)",
+            size_hint_y=None,
+            height=44,
+            on_release=self.open_export
+        ))
+
+        root.add_widget(Button(
+            text="🏬 Şubeler",
+            size_hint_y=None,
+            height=44,
+            on_release=self.open_locations
+        ))
+
+        root.add_widget(Button(
+            text="👤 Kullanıcılar",
+            size_hint_y=None,
+            height=44,
+            on_release=self.open_users
+        ))
+
+        root.add_widget(Button(
+            text="🔄 Çoklu Cihaz",
+            size_hint_y=None,
+            height=44,
+            on_release=self.open_sync
+        ))
+
+        root.add_widget(Button(
+            text="💾 Yedekler",
+            size_hint_y=None,
+            height=44,
+            on_release=self.open_backups
+        ))
+
         root.add_widget(Button(
             text="← Geri",
             size_hint_y=None,
@@ -1198,6 +1670,42 @@ class SettingsScreen(Screen):
 
         self.add_widget(root)
 
+    def open_import(self, *args):
+        from ui.import_popup import ImportPopup
+
+        ImportPopup(
+            on_done=lambda summary: self.manager.get_screen("list").refresh()
+        ).open()
+
+    def open_export(self, *args):
+        from ui.export_popup import ExportPopup
+
+        ExportPopup().open()
+
+    def open_locations(self, *args):
+        from ui.location_popup import LocationPopup
+
+        LocationPopup().open()
+
+    def open_users(self, *args):
+        from ui.user_popup import UsersPopup
+
+        UsersPopup().open()
+
+    def open_sync(self, *args):
+        from ui.sync_popup import SyncPopup
+
+        SyncPopup(
+            on_synced=lambda: self.manager.get_screen("list").refresh()
+        ).open()
+
+    def open_backups(self, *args):
+        from ui.backup_popup import BackupPopup
+
+        BackupPopup(
+            on_restored=lambda: self.manager.get_screen("list").refresh()
+        ).open()
+
 # ===============================
 # ℹ️ ABOUT
 # ===============================
@@ -1355,8 +1863,8 @@ class StockApp(App):
     title = "STOCKER"
 
     def build(self):
-        db.init_db()
-        db.init_settings()
+        db.migrate()
+        db.load_settings()
 
         sm = ScreenManager(transition=SlideTransition())
 
@@ -1366,10 +1874,99 @@ class StockApp(App):
         sm.add_widget(AboutScreen(name="about"))
         sm.add_widget(PrivacyScreen(name="privacy"))
         sm.add_widget(SettingsScreen(name="settings"))
+        sm.add_widget(ScanScreen(name="scan"))
 
         sm.current = "list"
+
+        # 🔑 Bir kullanıcının PIN'i varsa önce giriş
+        if db.login_required():
+            Clock.schedule_once(self.show_login)
+
+        # ⏰ SKT kontrolü: ilk kare çizildikten sonra, arka planda
+        Clock.schedule_once(self.check_expired, 1)
+
+        # 💾 Zamanlanmış yedek: açılıştan biraz sonra ve saatte bir kontrol
+        Clock.schedule_once(self.scheduled_backup, 30)
+        Clock.schedule_interval(self.scheduled_backup, 3600)
+
+        # 🔄 Çoklu cihaz: adres ayarlıysa açılışta ve düzenli aralıkla eşitle
+        import sync
+        Clock.schedule_once(self.scheduled_sync, 10)
+        Clock.schedule_interval(self.scheduled_sync, sync.SYNC_INTERVAL_MINUTES * 60)
+
         return sm
 
+    def show_login(self, *args):
+        from ui.user_popup import LoginPopup
+
+        LoginPopup(on_login=lambda: self.root.get_screen("list").refresh()).open()
+
+    def check_expired(self, *args):
+        import threading
+
+        def worker():
+            count = db.count_expired()
+            if count:
+                Clock.schedule_once(lambda dt: self.show_expired(count))
+
+        threading.Thread(target=worker, name="expiry-check", daemon=True).start()
+
+    def show_expired(self, count):
+        from kivy.uix.popup import Popup
+
+        box = BoxLayout(orientation="vertical", spacing=10, padding=10)
+        box.add_widget(Label(text=f"⚠️ Stokta {count} ürünün son kullanma tarihi geçmiş."))
+
+        popup = Popup(
+            title="Son Kullanma Tarihi",
+            content=box,
+            size_hint=(0.85, None),
+            height=220
+        )
+
+        buttons = BoxLayout(size_hint_y=None, height=44, spacing=8)
+        buttons.add_widget(Button(text="Kapat", on_release=popup.dismiss))
+        buttons.add_widget(Button(
+            text="Göster",
+            on_release=lambda x: (
+                popup.dismiss(),
+                self.root.get_screen("list").open_expiring()
+            )
+        ))
+        box.add_widget(buttons)
+
+        popup.open()
+
+    def scheduled_backup(self, *args):
+        import backup
+        from kivy.logger import Logger
+
+        backup.backup_in_background(
+            on_done=lambda path, error: Logger.info(
+                f"Backup: {error or path}"
+            )
+        )
+
+    def scheduled_sync(self, *args):
+        import sync
+        from kivy.logger import Logger
+
+        def done(summary, error):
+            Logger.info(f"Sync: {error or summary}")
+            if summary and summary["applied"]:
+                Clock.schedule_once(lambda dt: self.root.get_screen("list").refresh())
+
+        sync.sync_in_background(on_done=done)
+
+    def on_pause(self):
+        # 📱 Android arka plana atınca WAL'ı ana dosyaya aktar
+        db.checkpoint()
+        return True
+
+    def on_stop(self):
+        db.checkpoint("TRUNCATE")
+        db.close_connections()
+
 
 if __name__ == "__main__":
     StockApp().run()
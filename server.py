@@ -0,0 +1,561 @@
+import argparse
+import asyncio
+import functools
+import gzip
+import hmac
+import json
+import re
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlparse
+
+import db
+from sync_server import PULL_LIMIT, check_push
+
+
+# ===============================
+# 🖧 DÜKKAN SUNUCUSU (asyncio HTTP/JSON)
+# ===============================
+# db.py işlemlerini dükkan ağındaki tablet / kasalara açar; bulut gerekmez.
+#
+#   GET  /products?q=&limit=                 arama (q yoksa ilk sayfa; limit 1..MAX_LIMIT)
+#   GET  /products/{id}                      ürün
+#   GET  /products/code/{code}               barkod (birebir kod)
+#   GET  /products/{id}/movements?before_date=&before_id=&type=&start=&end=&limit=
+#   POST /products/{id}/in    {"amount", "description", "expiry_date", "unit_cost", "location_id"}
+#   POST /products/{id}/out   {"amount", "description", "policy", "location_id"}
+#   POST /movements           {"movements": [[id, type, amount, ...]], "atomic", "location_id", "policy"}
+#   POST /push, GET /pull     --hub verilirse sync.py merkezi (bkz. sync_server.py)
+#                             X-Sync-Token (--hub-token) veya stok giriş + çıkış izni ister
+#
+# 👤 Yazmalar X-User / X-Pin başlıklarındaki kullanıcı adına yapılır (yetki
+#    kontrolü ve hareket damgası, bkz. db USERS). Başlık yoksa uygulamadaki
+#    gibi: kimsenin PIN'i yoksa varsayılan yönetici, varsa 403.
+#
+# 📖 Okumalar READ_WORKERS thread'lik havuzda, her thread kendi bağlantısıyla
+#    (WAL: okuyucular yazarı beklemez).
+# ✍️ Yazmaların hepsi tek yazar thread'inden geçer. Kuyrukta biriken işler tek
+#    transaction'da commit edilir (grup commit): her iş kendi SAVEPOINT'inde
+#    çalışır, hatalı iş sadece kendini geri alır; diske yazma (fsync) grup
+#    başına bir kez olur. SQLite zaten tek yazarlıdır, kilit beklemesi olmaz.
+#    Stok uyarısı / önbellek silme gibi yan etkiler grubun commit'inden sonra
+#    çalışır (db._after_commit); commit başarısızsa hiç çalışmaz.
+# 🔀 Aynı bağlantıdan cevap beklemeden art arda gelen istekler (pipelining)
+#    birlikte işlenir; yazmalar kuyruğa, cevaplar bağlantıya geliş sırasıyla.
+#
+#   python server.py --port 8080 --hub sync_hub.db
+
+READ_WORKERS = 4
+GROUP_COMMIT_MAX = 64   # bir commit'teki en fazla yazma işi
+PIPELINE_DEPTH = 32     # bağlantı başına cevabı beklenen en fazla istek
+MAX_BODY = 8 * 1024 * 1024
+MAX_LIMIT = 1000        # ?limit= üst sınırı (arama, hareket sayfası)
+GZIP_MIN = 1024         # bundan küçük cevaplar sıkıştırılmaz
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HttpError(Exception):
+
+    def __init__(self, status, message=None):
+        super().__init__(message or STATUS_TEXT[status])
+        self.status = status
+
+
+class Request:
+
+    def __init__(self, method, target, headers, body, keep_alive):
+        url = urlparse(target)
+        self.user_id = None  # dispatch doldurur
+        self.previous = None  # aynı bağlantıdaki önceki isteğin `queued`'ı
+        self.queued = None    # yazması kuyruğa girince / istek bitince dolar
+        self.method = method
+        self.path = url.path
+        self.query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.headers = headers
+        self.body = body
+        self.keep_alive = keep_alive
+
+    def json(self):
+        if not self.body:
+            return {}
+        try:
+            body = json.loads(self.body)
+        except ValueError:
+            raise HttpError(400, "invalid JSON")
+        if not isinstance(body, dict):
+            raise HttpError(400, "JSON body must be an object")
+        return body
+
+
+async def read_request(reader):
+    # Bağlantı temiz kapandıysa None
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise HttpError(400, "header too large")
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "bad request line")
+
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HttpError(400, "bad Content-Length")
+    if length < 0:
+        raise HttpError(400, "bad Content-Length")
+    if length > MAX_BODY:
+        raise HttpError(413)
+    body = await reader.readexactly(length) if length else b""
+    if headers.get("content-encoding") == "gzip":
+        try:
+            body = gzip.decompress(body)
+        except (OSError, EOFError, zlib.error):  # BadGzipFile bir OSError
+            raise HttpError(400, "bad gzip body")
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return Request(method, target, headers, body, keep_alive)
+
+
+def render_response(status, body, keep_alive=True, gzip_ok=False):
+    data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+    headers = [
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+        "Content-Type: application/json; charset=utf-8",
+    ]
+    if gzip_ok and len(data) >= GZIP_MIN:
+        data = gzip.compress(data, compresslevel=5)
+        headers.append("Content-Encoding: gzip")
+    headers.append(f"Content-Length: {len(data)}")
+    headers.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + data
+
+
+def _int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, f"{name} must be an integer")
+
+
+def _limit(query, default, maximum=MAX_LIMIT):
+    limit = _int(query.get("limit", default), "limit")
+    if limit < 0:
+        raise HttpError(400, "limit must not be negative")
+    return min(max(limit, 1), maximum)
+
+
+def _optional(body, name, types):
+    # JSON'dan gelen isteğe bağlı alan: yok / null ya da beklenen tipte
+    value = body.get(name)
+    if value is not None and (not isinstance(value, types) or isinstance(value, bool)):
+        raise HttpError(400, f"invalid {name}")
+    return value
+
+
+def _rows(rows):
+    return [dict(row) for row in rows]
+
+
+def _mark_queued(request):
+    if request.queued is not None and not request.queued.done():
+        request.queued.set_result(None)
+
+
+# -------------------------------
+# ✍️ GRUP COMMIT
+# -------------------------------
+def _read(job):
+    # Okuma havuzu: fenced_connections() (geri yükleme) süren okumayı bekler
+    with db.reading():
+        return job()
+
+
+def _run_as(user_id, job):
+    if user_id is None:
+        return job()
+    with db.acting_user(user_id):
+        return job()
+
+
+def _require_sync_permissions():
+    db.require("stock.in")
+    db.require("stock.out")
+
+
+def _commit_group(jobs):
+    # Yazar thread'inde: [fn, ...] → [(ok, sonuç / hata), ...]
+    results = []
+    with db.transaction(immediate=True):
+        for fn in jobs:
+            try:
+                results.append((True, fn()))
+            except Exception as e:
+                results.append((False, e))
+    return results
+
+
+class StockServer:
+
+    def __init__(self, hub=None, hub_token=None):
+        self.hub = hub          # sync_server.SyncStore veya None
+        self.hub_token = hub_token
+        self.port = None
+        self.stats = {"requests": 0, "groups": 0, "writes": 0}
+        self._loop = None
+        self._stop = None
+        self._thread = None
+        self._readers = ThreadPoolExecutor(READ_WORKERS, thread_name_prefix="server-read")
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="server-write")
+        self._queue = None
+
+        self.routes = [
+            ("GET", re.compile(r"/products$"), self.search),
+            ("GET", re.compile(r"/products/(\d+)$"), self.product),
+            ("GET", re.compile(r"/products/code/([^/]+)$"), self.product_by_code),
+            ("GET", re.compile(r"/products/(\d+)/movements$"), self.movements),
+            ("POST", re.compile(r"/products/(\d+)/in$"), self.stock_in),
+            ("POST", re.compile(r"/products/(\d+)/out$"), self.stock_out),
+            ("POST", re.compile(r"/movements$"), self.apply_movements),
+        ]
+        if hub is not None:
+            self.routes += [
+                ("POST", re.compile(r"/push$"), self.hub_push),
+                ("GET", re.compile(r"/pull$"), self.hub_pull),
+            ]
+
+    # -------------------------------
+    # 🔁 OKU / YAZ
+    # -------------------------------
+    def read(self, fn, *args, **kwargs):
+        return self._loop.run_in_executor(self._readers, _read, functools.partial(fn, *args, **kwargs))
+
+    async def write(self, request, fn, *args, **kwargs):
+        # Aynı bağlantıdaki yazmalar geliş sırasıyla kuyruğa girer: önceki
+        # istek kuyruğa girene / bitene kadar beklenir (kimlik doğrulaması
+        # okuma havuzunda olduğu için sıra kendiliğinden korunmaz)
+        if request.previous is not None:
+            await asyncio.shield(request.previous)
+        future = self._loop.create_future()
+        job = functools.partial(fn, *args, **kwargs)
+        self._queue.put_nowait((functools.partial(_run_as, request.user_id, job), future))
+        _mark_queued(request)
+        return await future
+
+    async def _write_loop(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < GROUP_COMMIT_MAX and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                results = await self._loop.run_in_executor(
+                    self._writer, _commit_group, [fn for fn, _ in batch]
+                )
+            except Exception as e:
+                # commit başarısız: gruptaki hiçbir iş yazılmadı
+                results = [(False, e)] * len(batch)
+
+            self.stats["groups"] += 1
+            self.stats["writes"] += len(batch)
+            for (_, future), (ok, value) in zip(batch, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    # -------------------------------
+    # 📡 UÇ NOKTALAR
+    # -------------------------------
+    async def search(self, request):
+        limit = _limit(request.query, db.SEARCH_LIMIT)
+        text = request.query.get("q", "").strip()
+        if text:
+            rows = await self.read(db.search_products, text, limit)
+        else:
+            rows = await self.read(db.get_products_page, limit=limit)
+        return {"products": _rows(rows)}
+
+    async def product(self, request, product_id):
+        row = await self.read(db.get_product, int(product_id))
+        if row is None:
+            raise HttpError(404, "product not found")
+        return dict(row)
+
+    async def product_by_code(self, request, code):
+        row = await self.read(db.get_product_by_code, unquote(code))
+        if row is None:
+            raise HttpError(404, "product not found")
+        return dict(row)
+
+    async def movements(self, request, product_id):
+        q = request.query
+        after = None
+        if "before_date" in q:
+            after = (q["before_date"], _int(q.get("before_id"), "before_id"))
+        try:
+            start, end = db.day_bounds(q.get("start"), q.get("end"))
+        except ValueError as e:
+            raise HttpError(400, str(e))
+
+        rows = await self.read(
+            db.get_movements_page,
+            int(product_id),
+            after=after,
+            limit=_limit(q, db.MOVEMENT_PAGE_SIZE),
+            move_type=q.get("type"),
+            start=start,
+            end=end,
+        )
+        return {
+            "movements": _rows(rows),
+            "next": list(db.movement_cursor(rows[-1])) if rows else None,
+        }
+
+    async def stock_in(self, request, product_id):
+        body = request.json()
+        quantity = await self.write(
+            request,
+            db.stock_in,
+            int(product_id),
+            _int(body.get("amount"), "amount"),
+            _optional(body, "description", str),
+            expiry_date=_optional(body, "expiry_date", str),
+            unit_cost=_optional(body, "unit_cost", (int, float)),
+            location_id=_optional(body, "location_id", int),
+        )
+        return {"quantity": quantity}
+
+    async def stock_out(self, request, product_id):
+        body = request.json()
+        quantity = await self.write(
+            request,
+            db.stock_out,
+            int(product_id),
+            _int(body.get("amount"), "amount"),
+            _optional(body, "description", str),
+            policy=_optional(body, "policy", str),
+            location_id=_optional(body, "location_id", int),
+        )
+        return {"quantity": quantity}
+
+    async def apply_movements(self, request):
+        body = request.json()
+        movements = body.get("movements")
+        if not isinstance(movements, list):
+            raise HttpError(400, "movements must be a list")
+        # Bozuk satır grup commit'e girmeden reddedilir
+        for index, movement in enumerate(movements):
+            _, error = db.parse_movement(movement)
+            if error:
+                raise HttpError(400, f"movements[{index}]: {error}")
+        atomic = body.get("atomic", True)
+        if not isinstance(atomic, bool):
+            raise HttpError(400, "invalid atomic")
+
+        results = await self.write(
+            request,
+            db.apply_movements,
+            movements,
+            atomic=atomic,
+            policy=_optional(body, "policy", str),
+            location_id=_optional(body, "location_id", int),
+        )
+        return {"results": results}
+
+    async def _hub_auth(self, request):
+        # Merkeze yazılan her değişikliği tüm cihazlar uygular: cihaz anahtarı
+        # ya da stok giriş + çıkış izni olan kullanıcı gerekir
+        token = request.headers.get("x-sync-token", "")
+        if self.hub_token and hmac.compare_digest(token.encode("utf-8"), self.hub_token.encode("utf-8")):
+            return
+        await self.read(_run_as, request.user_id, _require_sync_permissions)
+
+    async def hub_push(self, request):
+        await self._hub_auth(request)
+        body = request.json()
+        error = check_push(body)
+        if error:
+            raise HttpError(400, error)
+        return {"accepted": await self.read(self.hub.push, body["origin"], body["changes"])}
+
+    async def hub_pull(self, request):
+        await self._hub_auth(request)
+        q = request.query
+        return await self.read(
+            self.hub.pull,
+            _int(q.get("since", 0), "since"),
+            q.get("origin", ""),
+            _limit(q, 1000, PULL_LIMIT),
+        )
+
+    async def dispatch(self, request):
+        self.stats["requests"] += 1
+        gzip_ok = "gzip" in request.headers.get("accept-encoding", "")
+        try:
+            if "x-user" in request.headers:
+                try:
+                    request.user_id = await self.read(
+                        db.authenticate, request.headers["x-user"], request.headers.get("x-pin", "")
+                    )
+                except ValueError as e:
+                    raise HttpError(401, str(e))
+            if request.method == "GET":
+                _mark_queued(request)  # okuma: sonraki yazmalar bunu beklemez
+
+            allowed = False
+            for method, pattern, handler in self.routes:
+                match = pattern.match(request.path)
+                if not match:
+                    continue
+                allowed = True
+                if method == request.method:
+                    body = await handler(request, *match.groups())
+                    return render_response(200, body, request.keep_alive, gzip_ok)
+            raise HttpError(405 if allowed else 404)
+        except HttpError as e:
+            status, message = e.status, str(e)
+        except db.PermissionDenied as e:
+            status, message = 403, str(e)
+        except ValueError as e:
+            message = str(e)
+            status = 404 if message == "product not found" else 400
+        except Exception as e:
+            status, message = 500, f"{type(e).__name__}: {e}"
+        finally:
+            _mark_queued(request)
+        return render_response(status, {"error": message}, request.keep_alive, gzip_ok)
+
+    # -------------------------------
+    # 🔌 BAĞLANTI
+    # -------------------------------
+    async def _respond(self, pending, writer):
+        # Cevaplar isteklerin geliş sırasıyla yazılır
+        while True:
+            item = await pending.get()
+            if item is None:
+                return
+            task, keep_alive = item
+            writer.write(await task)
+            await writer.drain()
+            if not keep_alive:
+                return
+
+    async def _handle(self, reader, writer):
+        pending = asyncio.Queue(PIPELINE_DEPTH)
+        responder = asyncio.create_task(self._respond(pending, writer))
+        previous = None
+        try:
+            while not responder.done():
+                try:
+                    request = await read_request(reader)
+                except HttpError as e:
+                    # bozuk istek: cevapla ve bağlantıyı kapat
+                    done = self._loop.create_future()
+                    done.set_result(render_response(e.status, {"error": str(e)}, False))
+                    await pending.put((done, False))
+                    break
+                if request is None:
+                    break
+                request.previous, request.queued = previous, self._loop.create_future()
+                previous = request.queued
+                await pending.put((asyncio.ensure_future(self.dispatch(request)), request.keep_alive))
+                if not request.keep_alive:
+                    break
+            await pending.put(None)
+            await responder
+        except (ConnectionError, asyncio.IncompleteReadError):
+            responder.cancel()
+        finally:
+            writer.close()
+
+    # -------------------------------
+    # ▶️ ÇALIŞTIR
+    # -------------------------------
+    async def run(self, host, port, ready=None):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._queue = asyncio.Queue()
+
+        db.migrate()
+        db.load_settings()
+
+        write_task = asyncio.create_task(self._write_loop())
+        server = await asyncio.start_server(self._handle, host, port, limit=64 * 1024)
+        self.port = server.sockets[0].getsockname()[1]
+        if ready:
+            ready.set()
+
+        async with server:
+            await self._stop.wait()
+        write_task.cancel()
+        self._readers.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+
+    def shutdown(self):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        if self._thread:
+            self._thread.join()
+
+
+def serve(host="127.0.0.1", port=0, hub=None, hub_token=None):
+    # Arka plan thread'inde başlar; dönüş (server, "http://host:port").
+    # Kapatmak için server.shutdown()
+    server = StockServer(hub, hub_token)
+    ready = threading.Event()
+    server._thread = threading.Thread(
+        target=lambda: asyncio.run(server.run(host, port, ready)),
+        name="stock-server",
+        daemon=True,
+    )
+    server._thread.start()
+    ready.wait()
+    return server, f"http://{host}:{server.port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stok HTTP sunucusu")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", help="veritabanı yolu (varsayılan: stok.db)")
+    parser.add_argument("--hub", help="senkronizasyon merkezi veritabanı (ör. sync_hub.db)")
+    parser.add_argument("--hub-token", help="cihazların X-Sync-Token anahtarı (sync.py ayarı)")
+    args = parser.parse_args()
+
+    if args.db:
+        db.DB_PATH = args.db
+
+    hub = None
+    if args.hub:
+        from sync_server import SyncStore
+        hub = SyncStore(args.hub)
+
+    print(f"🖧 http://{args.host}:{args.port} ({db.DB_PATH})")
+    try:
+        asyncio.run(StockServer(hub, args.hub_token).run(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,189 @@
+import argparse
+import gzip
+import json
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+
+import db
+
+
+# ===============================
+# 🔄 ÇOK CİHAZLI SENKRONİZASYON
+# ===============================
+# Her cihaz kendi change_log'unu merkeze (sync_server.py veya uyumlu bir
+# sunucu) gönderir, diğer cihazların değişikliklerini çeker. İki yönde de
+# sadece son imleçten (cursor) sonraki farklar gider; partiler gzip'li JSON.
+#
+#   POST {url}/push                  {"origin", "changes": [...]}
+#   GET  {url}/pull?since=&origin=&limit=
+#        → {"changes": [...], "cursor": n, "more": bool}
+#
+# Merkez yetkisiz cihazı reddeder: ayarlardaki anahtar (sync_token) her
+# istekte X-Sync-Token başlığıyla gider.
+#
+# İmleçler ayarlarda tutulur ve sadece parti başarıyla işlenince ilerler:
+# yarıda kesilen eşitleme bir sonraki denemede kaldığı yerden devam eder,
+# tekrar gelen değişiklik db.apply_remote_changes'te etkisizdir.
+# ⚠️ Yeni tablet boş veritabanıyla başlamalı; başka cihazın yedeğini geri
+# yüklemek cihaz kimliğini de kopyalar.
+
+SYNC_URL_KEY = "sync_url"
+SYNC_TOKEN_KEY = "sync_token"
+DEVICE_ID_KEY = "device_id"
+PUSH_CURSOR_KEY = "sync_push_cursor"
+PULL_CURSOR_KEY = "sync_pull_cursor"
+HLC_KEY = "sync_hlc"
+LAST_SYNC_KEY = "sync_last"
+
+SYNC_BATCH = 1000     # parti başına değişiklik
+SYNC_TIMEOUT = 30     # saniye
+SYNC_INTERVAL_MINUTES = 5
+
+_sync_lock = threading.Lock()
+
+
+def device_id():
+    value = db.get_setting(DEVICE_ID_KEY)
+    if not value:
+        value = uuid.uuid4().hex[:16]
+        db.set_setting(DEVICE_ID_KEY, value)
+    return value
+
+
+def sync_url():
+    return db.get_setting(SYNC_URL_KEY) or None
+
+
+# -------------------------------
+# 🌐 HTTP (gzip'li JSON)
+# -------------------------------
+def _request(url, body=None):
+    # Dönüş: (cevap, gönderilen bayt, alınan bayt)
+    data = gzip.compress(json.dumps(body, ensure_ascii=False).encode("utf-8")) if body is not None else None
+    request = urllib.request.Request(url, data=data, method="POST" if body is not None else "GET")
+    request.add_header("Accept-Encoding", "gzip")
+    token = db.get_setting(SYNC_TOKEN_KEY)
+    if token:
+        request.add_header("X-Sync-Token", token)
+    if data is not None:
+        request.add_header("Content-Type", "application/json")
+        request.add_header("Content-Encoding", "gzip")
+
+    with urllib.request.urlopen(request, timeout=SYNC_TIMEOUT) as response:
+        raw = response.read()
+        payload = gzip.decompress(raw) if response.headers.get("Content-Encoding") == "gzip" else raw
+
+    return json.loads(payload or b"null"), len(data or b""), len(raw)
+
+
+# -------------------------------
+# ⬆️ GÖNDER / ⬇️ ÇEK
+# -------------------------------
+def push(url, batch=SYNC_BATCH):
+    me = device_id()
+    cursor = int(db.get_setting(PUSH_CURSOR_KEY, 0))
+    summary = {"changes": 0, "bytes": 0}
+
+    while True:
+        changes, last = db.get_pending_changes(cursor, batch, me)
+        if last == cursor:
+            break
+        if changes:
+            _, sent, _ = _request(f"{url}/push", {"origin": me, "changes": changes})
+            summary["changes"] += len(changes)
+            summary["bytes"] += sent
+        cursor = last
+        db.set_setting(PUSH_CURSOR_KEY, cursor)
+
+    return summary
+
+
+def pull(url, batch=SYNC_BATCH):
+    me = device_id()
+    cursor = int(db.get_setting(PULL_CURSOR_KEY, 0))
+    summary = {"changes": 0, "applied": 0, "bytes": 0}
+
+    while True:
+        query = urllib.parse.urlencode({"since": cursor, "origin": me, "limit": batch})
+        page, _, received = _request(f"{url}/pull?{query}")
+        summary["bytes"] += received
+
+        if page["changes"]:
+            summary["applied"] += db.apply_remote_changes(page["changes"], me)
+            summary["changes"] += len(page["changes"])
+        cursor = page["cursor"]
+        db.set_setting(PULL_CURSOR_KEY, cursor)
+
+        if not page["more"]:
+            break
+
+    db.set_setting(HLC_KEY, db.hlc_now())
+    return summary
+
+
+def sync(url=None, batch=SYNC_BATCH):
+    # Önce gönder, sonra çek. Dönüş: {"pushed", "pulled", "applied", "bytes", "seconds"}
+    url = (url or sync_url() or "").rstrip("/")
+    if not url:
+        raise ValueError("Senkronizasyon adresi ayarlanmamış")
+
+    with _sync_lock:
+        start = time.perf_counter()
+
+        # Saat yeniden başlatmada geri gitse de damgalar ileri gider
+        db.hlc_observe(db.get_setting(HLC_KEY))
+        db.hlc_observe(db.last_change_hlc())
+
+        sent = push(url, batch)
+        received = pull(url, batch)
+
+        db.set_setting(LAST_SYNC_KEY, time.strftime("%Y-%m-%dT%H:%M:%S"))
+
+    return {
+        "pushed": sent["changes"],
+        "pulled": received["changes"],
+        "applied": received["applied"],
+        "bytes": sent["bytes"] + received["bytes"],
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def sync_in_background(on_done=None):
+    # Adres ayarlıysa arka planda eşitler; on_done(summary, error) worker'da çağrılır
+    if _sync_lock.locked() or not sync_url():
+        return False
+
+    def worker():
+        try:
+            summary, error = sync(), None
+        except Exception as e:
+            summary, error = None, e
+        if on_done:
+            on_done(summary, error)
+
+    threading.Thread(target=worker, name="sync", daemon=True).start()
+    return True
+
+
+# -------------------------------
+# 🖥️ KOMUT SATIRI
+# -------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stok senkronizasyonu")
+    parser.add_argument("--db", help="veritabanı yolu (varsayılan: stok.db)")
+    parser.add_argument("--url", help="sunucu adresi (varsayılan: ayarlardaki sync_url)")
+    args = parser.parse_args()
+
+    if args.db:
+        db.DB_PATH = args.db
+    db.migrate()
+
+    result = sync(args.url)
+    print(
+        f"✅ {result['pushed']} gönderildi, {result['pulled']} alındı "
+        f"({result['applied']} uygulandı), {result['bytes'] / 1024:.1f} KB, "
+        f"{result['seconds']:.2f} s"
+    )
@@ -0,0 +1,169 @@
+import argparse
+import gzip
+import hmac
+import json
+import sqlite3
+import zlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import db
+
+
+# ===============================
+# 🛰️ SENKRONİZASYON SUNUCUSU (yerel / test)
+# ===============================
+# sync.py'nin konuştuğu en basit merkez: değişiklikleri geldiği sırayla
+# saklar ve isteyen cihaza kendi gönderdikleri hariç imleçten sonrasını
+# verir. Birleştirme (çakışma çözümü) cihazlarda yapılır; sunucu sadece
+# sıralı bir kayıt defteridir. Dükkandaki bir bilgisayarda çalıştırılabilir:
+#
+#   python sync_server.py --port 8765 --db hub.db
+#
+# server.py --hub ile aynı merkezi stok API'siyle birlikte de sunar.
+# --token verilirse X-Sync-Token başlığı bu anahtar olmayan istek reddedilir.
+
+PULL_LIMIT = 5000
+
+
+class SyncStore:
+
+    def __init__(self, path=":memory:"):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                origin TEXT NOT NULL,
+                payload TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def push(self, origin, changes):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO changes (origin, payload) VALUES (?, ?)",
+                ((origin, json.dumps(c, ensure_ascii=False)) for c in changes),
+            )
+        return len(changes)
+
+    def pull(self, since, origin, limit):
+        limit = min(max(limit, 1), PULL_LIMIT)  # SQLite'ta LIMIT -1 sınırsızdır
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT seq, origin, payload FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+                (since, limit),
+            ).fetchall()
+
+        # İmleç taranan son satıra ilerler (kendi değişiklikleri dahil)
+        return {
+            "changes": [json.loads(p) for _, o, p in rows if o != origin],
+            "cursor": rows[-1][0] if rows else since,
+            "more": len(rows) == limit,
+        }
+
+
+def check_push(body):
+    # Dönüş: hata metni veya None (server.py --hub de aynı kuralları uygular)
+    if not isinstance(body, dict):
+        return "JSON body must be an object"
+    origin, changes = body.get("origin"), body.get("changes")
+    if not isinstance(origin, str) or not origin:
+        return "invalid origin"
+    if not isinstance(changes, list):
+        return "changes must be a list"
+    for index, change in enumerate(changes):
+        error = db.check_remote_change(change)
+        if error is None and change["origin"] != origin:
+            error = "origin mismatch"
+        if error:
+            return f"changes[{index}]: {error}"
+    return None
+
+
+class SyncHandler(BaseHTTPRequestHandler):
+    store = None  # serve() bağlar
+    token = None
+
+    def log_message(self, format, *args):
+        pass  # test / bench çıktısını kirletmesin
+
+    def _send(self, body, status=200):
+        data = gzip.compress(json.dumps(body, ensure_ascii=False).encode("utf-8"))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self):
+        if not self.token:
+            return True
+        given = self.headers.get("X-Sync-Token", "")
+        if hmac.compare_digest(given.encode("utf-8"), self.token.encode("utf-8")):
+            return True
+        self._send({"error": "invalid sync token"}, 403)
+        return False
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/push":
+            return self._send({"error": "not found"}, 404)
+        if not self._authorized():
+            return
+
+        try:
+            raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.headers.get("Content-Encoding") == "gzip":
+                raw = gzip.decompress(raw)
+            body = json.loads(raw)
+        except (ValueError, OSError, EOFError, zlib.error):
+            return self._send({"error": "bad request body"}, 400)
+        error = check_push(body)
+        if error:
+            return self._send({"error": error}, 400)
+        self._send({"accepted": self.store.push(body["origin"], body["changes"])})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/pull":
+            return self._send({"error": "not found"}, 404)
+        if not self._authorized():
+            return
+
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        try:
+            since = int(query.get("since", 0))
+            limit = int(query.get("limit", PULL_LIMIT))
+        except ValueError:
+            return self._send({"error": "since / limit must be integers"}, 400)
+        if limit < 0:
+            return self._send({"error": "limit must not be negative"}, 400)
+        self._send(self.store.pull(since, query.get("origin", ""), limit))
+
+
+def serve(host="127.0.0.1", port=0, path=":memory:", token=None):
+    # Arka plan thread'inde başlar; dönüş (server, "http://host:port").
+    # Kapatmak için server.shutdown()
+    handler = type("BoundSyncHandler", (SyncHandler,), {"store": SyncStore(path), "token": token})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="sync-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stok senkronizasyon sunucusu")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default="sync_hub.db")
+    parser.add_argument("--token", help="cihazların X-Sync-Token anahtarı")
+    args = parser.parse_args()
+
+    handler = type("BoundSyncHandler", (SyncHandler,), {"store": SyncStore(args.db), "token": args.token})
+    print(f"🛰️ http://{args.host}:{args.port} ({args.db})")
+    ThreadingHTTPServer((args.host, args.port), handler).serve_forever()
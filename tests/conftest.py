@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import bench  # noqa: E402
+import db  # noqa: E402
+
+
+@pytest.fixture
+def temp_db(tmp_path):
+    # Her test kendi geçici veritabanında (bench.py ile aynı kurulum)
+    bench.use_temp_db(tmp_path)
+    yield db.DB_PATH
+    db.close_connections()
@@ -0,0 +1,124 @@
+import socket
+import sqlite3
+from urllib.parse import urlparse
+
+import pytest
+
+import db
+import server
+from test_server import _raw_request, _read_response
+
+CASHIER_ROLE_ID = 3
+
+
+@pytest.fixture
+def users(temp_db):
+    # Yöneticiye PIN verilince giriş zorunlu olur
+    db.set_user_pin(db.DEFAULT_USER_ID, "0000")
+    with db.acting_user(db.DEFAULT_USER_ID):
+        cashier = db.add_user("kasiyer", CASHIER_ROLE_ID, "1234")
+        pid = db.add_product("A1", "Ayran", quantity=10)
+    yield {"cashier": cashier, "product": pid}
+    db.logout()
+
+
+def test_without_pins_everyone_acts_as_admin(temp_db):
+    assert not db.login_required()
+    assert db.current_user_id() == db.DEFAULT_USER_ID
+    pid = db.add_product("A1", "Ayran")
+    assert db.stock_in(pid, 3) == 3
+
+
+def test_login_is_enforced_once_a_pin_exists(users):
+    assert db.login_required()
+    with pytest.raises(db.PermissionDenied, match="Önce giriş yapın"):
+        db.stock_out(users["product"], 1)
+
+    with db.acting_user(db.DEFAULT_USER_ID):
+        nopin = db.add_user("pinsiz", CASHIER_ROLE_ID)
+    with pytest.raises(ValueError):
+        db.login("pinsiz", "")
+    with pytest.raises(ValueError):
+        db.login("kasiyer", "9999")
+    assert db.login("kasiyer", "1234") == users["cashier"]
+    assert nopin != users["cashier"]
+
+
+def test_no_pin_without_an_admin_pin(temp_db):
+    with db.acting_user(db.DEFAULT_USER_ID):
+        with pytest.raises(ValueError, match="Önce bir yöneticiye PIN verin"):
+            db.add_user("kasiyer", CASHIER_ROLE_ID, "1234")
+
+
+def test_cashier_permissions(users):
+    pid = users["product"]
+    with db.acting_user(users["cashier"]):
+        assert db.stock_out(pid, 1) == 9
+        with pytest.raises(db.PermissionDenied):
+            db.stock_in(pid, 1)
+        with pytest.raises(db.PermissionDenied):
+            db.add_product("A2", "Yasak")
+
+    # Miktarı düzenlemek de stok hareketi: ürün izni yetmez
+    with db.acting_user(db.DEFAULT_USER_ID):
+        db.set_role_permissions(CASHIER_ROLE_ID, ["product.edit"])
+    with db.acting_user(users["cashier"]):
+        product = db.get_product(pid)
+        with pytest.raises(db.PermissionDenied):
+            db.update_product(pid, product["code"], product["name"], product["category"],
+                              product["quantity"] + 5, product["note"])
+    assert db.get_product(pid)["quantity"] == 9
+
+
+def test_role_change_invalidates_the_cache(users):
+    with db.acting_user(users["cashier"]):
+        assert db.has_permission("stock.out")
+    with db.acting_user(db.DEFAULT_USER_ID):
+        db.set_role_permissions(CASHIER_ROLE_ID, [])
+    with db.acting_user(users["cashier"]):
+        assert not db.has_permission("stock.out")
+
+
+def test_changes_from_another_connection_are_seen(users, monkeypatch):
+    with db.acting_user(users["cashier"]):
+        assert db.has_permission("stock.out")
+    db.authenticate("kasiyer", "1234")  # önbellekte
+
+    # Başka süreç (ör. server.py) izni alır ve kullanıcıyı kapatır
+    other = sqlite3.connect(db.DB_PATH)
+    with other:
+        other.execute("DELETE FROM role_permissions WHERE role_id = ?", (CASHIER_ROLE_ID,))
+        other.execute("UPDATE users SET active = 0 WHERE id = ?", (users["cashier"],))
+    other.close()
+
+    # Giriş sürümü hemen kontrol eder, izin kontrolü AUTH_RECHECK_SECONDS'ta bir
+    with pytest.raises(ValueError):
+        db.authenticate("kasiyer", "1234")
+    monkeypatch.setattr(db, "AUTH_RECHECK_SECONDS", 0)
+    with db.acting_user(users["cashier"]):
+        assert not db.has_permission("stock.out")
+
+
+def test_server_returns_401_and_403(users):
+    srv, url = server.serve()
+    pid = users["product"]
+    cases = [
+        ({}, "out", 403),                                         # giriş yok
+        ({"X-User": "kasiyer", "X-Pin": "0000"}, "out", 401),     # yanlış PIN
+        ({"X-User": "kasiyer", "X-Pin": "1234"}, "in", 403),      # izin yok
+        ({"X-User": "kasiyer", "X-Pin": "1234"}, "out", 200),
+    ]
+    try:
+        address = urlparse(url)
+        with socket.create_connection((address.hostname, address.port), timeout=5) as sock:
+            sock.sendall(b"".join(
+                _raw_request("POST", f"/products/{pid}/{kind}", {"amount": 1}, headers)
+                for headers, kind, _ in cases
+            ))
+            stream = sock.makefile("rb")
+            statuses = [_read_response(stream)[0] for _ in cases]
+    finally:
+        srv.shutdown()
+
+    assert statuses == [status for _, _, status in cases]
+    assert db.get_product(pid)["quantity"] == 9
@@ -0,0 +1,35 @@
+import threading
+import time
+
+import backup
+import db
+
+
+def test_restore_waits_for_open_transactions(temp_db, tmp_path):
+    db.add_product("A", "Önce")
+    saved = backup.create_backup(tmp_path / "backups", compress=False)
+    db.add_product("B", "Sonra")
+
+    started = threading.Event()
+    errors = []
+
+    def writer():
+        try:
+            with db.transaction() as cur:
+                started.set()
+                time.sleep(0.2)  # geri yükleme bu transaction'ı beklemeli
+                cur.execute(
+                    "INSERT INTO products (code, name, created_at) VALUES ('C', 'Yarıda', '')"
+                )
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    started.wait(5)
+    backup.restore_backup(saved)
+    thread.join()
+
+    assert errors == []
+    codes = [row[0] for row in db.get_connection().execute("SELECT code FROM products ORDER BY code")]
+    assert codes == ["A"]
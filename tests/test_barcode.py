@@ -0,0 +1,49 @@
+import db
+
+
+def test_lookup_is_exact(temp_db):
+    pid = db.add_product("8690000000011", "Süt")
+    db.add_product("86900000000111", "Süt 1L")
+
+    assert db.get_product_by_code("8690000000011")["id"] == pid
+    assert db.get_product_by_code("  8690000000011\n")["id"] == pid  # okuyucunun Enter'ı
+    assert db.get_product_by_code("869000000001") is None            # önek eşleşmez
+    assert db.get_product_by_code("") is None
+    assert db.get_product_by_code(None) is None
+
+
+def test_cache_follows_code_changes(temp_db):
+    a = db.add_product("A1", "Elma")
+    b = db.add_product("B1", "Armut")
+    assert db.get_product_by_code("A1")["id"] == a  # önbelleğe girer
+
+    product = db.get_product(a)
+    db.update_product(a, "A2", product["name"], product["category"], product["quantity"],
+                      product["note"])
+    assert db.get_product_by_code("A1") is None
+    assert db.get_product_by_code("A2")["id"] == a
+
+    # Boşalan kod başka ürüne geçerse eski id dönmez
+    product = db.get_product(b)
+    db.update_product(b, "A1", product["name"], product["category"], product["quantity"],
+                      product["note"])
+    assert db.get_product_by_code("A1")["id"] == b
+
+
+def test_cache_forgets_deleted_products(temp_db):
+    pid = db.add_product("D1", "Silinecek")
+    assert db.get_product_by_code("D1")["id"] == pid
+
+    db.delete_product(pid)
+    assert db.get_product_by_code("D1") is None
+
+    again = db.add_product("D1", "Yeniden")
+    assert db.get_product_by_code("D1")["id"] == again
+
+
+def test_cached_hit_sees_fresh_quantity(temp_db):
+    pid = db.add_product("Q1", "Un")
+    assert db.get_product_by_code("Q1")["quantity"] == 0
+
+    db.stock_in(pid, 7)
+    assert db.get_product_by_code("Q1")["quantity"] == 7
@@ -0,0 +1,46 @@
+import db
+
+
+def test_atomic_batch_is_all_or_nothing(temp_db):
+    a = db.add_product("A", "Elma")
+    b = db.add_product("B", "Armut", quantity=2)
+
+    results = db.apply_movements([(a, "IN", 5), (b, "OUT", 3)])
+
+    assert [r["error"] for r in results] == ["batch rejected", "insufficient stock"]
+    assert not any(r["ok"] for r in results)
+    assert (db.get_product(a)["quantity"], db.get_product(b)["quantity"]) == (0, 2)
+
+
+def test_best_effort_applies_good_lines_in_order(temp_db):
+    a = db.add_product("A", "Elma")
+    results = db.apply_movements([
+        (a, "IN", 5, "palet"),
+        (a, "OUT", 3),           # aynı partide önce gelen girişten çıkar
+        (a, "OUT", 9),
+        (999, "IN", 1),
+        (a, "IN", "5"),          # bozuk satır partiyi bozmaz
+        (a, "IN", 1, None, None, None, "fazla"),
+    ], atomic=False)
+
+    assert [(r["ok"], r["quantity"], r["error"]) for r in results] == [
+        (True, 5, None),
+        (True, 2, None),
+        (False, None, "insufficient stock"),
+        (False, None, "product not found"),
+        (False, None, "amount must be an integer"),
+        (False, None, "invalid movement line"),
+    ]
+    assert db.get_product(a)["quantity"] == 2
+    assert len(db.get_movements(a)) == 2
+    assert db.check_stock() == [] and db.check_lots() == []
+
+
+def test_parse_movement_rejects_bad_types():
+    assert db.parse_movement([1, "IN", 2]) == ((1, "IN", 2, None, None, None), None)
+    assert db.parse_movement([True, "IN", 2])[1] == "invalid product id"
+    assert db.parse_movement([1, "MOVE", 2])[1] == "invalid movement type"
+    assert db.parse_movement([1, "IN", 0])[1] == "amount must be > 0"
+    assert db.parse_movement([1, "IN", db.MAX_QUANTITY + 1])[1] == "amount too large"
+    assert db.parse_movement([1, "IN", 1, 5])[1] == "invalid description"
+    assert db.parse_movement("1,IN,2")[1] == "invalid movement line"
@@ -0,0 +1,87 @@
+import threading
+
+import db
+
+
+def _journal_mode():
+    return db.get_connection().execute("PRAGMA journal_mode").fetchone()[0]
+
+
+def test_profile_switch_waits_for_open_transactions(temp_db):
+    ready, done = threading.Event(), threading.Event()
+    seen = {}
+
+    def worker():
+        conn = db.get_connection()
+        with db.transaction() as cur:
+            ready.set()
+            done.wait(0.2)  # profil değişimi bu transaction'ı beklemeli
+            cur.execute("SELECT COUNT(*) FROM products").fetchone()
+            seen["same_in_transaction"] = db.get_connection() is conn
+            seen["finished_first"] = not switched.is_set()
+        seen["reopened"] = db.get_connection() is not conn
+
+    switched = threading.Event()
+    thread = threading.Thread(target=worker)
+    thread.start()
+    ready.wait(5)
+    db.set_setting(db.STORAGE_PROFILE_KEY, "fast")
+    switched.set()
+    thread.join()
+
+    assert seen == {"same_in_transaction": True, "finished_first": True, "reopened": True}
+    assert db.get_storage_profile() == "fast"
+
+
+def test_leaving_wal_while_another_thread_holds_a_connection(temp_db):
+    db.set_setting(db.STORAGE_PROFILE_KEY, "balanced")
+    assert _journal_mode() == "wal"
+
+    opened, release = threading.Event(), threading.Event()
+    errors = []
+
+    def holder():
+        # Boşta duran WAL bağlantısı: önce "database is locked" ile açılış bozuluyordu
+        db.get_connection().execute("SELECT COUNT(*) FROM products").fetchone()
+        opened.set()
+        release.wait(5)
+        try:
+            db.get_connection().execute("SELECT COUNT(*) FROM products").fetchone()
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    opened.wait(5)
+    db.set_setting(db.STORAGE_PROFILE_KEY, "safe")
+
+    assert _journal_mode() == "delete"
+    db.add_product("S1", "Güvenli")
+    release.set()
+    thread.join()
+
+    assert errors == []
+    assert db.get_storage_profile() == "safe"
+
+
+def test_fence_waits_for_plain_readers(temp_db):
+    for i in range(5):
+        db.add_product(f"R{i}", "Okuma")
+
+    rows = db.iter_products(chunk_size=2)
+    first = next(rows)  # dışa aktarma yarıda: imleç açık
+    fenced = threading.Event()
+
+    def fence():
+        with db.fenced_connections():
+            fenced.set()
+
+    thread = threading.Thread(target=fence)
+    thread.start()
+    assert not fenced.wait(0.2)  # okuma bitmeden bağlantılar kapatılmaz
+
+    rest = [row for chunk in rows for row in chunk]
+    thread.join(5)
+
+    assert fenced.is_set()
+    assert len(first) + len(rest) == 5
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+import db
+import exporter
+import importer
+
+
+def test_products_csv_round_trips_through_the_importer(temp_db, tmp_path):
+    db.add_product("A1", "Süt; tam yağlı", category="Kahvaltı", quantity=3)
+    db.add_product("A2", "Peynir", quantity=1, expiry_date="2030-01-31")
+    path = tmp_path / "urunler.csv"
+
+    summary = exporter.export_products(path)
+
+    assert summary == {"rows": 2, "path": str(path), "cancelled": False}
+    rows = list(importer.read_csv(path))
+    assert [(row["code"], row["name"]) for _, row in rows] == [
+        ("A1", "Süt; tam yağlı"), ("A2", "Peynir"),
+    ]
+
+
+def test_movements_jsonl_with_filters(temp_db, tmp_path):
+    a = db.add_product("A1", "Süt")
+    b = db.add_product("B1", "Ekmek")
+    db.stock_in(a, 5)
+    db.stock_out(a, 2)
+    db.stock_in(b, 7)
+    path = tmp_path / "hareketler.json"
+
+    summary = exporter.export_movements(path, product_ids=[a])
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert summary["rows"] == 2
+    assert [(m["product_code"], m["type"], m["amount"]) for m in lines] == [("A1", "IN", 5), ("A1", "OUT", 2)]
+    assert set(lines[0]) == set(db.MOVEMENT_EXPORT_COLUMNS)
+    assert exporter.export_movements(path, start="2000-01-01", end="2000-01-02")["rows"] == 0
+
+
+def test_cancel_and_bad_format_leave_no_file(temp_db, tmp_path):
+    db.add_product("A1", "Süt")
+    out = tmp_path / "export"
+    out.mkdir()
+
+    summary = exporter.export_products(out / "urunler.csv", cancel=lambda: True)
+    assert summary["cancelled"]
+    assert list(out.iterdir()) == []  # .part dosyası da silinir
+
+    with pytest.raises(ValueError):
+        exporter.export_products(out / "urunler.xls")
+    assert list(out.iterdir()) == []
+
+
+def test_parquet_types(temp_db, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    db.add_product("A1", "Süt", quantity=3)
+    path = tmp_path / "urunler.parquet"
+
+    exporter.export_products(path)
+
+    table = pq.read_table(path)
+    assert str(table.schema.field("quantity").type) == "int64"
+    assert table.column("code").to_pylist() == ["A1"]
@@ -0,0 +1,24 @@
+import db
+import importer
+
+
+def test_rows_rejected_by_the_database_are_reported(temp_db, tmp_path):
+    pid = db.add_product("P1", "Süt")
+    db.stock_in(pid, 5, location_id=db.add_location("Şube 2"))
+
+    path = tmp_path / "urunler.csv"
+    path.write_text(
+        "kod,ad,miktar\n"
+        "P1,Süt,2\n"      # diğer şubedeki 5 adedin altına inemez
+        "P2,Yağ,7\n"
+        "P3,,1\n",        # ad boş: doğrulama hatası
+        encoding="utf-8",
+    )
+    summary = importer.import_products(path, chunk_size=1)
+
+    assert summary["imported"] == 1
+    assert summary["failed"] == 2
+    assert [line for line, _ in summary["errors"]] == [2, 4]
+    assert summary["errors"][0][1] == "Miktar diğer şubelerdeki stoktan az olamaz"
+    assert db.get_product(pid)["quantity"] == 5
+    assert db.get_product_by_code("P2")["quantity"] == 7
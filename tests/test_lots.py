@@ -0,0 +1,62 @@
+import pytest
+
+import db
+
+
+def _receive(pid):
+    # Geç SKT'li lot önce, yakın SKT'li lot sonra gelir: FIFO ile FEFO ayrışır
+    db.stock_in(pid, 3, expiry_date="2031-06-30", unit_cost=10)
+    db.stock_in(pid, 4, expiry_date="2030-01-31", unit_cost=12)
+    db.stock_in(pid, 2, unit_cost=5)  # SKT'siz lot FEFO'da en sona kalır
+
+
+def _last_out(pid):
+    return db.get_movements(pid)[0]["id"]
+
+
+def test_fifo_consumes_oldest_lot_first(temp_db):
+    pid = db.add_product("P1", "Süt")
+    _receive(pid)
+
+    db.stock_out(pid, 5, policy="FIFO")
+
+    lots = db.get_movement_lots(_last_out(pid))
+    consumed = [(r["expiry_date"], r["quantity"], r["cost"]) for r in lots]
+    assert consumed == [("2031-06-30", 3, 30), ("2030-01-31", 2, 24)]
+    assert [r["remaining"] for r in db.get_open_lots(pid, policy="FIFO")] == [2, 2]
+    assert db.check_lots() == []
+
+
+def test_fefo_consumes_nearest_expiry_first(temp_db):
+    pid = db.add_product("P1", "Süt")
+    _receive(pid)
+
+    db.stock_out(pid, 5, policy="FEFO")
+
+    consumed = [(r["expiry_date"], r["quantity"]) for r in db.get_movement_lots(_last_out(pid))]
+    assert consumed == [("2031-06-30", 1), ("2030-01-31", 4)]
+    open_lots = db.get_open_lots(pid, policy="FEFO")
+    assert [(r["expiry_date"], r["remaining"]) for r in open_lots] == [("2031-06-30", 2), (None, 2)]
+    # Ürünün SKT'si açık lotlar içindeki en yakın tarihe çekilir
+    assert db.get_product(pid)["expiry_date"] == "2031-06-30"
+    assert db.check_lots() == []
+
+
+def test_default_policy_comes_from_settings(temp_db):
+    pid = db.add_product("P1", "Süt")
+    _receive(pid)
+
+    db.set_setting(db.LOT_POLICY_KEY, "FIFO")
+    db.stock_out(pid, 1)
+
+    assert [r["expiry_date"] for r in db.get_movement_lots(_last_out(pid))] == ["2031-06-30"]
+
+
+def test_unknown_policy_is_rejected(temp_db):
+    pid = db.add_product("P1", "Süt", quantity=1)
+
+    with pytest.raises(ValueError):
+        db.get_open_lots(pid, policy="LIFO")
+    with pytest.raises(ValueError):
+        db.stock_out(pid, 1, policy="LIFO")
+    assert db.get_product(pid)["quantity"] == 1
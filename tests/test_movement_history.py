@@ -0,0 +1,22 @@
+import db
+from ui.movement_model import MovementHistoryModel
+
+
+def test_quantity_edit_keeps_running_balance(temp_db):
+    pid = db.add_product("H1", "Geçmiş", quantity=10)  # açılış: düzeltme hareketi
+    db.stock_in(pid, 5)
+    product = db.get_product(pid)
+    db.update_product(pid, product["code"], product["name"], product["category"], 12, product["note"])
+    db.stock_out(pid, 2)
+
+    data = []
+    model = MovementHistoryModel()
+    model.reset(data, db.get_balance_before(pid))
+    model.append(data, db.get_movements_page(pid, limit=100))
+
+    # En yeniden eskiye: her satırın bakiyesi o hareketten sonraki stok
+    assert [row["balance"] for row in data] == [10, 12, 15, 10]
+    assert [(row["type"], row["amount"]) for row in data] == [
+        ("OUT", 2), ("OUT", 3), ("IN", 5), ("IN", 10),
+    ]
+    assert model.balance == 0  # ilk hareketten önce stok yoktu
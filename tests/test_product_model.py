@@ -0,0 +1,20 @@
+import db
+from ui.product_model import ProductListModel
+
+
+def test_refresh_after_import_fetches_only_new_changes(temp_db):
+    # İçe aktarma tüm ürünlere aynı updated_at'i yazar
+    db.upsert_products([(f"P{i}", f"Ürün {i}", None, 1, None, None, None) for i in range(50)])
+
+    data = []
+    model = ProductListModel()
+    model.sync(data, db.get_products_page(limit=100))
+    assert db.get_products_changed_since(model.synced_at) == []
+
+    product = db.get_product_by_code("P7")
+    db.stock_in(product["id"], 2)
+    changed = db.get_products_changed_since(model.synced_at)
+    assert [p["code"] for p in changed] == ["P7"]
+
+    assert model.patch(data, changed)
+    assert db.get_products_changed_since(model.synced_at) == []
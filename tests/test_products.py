@@ -0,0 +1,44 @@
+import db
+
+
+def test_edit_without_optional_fields_keeps_them(temp_db):
+    pid = db.add_product("P1", "Süt", quantity=4, reorder_level=3, expiry_date="2030-01-31")
+    product = db.get_product(pid)
+
+    # Eski 6 argümanlı çağrı (main.py kaydet / sil, bench) yalnız verilen alanları yazar
+    db.update_product(pid, product["code"], "Yağlı süt", product["category"], 6, product["note"])
+
+    product = db.get_product(pid)
+    assert (product["name"], product["quantity"]) == ("Yağlı süt", 6)
+    assert product["reorder_level"] == 3
+    assert product["expiry_date"] == "2030-01-31"
+
+
+def test_edit_can_clear_optional_fields(temp_db):
+    pid = db.add_product("P1", "Süt", reorder_level=3, expiry_date="2030-01-31")
+    product = db.get_product(pid)
+
+    db.update_product(pid, product["code"], product["name"], product["category"],
+                      product["quantity"], product["note"], reorder_level=None, expiry_date=None)
+
+    product = db.get_product(pid)
+    assert product["reorder_level"] is None
+    assert product["expiry_date"] is None
+
+
+def test_import_reports_rejected_rows_and_keeps_the_rest(temp_db):
+    pid = db.add_product("P1", "Süt")
+    branch = db.add_location("Şube 2")
+    db.stock_in(pid, 5, location_id=branch)  # P1: 5 adet diğer şubede
+
+    rows = [
+        ("P1", "Süt", None, 2, None, None, None),    # 5'in altına inemez
+        ("P2", "Yağ", None, 7, None, None, None),
+    ]
+    count, errors = db.upsert_products(rows)
+
+    assert count == 1
+    assert errors == [(0, "Miktar diğer şubelerdeki stoktan az olamaz")]
+    assert db.get_product(pid)["quantity"] == 5
+    assert db.get_product_by_code("P2")["quantity"] == 7
+    assert db.check_stock() == []
@@ -0,0 +1,20 @@
+import pytest
+
+import bench
+import db
+
+
+@pytest.fixture(scope="module")
+def plan_ids(tmp_path_factory):
+    bench.use_temp_db(tmp_path_factory.mktemp("plans"))
+    yield bench.seed_plan_db()
+    db.close_connections()
+
+
+@pytest.mark.parametrize("name", [name for name, _ in bench.plan_cases([None, None])])
+def test_queries_use_indexes(plan_ids, name):
+    fn = dict(bench.plan_cases(plan_ids))[name]
+    plans = bench.query_plans(fn)
+    assert plans, "sorgu çalışmadı"
+    bad = [(plan, steps) for plan, steps in plans if steps]
+    assert not bad, f"tam tarama veya geçici sıralama: {bad}"
@@ -0,0 +1,66 @@
+import db
+
+
+def _move_dates(cur, dates):
+    # Hareketleri farklı günlere dağıt (tetikleyicinin UPDATE yolu)
+    for movement_id, date in dates.items():
+        cur.execute("UPDATE stock_movements SET date = ? WHERE id = ?", (date, movement_id))
+
+
+def test_rollups_follow_movements(temp_db):
+    a = db.add_product("A", "Elma", category="Meyve")
+    b = db.add_product("B", "Süt", category="Süt")
+
+    db.stock_in(a, 10)
+    db.stock_out(a, 3)
+    db.apply_movements([(b, "IN", 4), (b, "OUT", 1), (a, "IN", 2)])
+
+    assert db.check_rollups() == []
+    assert dict(db.get_product_totals(a)) == {"in_qty": 12, "out_qty": 3, "count": 3}
+    assert dict(db.get_product_totals(b)) == {"in_qty": 4, "out_qty": 1, "count": 2}
+    assert db.get_product_totals(999) == {"in_qty": 0, "out_qty": 0, "count": 0}
+
+    categories = {r["category"]: (r["in_qty"], r["out_qty"]) for r in db.get_category_totals()}
+    assert categories == {"Meyve": (12, 3), "Süt": (4, 1)}
+
+
+def test_daily_rollups_split_by_day_and_survive_deletes(temp_db):
+    a = db.add_product("A", "Elma")
+    db.stock_in(a, 5)
+    db.stock_in(a, 2)
+    db.stock_out(a, 4)
+    ids = [m["id"] for m in db.get_movements(a, order="ASC")]
+    with db.transaction() as cur:
+        _move_dates(cur, {ids[0]: "2024-01-01T09:00:00", ids[1]: "2024-01-02T09:00:00",
+                          ids[2]: "2024-01-02T18:00:00"})
+
+    days = [tuple(r) for r in db.get_daily_movements(product_id=a)]
+    assert days == [("2024-01-01", 5, 0, 1), ("2024-01-02", 2, 4, 2)]
+    assert [tuple(r) for r in db.get_daily_movements("2024-01-02", "2024-01-02")] == [
+        ("2024-01-02", 2, 4, 2),
+    ]
+    in_range = db.get_category_totals("2024-01-02", "2024-01-31")
+    assert [(r["in_qty"], r["out_qty"]) for r in in_range] == [(2, 4)]
+
+    with db.transaction() as cur:
+        cur.execute("DELETE FROM stock_movements WHERE id = ?", (ids[0],))
+
+    # Boşalan gün satırı silinir, toplamlar düşer
+    assert [r["day"] for r in db.get_daily_movements(product_id=a)] == ["2024-01-02"]
+    assert db.get_product_totals(a)["in_qty"] == 2
+    assert db.check_rollups() == []
+
+
+def test_rebuild_repairs_drifted_rollups(temp_db):
+    a = db.add_product("A", "Elma")
+    db.stock_in(a, 5)
+    db.stock_out(a, 1)
+
+    with db.transaction() as cur:
+        cur.execute("UPDATE movement_totals SET in_qty = 99")
+        cur.execute("DELETE FROM movement_days")
+    assert db.check_rollups() != []
+
+    assert db.rebuild_rollups() == 1
+    assert db.check_rollups() == []
+    assert dict(db.get_product_totals(a)) == {"in_qty": 5, "out_qty": 1, "count": 2}
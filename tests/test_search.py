@@ -0,0 +1,39 @@
+import db
+
+
+def test_turkish_folding_and_short_terms(temp_db):
+    db.add_product("S1", "Süt İnegöl")
+    db.add_product("C1", "Çikolata ılık")
+    db.add_product("K1", "Kahve")
+    db.add_product("I1", "İndirim %50")
+
+    assert [p["code"] for p in db.search_products("sut inegol")] == ["S1"]
+    assert [p["code"] for p in db.search_products("ÇİKOLATA")] == ["C1"]
+    assert [p["code"] for p in db.search_products("ilik")] == ["C1"]
+    assert [p["code"] for p in db.search_products("ka")] == ["K1"]  # trigram altı
+    assert [p["code"] for p in db.search_products("%")] == ["I1"]  # LIKE joker değil
+    assert db.search_products("zzz") == []
+    assert db.search_products("   ") == []
+
+
+def test_edits_and_deletes_reach_the_index(temp_db):
+    pid = db.add_product("E1", "Eski isim")
+    product = db.get_product(pid)
+    db.update_product(pid, "E1", "Yeni isim", product["category"], product["quantity"], product["note"])
+
+    assert db.search_products("eski") == []
+    assert [p["id"] for p in db.search_products("yeni")] == [pid]
+
+    db.delete_product(pid)
+    assert db.search_products("yeni") == []
+
+
+def test_exact_code_ranks_first_beyond_the_candidate_limit(temp_db):
+    db.upsert_products([
+        (f"X{i:05d}", f"Ciko çeşit {i}", None, 0, None, None, None)
+        for i in range(db.SEARCH_CANDIDATES + 50)
+    ])
+    db.add_product("CIKO", "Yeni ürün")  # en yüksek rowid: FTS adaylarının dışında
+
+    assert [p["code"] for p in db.search_products("ciko", 5)][:1] == ["CIKO"]
+    assert len(db.search_products("ciko", 5)) == 5
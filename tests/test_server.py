@@ -0,0 +1,89 @@
+import json
+import socket
+import urllib.error
+import urllib.request
+from urllib.parse import urlparse
+
+import pytest
+
+import db
+import server
+
+
+def _get(url, path):
+    try:
+        with urllib.request.urlopen(url + path, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def _raw_request(method, path, body, headers):
+    data = json.dumps(body).encode("utf-8")
+    lines = [f"{method} {path} HTTP/1.1", "Host: test", f"Content-Length: {len(data)}"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8") + data
+
+
+def _read_response(stream):
+    status = int(stream.readline().split()[1])
+    length = 0
+    while (line := stream.readline().strip()):
+        name, value = line.decode("latin-1").split(":", 1)
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(stream.read(length))
+
+
+@pytest.fixture
+def stock_server(temp_db):
+    srv, url = server.serve()
+    yield url
+    srv.shutdown()
+
+
+def test_pipelined_writes_are_applied_in_arrival_order(temp_db):
+    db.set_user_pin(db.DEFAULT_USER_ID, "0000")
+    with db.acting_user(db.DEFAULT_USER_ID):
+        db.add_user("yavas", 1, "1111")
+        db.add_user("hizli", 1, "2222")
+        pid = db.add_product("S1", "Sıralı")
+    db.authenticate("hizli", "2222")  # önbellekte: kimlik doğrulaması hemen biter
+
+    srv, url = server.serve()
+    try:
+        address = urlparse(url)
+        with socket.create_connection((address.hostname, address.port), timeout=5) as sock:
+            # Giriş (PIN'i PBKDF2 ile doğrulanır) çıkıştan önce gelir, önce uygulanmalı
+            sock.sendall(
+                _raw_request("POST", f"/products/{pid}/in", {"amount": 5},
+                             {"X-User": "yavas", "X-Pin": "1111"})
+                + _raw_request("POST", f"/products/{pid}/out", {"amount": 5},
+                               {"X-User": "hizli", "X-Pin": "2222"})
+            )
+            stream = sock.makefile("rb")
+            responses = [_read_response(stream), _read_response(stream)]
+    finally:
+        srv.shutdown()
+
+    assert responses == [(200, {"quantity": 5}), (200, {"quantity": 0})]
+
+
+def test_limit_is_clamped_and_negative_limit_rejected(stock_server):
+    db.upsert_products([(f"L{i:04d}", f"Ürün {i}", None, 0, None, None, None)
+                        for i in range(server.MAX_LIMIT + 10)])
+
+    assert _get(stock_server, "/products?limit=-1")[0] == 400
+    status, body = _get(stock_server, "/products?limit=0")
+    assert (status, len(body["products"])) == (200, 1)
+    status, body = _get(stock_server, "/products?limit=1000000")
+    assert (status, len(body["products"])) == (200, server.MAX_LIMIT)
+    assert _get(stock_server, "/products/1/movements?limit=-5")[0] == 400
+
+
+def test_product_by_code_is_exact(stock_server):
+    pid = db.add_product("8690000000011", "Süt")
+
+    status, body = _get(stock_server, "/products/code/8690000000011")
+    assert (status, body["id"]) == (200, pid)
+    assert _get(stock_server, "/products/code/869000000001")[0] == 404
@@ -0,0 +1,101 @@
+import gzip
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+import db
+import server
+from sync_server import SyncStore
+
+
+def _movement(amount=1000):
+    return {
+        "entity": "movement",
+        "gid": "mov-1",
+        "hlc": "0000000000001-0000-dev-b",
+        "origin": "dev-b",
+        "data": {
+            "product": "prod-1",
+            "location": "loc-1",
+            "type": "IN",
+            "amount": amount,
+            "date": "2024-01-01 10:00:00",
+        },
+    }
+
+
+def _read(response):
+    raw = response.read()
+    if response.headers.get("Content-Encoding") == "gzip":
+        raw = gzip.decompress(raw)
+    return json.loads(raw)
+
+
+def _call(url, path, body=None, headers=None):
+    data = None if body is None else json.dumps(body).encode("utf-8")
+    request = urllib.request.Request(url + path, data=data, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, _read(response)
+    except urllib.error.HTTPError as e:
+        return e.code, _read(e)
+
+
+@pytest.fixture
+def hub(temp_db):
+    db.set_user_pin(db.DEFAULT_USER_ID, "0000")  # giriş zorunlu
+    srv, url = server.serve(hub=SyncStore(), hub_token="cihaz-anahtari")
+    yield url
+    srv.shutdown()
+
+
+def test_push_without_token_or_user_is_refused(hub):
+    status, _ = _call(hub, "/push", {"origin": "dev-b", "changes": [_movement()]})
+    assert status == 403
+    status, _ = _call(hub, "/pull?since=0&origin=dev-a")
+    assert status == 403
+
+
+def test_push_with_token_is_accepted(hub):
+    token = {"X-Sync-Token": "cihaz-anahtari"}
+    status, body = _call(hub, "/push", {"origin": "dev-b", "changes": [_movement()]}, token)
+    assert (status, body) == (200, {"accepted": 1})
+    status, body = _call(hub, "/pull?since=0&origin=dev-a", headers=token)
+    assert status == 200
+    assert [c["gid"] for c in body["changes"]] == ["mov-1"]
+
+
+def test_push_with_admin_pin_is_accepted(hub):
+    headers = {"X-User": db.DEFAULT_USERNAME, "X-Pin": "0000"}
+    status, _ = _call(hub, "/push", {"origin": "dev-b", "changes": [_movement()]}, headers)
+    assert status == 200
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"origin": "dev-b"},
+    {"origin": "", "changes": []},
+    {"origin": "dev-b", "changes": {}},
+    {"origin": "dev-b", "changes": [{"entity": "movement"}]},
+    {"origin": "dev-b", "changes": [_movement(amount=-5)]},
+    {"origin": "dev-c", "changes": [_movement()]},
+])
+def test_malformed_push_is_rejected(hub, body):
+    status, response = _call(hub, "/push", body, {"X-Sync-Token": "cihaz-anahtari"})
+    assert status == 400
+    assert "error" in response
+
+
+def test_sync_server_checks_token_and_body(temp_db):
+    import sync_server
+
+    srv, url = sync_server.serve(token="cihaz-anahtari")
+    try:
+        body = {"origin": "dev-b", "changes": [_movement()]}
+        assert _call(url, "/push", body)[0] == 403
+        assert _call(url, "/push", {"origin": "dev-b"}, {"X-Sync-Token": "cihaz-anahtari"})[0] == 400
+        assert _call(url, "/push", body, {"X-Sync-Token": "cihaz-anahtari"}) == (200, {"accepted": 1})
+    finally:
+        srv.shutdown()
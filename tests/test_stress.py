@@ -0,0 +1,14 @@
+import bench
+import db
+
+
+def test_concurrent_moves_keep_stock_consistent(temp_db):
+    ids, rejected, errors, _ = bench.run_stock_moves(threads=4, moves=100, products=3, start_qty=50)
+
+    assert not errors
+    assert rejected > 0  # çıkışlar ağırlıklı: yetersiz stok reddi de denenmiş olmalı
+    for pid, quantity, net in bench.stock_totals(ids):
+        assert quantity >= 0, pid
+        assert quantity == net, pid
+    assert db.check_stock() == []
+    assert db.check_lots() == []
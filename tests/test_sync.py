@@ -0,0 +1,97 @@
+import pytest
+
+import bench
+import db
+import sync
+import sync_server
+
+
+@pytest.fixture
+def hub(temp_db):
+    server, url = sync_server.serve()
+    yield url
+    server.shutdown()
+
+
+def _remote_product(gid, hlc, origin, **fields):
+    data = {"code": "R1", "name": "Uzak", "category": None, "location": None, "note": None,
+            "reorder_level": None, "expiry_date": None, "created_at": None, **fields}
+    return {"entity": "product", "gid": gid, "hlc": hlc, "origin": origin, "data": data}
+
+
+def _remote_movement(gid, hlc, origin, product, move_type, amount):
+    return {"entity": "movement", "gid": gid, "hlc": hlc, "origin": origin, "data": {
+        "product": product, "location": db.DEFAULT_LOCATION_NAME, "type": move_type,
+        "amount": amount, "date": "2024-01-01T10:00:00", "description": None,
+        "transfer": None, "lots": [],
+    }}
+
+
+def test_hlc_stays_ordered_when_the_clock_goes_back(monkeypatch):
+    monkeypatch.setattr(db, "_hlc_last", (0, 0))
+    monkeypatch.setattr(db.time, "time", lambda: 1_000.0)
+    first = db.hlc_now()
+    monkeypatch.setattr(db.time, "time", lambda: 999.0)  # saat geri gitti
+    second = db.hlc_now()
+    db.hlc_observe("0000002000000.000005")               # ileride bir cihaz
+    third = db.hlc_now()
+
+    assert first < second < third
+    assert third == "0000002000000.000006"
+
+
+def test_remote_product_edits_are_last_writer_wins(temp_db):
+    created = _remote_product("dev-b:1", "0000000001000.000000", "dev-b")
+    assert db.apply_remote_changes([created], "dev-a") == 1
+    pid = db.get_product_by_code("R1")["id"]
+
+    newer = _remote_product("dev-b:1", "0000000003000.000000", "dev-b", name="Yeni")
+    older = _remote_product("dev-b:1", "0000000002000.000000", "dev-c", name="Eski")
+    assert db.apply_remote_changes([newer, older], "dev-a") == 1
+    assert db.get_product(pid)["name"] == "Yeni"
+
+    # Yerel düzenleme daha yeni: eski uzak sürüm üzerine yazmaz
+    product = db.get_product(pid)
+    db.update_product(pid, "R1", "Yerel", product["category"], product["quantity"], product["note"])
+    stale = _remote_product("dev-b:1", "0000000004000.000000", "dev-b", name="Bayat")
+    assert db.apply_remote_changes([stale], "dev-a") == 0
+    assert db.get_product(pid)["name"] == "Yerel"
+
+
+def test_remote_movements_apply_once_and_commute(temp_db):
+    product = _remote_product("dev-b:1", "0000000001000.000000", "dev-b")
+    moves = [
+        _remote_movement("dev-b:10", "0000000001001.000000", "dev-b", "dev-b:1", "IN", 10),
+        _remote_movement("dev-c:20", "0000000001002.000000", "dev-c", "dev-b:1", "OUT", 4),
+    ]
+    db.apply_remote_changes([product, *moves], "dev-a")
+    assert db.apply_remote_changes(moves, "dev-a") == 0  # tekrar gelen etkisiz
+    assert db.get_product_by_code("R1")["quantity"] == 6
+
+    # Kendi değişikliğimiz geri gelirse uygulanmaz
+    own = _remote_movement("dev-a:99", "0000000001003.000000", "dev-a", "dev-b:1", "IN", 50)
+    assert db.apply_remote_changes([own], "dev-a") == 0
+    assert db.check_stock() == []
+
+
+def test_push_pull_round_trip(hub, tmp_path):
+    bench._use_device(tmp_path, "a.db")
+    pid = db.add_product("S1", "Ortak", quantity=10)
+    sync.sync(hub)
+
+    bench._use_device(tmp_path, "b.db")
+    assert sync.sync(hub)["applied"] == 2  # ürün + açılış hareketi
+    shared = db.get_product_by_code("S1")
+    assert shared["quantity"] == 10
+    db.stock_out(shared["id"], 3)
+    sync.sync(hub)
+
+    bench._use_device(tmp_path, "a.db")
+    db.stock_out(pid, 2)  # çevrimdışı çakışan satış
+    sync.sync(hub)
+    assert db.get_product(pid)["quantity"] == 5
+
+    bench._use_device(tmp_path, "b.db")
+    sync.sync(hub)
+    assert db.get_product_by_code("S1")["quantity"] == 5
+    assert db.check_stock() == [] and db.check_lots() == []
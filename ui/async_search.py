@@ -0,0 +1,142 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from kivy.clock import Clock
+from kivy.logger import Logger
+
+import db
+
+
+# ===============================
+# 🔍 ASENKRON ARAMA
+# ===============================
+# Yazarken her tuşta sorgu atmak yerine:
+#   1) tuş vuruşları debounce edilir (delay saniye sessizlik beklenir)
+#   2) sorgu arka plandaki tek worker thread'de çalışır
+#   3) yeni tuş gelince eski sonuç çöpe atılır, süren sorgu interrupt edilir
+#   4) sonuç ana thread'e Clock.schedule_once ile verilir
+class AsyncSearch:
+
+    def __init__(self, query, on_results, delay=0.2, on_error=None):
+        self.query = query              # worker'da çalışır: text -> rows
+        self.on_results = on_results    # ana thread'de çalışır: rows
+        self.on_error = on_error
+
+        # 📊 tuş → ekrana basılma süresi (ms), son 100 arama
+        self.latencies = deque(maxlen=100)
+
+        self._generation = 0
+        self._text = ""
+        self._typed_at = None
+        self._request = None
+        self._running = None            # worker'da süren sorgunun generation'ı
+        self._conn = None               # worker bağlantısı (interrupt için)
+        self._cond = threading.Condition()
+        self._trigger = Clock.create_trigger(self._dispatch, delay)
+
+        worker = threading.Thread(target=self._worker, name="search", daemon=True)
+        worker.start()
+
+    def search(self, text, debounce=True):
+        # Ana thread: her tuş vuruşunda çağrılır
+        self._generation += 1
+        self._text = text
+        self._typed_at = time.perf_counter()
+
+        self._cancel_running()
+
+        if debounce:
+            self._trigger()
+        else:
+            self._trigger.cancel()
+            self._dispatch()
+
+    def _dispatch(self, *args):
+        with self._cond:
+            self._request = (self._generation, self._text, self._typed_at)
+            self._cond.notify()
+
+    def _cancel_running(self):
+        # Eski sorgu hâlâ çalışıyorsa SQLite'a durmasını söyle
+        with self._cond:
+            if self._running is not None:
+                self._conn.interrupt()
+
+    # -------------------------------
+    # 🧵 WORKER
+    # -------------------------------
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._request is None:
+                    self._cond.wait()
+                generation, text, typed_at = self._request
+                self._request = None
+
+                if generation != self._generation:
+                    continue
+
+            # Geri yükleme / profil değişimi bu sorgunun bitmesini bekler
+            with db.reading() as conn:
+                with self._cond:
+                    if generation != self._generation:
+                        continue
+                    self._running = generation
+                    self._conn = conn
+
+                try:
+                    rows = self.query(text)
+                    error = None
+                except sqlite3.OperationalError as e:
+                    if generation != self._generation:
+                        rows, error = None, None  # interrupt edildi, sessizce bırak
+                    else:
+                        rows, error = None, e
+                except Exception as e:
+                    rows, error = None, e
+                finally:
+                    with self._cond:
+                        self._running = None
+
+            Clock.schedule_once(
+                lambda dt, g=generation, r=rows, e=error, t=typed_at:
+                    self._deliver(g, r, e, t)
+            )
+
+    # -------------------------------
+    # 🖼️ ANA THREAD'E TESLİM
+    # -------------------------------
+    def _deliver(self, generation, rows, error, typed_at):
+        # Bu arada yeni tuş geldiyse sonuç bayat
+        if generation != self._generation:
+            return
+
+        if error is not None:
+            Logger.warning(f"Search: sorgu hatası: {error}")
+            if self.on_error:
+                self.on_error(error)
+            return
+
+        if rows is None:
+            return
+
+        self.on_results(rows)
+
+        ms = (time.perf_counter() - typed_at) * 1000
+        self.latencies.append(ms)
+        Logger.debug(f"Search: {len(rows)} sonuç, tuş→ekran {ms:.1f} ms")
+
+    def latency_stats(self):
+        # p50 / p95 / son ölçüm (ms)
+        if not self.latencies:
+            return None
+
+        values = sorted(self.latencies)
+        return {
+            "p50": values[len(values) // 2],
+            "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+            "last": self.latencies[-1],
+            "count": len(values),
+        }
@@ -0,0 +1,158 @@
+import threading
+from datetime import datetime
+
+from kivy.clock import Clock
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.label import Label
+from kivy.uix.popup import Popup
+from kivy.uix.progressbar import ProgressBar
+from kivy.uix.scrollview import ScrollView
+
+import backup
+
+
+# ===============================
+# 💾 YEDEKLER PENCERESİ
+# ===============================
+# Yedek alma ve geri yükleme arka plandaki thread'de çalışır.
+class BackupPopup(Popup):
+
+    def __init__(self, on_restored=None, **kwargs):
+        super().__init__(
+            title="Yedekler",
+            size_hint=(0.95, 0.9),
+            auto_dismiss=False,
+            **kwargs
+        )
+
+        self.on_restored = on_restored
+        self._running = False
+
+        root = BoxLayout(orientation="vertical", spacing=8, padding=8)
+
+        self.backup_btn = Button(
+            text="📸 Şimdi Yedek Al",
+            size_hint_y=None,
+            height=44,
+            on_release=self.start_backup
+        )
+        root.add_widget(self.backup_btn)
+
+        self.progress = ProgressBar(max=1, value=0, size_hint_y=None, height=24)
+        root.add_widget(self.progress)
+
+        self.status = Label(text="", size_hint_y=None, height=40)
+        root.add_widget(self.status)
+
+        scroll = ScrollView()
+        self.rows = GridLayout(cols=1, spacing=6, size_hint_y=None)
+        self.rows.bind(minimum_height=self.rows.setter("height"))
+        scroll.add_widget(self.rows)
+        root.add_widget(scroll)
+
+        self.close_btn = Button(
+            text="Kapat",
+            size_hint_y=None,
+            height=42,
+            on_release=lambda x: None if self._running else self.dismiss()
+        )
+        root.add_widget(self.close_btn)
+
+        self.content = root
+        self.refresh()
+
+    def refresh(self, *args):
+        self.rows.clear_widgets()
+
+        backups = backup.list_backups()
+        if not backups:
+            self.rows.add_widget(Label(text="Henüz yedek yok", size_hint_y=None, height=40))
+
+        for path in backups:
+            stamp = datetime.fromtimestamp(path.stat().st_mtime).strftime("%d.%m.%Y %H:%M")
+            self.rows.add_widget(Button(
+                text=f"♻️ {stamp}  ({path.stat().st_size / 1024:.0f} KB)",
+                size_hint_y=None,
+                height=44,
+                on_release=lambda x, p=path: self.confirm_restore(p)
+            ))
+
+    def _set_running(self, running, text=""):
+        self._running = running
+        self.backup_btn.disabled = running
+        self.close_btn.disabled = running
+        self.status.text = text
+        if running:
+            self.progress.value = 0
+
+    def _progress(self, p):
+        Clock.schedule_once(lambda dt: setattr(self.progress, "value", p))
+
+    # -------------------------------
+    # 📸 YEDEK AL
+    # -------------------------------
+    def start_backup(self, *args):
+        if self._running:
+            return
+        self._set_running(True, "Yedek alınıyor...")
+
+        def worker():
+            try:
+                path, error = backup.create_backup(on_progress=self._progress), None
+            except Exception as e:
+                path, error = None, e
+            Clock.schedule_once(lambda dt: self._backup_done(path, error))
+
+        threading.Thread(target=worker, name="backup", daemon=True).start()
+
+    def _backup_done(self, path, error):
+        self._set_running(False, f"Hata: {error}" if error else f"✅ {path.name}")
+        self.refresh()
+
+    # -------------------------------
+    # ♻️ GERİ YÜKLE
+    # -------------------------------
+    def confirm_restore(self, path):
+        if self._running:
+            return
+
+        content = BoxLayout(orientation="vertical", spacing=10, padding=10)
+        content.add_widget(Label(
+            text="Mevcut veriler bu yedekle değiştirilecek.\n"
+                 "Önce şimdiki halin yedeği alınır.",
+            halign="center"
+        ))
+
+        buttons = BoxLayout(size_hint_y=None, height=44, spacing=8)
+        popup = Popup(title="Geri yüklensin mi?", content=content,
+                      size_hint=(0.85, None), height=240)
+
+        buttons.add_widget(Button(text="Vazgeç", on_release=lambda x: popup.dismiss()))
+        buttons.add_widget(Button(
+            text="Geri Yükle",
+            background_color=(0.8, 0.2, 0.2, 1),
+            on_release=lambda x: (popup.dismiss(), self.start_restore(path))
+        ))
+        content.add_widget(buttons)
+        popup.open()
+
+    def start_restore(self, path):
+        self._set_running(True, "Geri yükleniyor...")
+
+        def worker():
+            try:
+                backup.restore_backup(path, on_progress=self._progress)
+                error = None
+            except Exception as e:
+                error = e
+            Clock.schedule_once(lambda dt: self._restore_done(error))
+
+        threading.Thread(target=worker, name="restore", daemon=True).start()
+
+    def _restore_done(self, error):
+        self._set_running(False, f"Hata: {error}" if error else "✅ Geri yüklendi")
+        self.refresh()
+        if error is None and self.on_restored:
+            self.on_restored()
@@ -0,0 +1,104 @@
+from datetime import date
+
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.label import Label
+from kivy.uix.popup import Popup
+from kivy.uix.scrollview import ScrollView
+from kivy.uix.togglebutton import ToggleButton
+
+import db
+
+
+def expiry_text(expiry_date, today=None):
+    # "01.11.2026 (14 gün)" / "01.10.2026 (⚠️ 17 gün geçti)"
+    day = date.fromisoformat(expiry_date)
+    left = (day - (today or date.today())).days
+
+    if left < 0:
+        status = f"⚠️ {-left} gün geçti"
+    elif left == 0:
+        status = "⚠️ bugün"
+    else:
+        status = f"{left} gün"
+    return f"{day.strftime('%d.%m.%Y')} ({status})"
+
+
+# ===============================
+# ⏰ SKT YAKLAŞANLAR
+# ===============================
+# idx_products_expiry üzerinden aralık araması: liste SKT'li ürün sayısına
+# değil, sonuç sayısına bağlı.
+class ExpiryPopup(Popup):
+
+    DAY_OPTIONS = (7, 30, 90)
+
+    def __init__(self, on_open_product=None, days=db.EXPIRY_WARNING_DAYS, **kwargs):
+        super().__init__(
+            title="Son Kullanma Tarihi Yaklaşanlar",
+            size_hint=(0.92, 0.8),
+            separator_color=(0.8, 0.5, 0.1, 1),
+            **kwargs
+        )
+
+        self.on_open_product = on_open_product
+
+        root = BoxLayout(orientation="vertical", spacing=6, padding=6)
+
+        options = BoxLayout(size_hint_y=None, height=40, spacing=6)
+        for n in self.DAY_OPTIONS:
+            btn = ToggleButton(
+                text=f"{n} gün",
+                group="expiry_days",
+                allow_no_selection=False,
+                state="down" if n == days else "normal",
+                on_release=lambda x, n=n: self.load(n)
+            )
+            options.add_widget(btn)
+        root.add_widget(options)
+
+        self.rows = GridLayout(cols=1, spacing=6, size_hint_y=None)
+        self.rows.bind(minimum_height=self.rows.setter("height"))
+        scroll = ScrollView()
+        scroll.add_widget(self.rows)
+        root.add_widget(scroll)
+
+        root.add_widget(Button(
+            text="Kapat",
+            size_hint_y=None,
+            height=40,
+            on_release=self.dismiss
+        ))
+
+        self.content = root
+        self.load(days)
+
+    def load(self, days):
+        self.rows.clear_widgets()
+
+        products = db.get_expiring_products(days)
+        if not products:
+            self.rows.add_widget(Label(
+                text=f"{days} gün içinde SKT'si dolan ürün yok 👍",
+                size_hint_y=None,
+                height=44
+            ))
+
+        today = date.today()
+        for p in products:
+            self.rows.add_widget(Button(
+                text=f"{p['name']} ({p['code']}) · {p['quantity']} adet\n"
+                     f"{expiry_text(p['expiry_date'], today)}",
+                halign="center",
+                size_hint_y=None,
+                height=56,
+                background_normal="",
+                background_color=(0.45, 0.15, 0.12, 1) if p["days_left"] < 0 else (0.2, 0.2, 0.2, 1),
+                on_release=lambda x, pid=p["id"]: self._open(pid)
+            ))
+
+    def _open(self, product_id):
+        self.dismiss()
+        if self.on_open_product:
+            self.on_open_product(product_id)
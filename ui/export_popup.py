@@ -0,0 +1,160 @@
+import os
+import threading
+from datetime import datetime
+
+from kivy.clock import Clock
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.uix.popup import Popup
+from kivy.uix.progressbar import ProgressBar
+from kivy.uix.textinput import TextInput
+from kivy.uix.togglebutton import ToggleButton
+
+import db
+import exporter
+
+
+# ===============================
+# 📤 DIŞA AKTARMA PENCERESİ
+# ===============================
+# Tablo + format seçilir, hareketler için tarih aralığı ve ürün kodu
+# filtresi verilebilir. Döküm arka plandaki thread'de yazılır.
+class ExportPopup(Popup):
+
+    def __init__(self, folder=None, **kwargs):
+        super().__init__(
+            title="Dışa Aktar",
+            size_hint=(0.95, None),
+            height=520,
+            auto_dismiss=False,
+            **kwargs
+        )
+
+        self.folder = folder or os.path.expanduser("~")
+        self._cancel = threading.Event()
+        self._running = False
+
+        root = BoxLayout(orientation="vertical", spacing=8, padding=8)
+
+        # 📋 tablo
+        tables = BoxLayout(size_hint_y=None, height=42, spacing=6)
+        self.table_btns = {}
+        for key, text in (("movements", "Stok Hareketleri"), ("products", "Ürünler")):
+            btn = ToggleButton(text=text, group="export_table", allow_no_selection=False)
+            self.table_btns[key] = btn
+            tables.add_widget(btn)
+        self.table_btns["movements"].state = "down"
+        root.add_widget(tables)
+
+        # 🗂️ format
+        formats = BoxLayout(size_hint_y=None, height=42, spacing=6)
+        self.format_btns = {}
+        for fmt in exporter.EXPORT_FORMATS:
+            btn = ToggleButton(text=fmt.upper(), group="export_format", allow_no_selection=False)
+            self.format_btns[fmt] = btn
+            formats.add_widget(btn)
+        self.format_btns["csv"].state = "down"
+        root.add_widget(formats)
+
+        # 📅 filtreler (sadece hareketler)
+        self.start_input = TextInput(hint_text="Başlangıç (YYYY-AA-GG)", multiline=False,
+                                     size_hint_y=None, height=42)
+        self.end_input = TextInput(hint_text="Bitiş (YYYY-AA-GG)", multiline=False,
+                                   size_hint_y=None, height=42)
+        self.codes_input = TextInput(hint_text="Ürün kodları (virgülle, boş = hepsi)",
+                                     multiline=False, size_hint_y=None, height=42)
+        for w in (self.start_input, self.end_input, self.codes_input):
+            root.add_widget(w)
+
+        self.progress = ProgressBar(max=1, value=0, size_hint_y=None, height=24)
+        root.add_widget(self.progress)
+
+        self.status = Label(text=f"Klasör: {self.folder}", halign="left", valign="middle")
+        self.status.bind(size=lambda i, v: setattr(i, "text_size", i.size))
+        root.add_widget(self.status)
+
+        buttons = BoxLayout(size_hint_y=None, height=44, spacing=8)
+        self.start_btn = Button(text="Dışa Aktar", on_release=self.start)
+        self.close_btn = Button(text="Kapat", on_release=self.close)
+        buttons.add_widget(self.start_btn)
+        buttons.add_widget(self.close_btn)
+        root.add_widget(buttons)
+
+        self.content = root
+
+    def _selected(self, buttons):
+        return next(k for k, b in buttons.items() if b.state == "down")
+
+    def start(self, *args):
+        if self._running:
+            return
+
+        table = self._selected(self.table_btns)
+        fmt = self._selected(self.format_btns)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M")
+        path = os.path.join(self.folder, f"stok_{table}_{stamp}.{fmt}")
+
+        kwargs = {}
+        if table == "movements":
+            kwargs["start"] = self.start_input.text.strip() or None
+            kwargs["end"] = self.end_input.text.strip() or None
+
+            codes = [c.strip() for c in self.codes_input.text.split(",") if c.strip()]
+            if codes:
+                kwargs["product_ids"] = db.get_product_ids(codes)
+                if not kwargs["product_ids"]:
+                    self.status.text = "Ürün kodu bulunamadı"
+                    return
+
+        self._running = True
+        self._cancel.clear()
+        self.start_btn.disabled = True
+        self.close_btn.text = "İptal"
+        self.progress.value = 0
+        self.status.text = f"Yazılıyor: {os.path.basename(path)}"
+
+        threading.Thread(
+            target=self._worker, args=(table, path, fmt, kwargs),
+            name="export", daemon=True
+        ).start()
+
+    def close(self, *args):
+        if self._running:
+            self._cancel.set()
+            self.status.text = "İptal ediliyor..."
+            return
+        self.dismiss()
+
+    # -------------------------------
+    # 🧵 WORKER
+    # -------------------------------
+    def _worker(self, table, path, fmt, kwargs):
+        export = exporter.export_movements if table == "movements" else exporter.export_products
+        try:
+            summary = export(
+                path,
+                fmt=fmt,
+                on_progress=lambda p: Clock.schedule_once(
+                    lambda dt: setattr(self.progress, "value", p)
+                ),
+                cancel=self._cancel.is_set,
+                **kwargs
+            )
+            error = None
+        except Exception as e:
+            summary, error = None, e
+
+        Clock.schedule_once(lambda dt: self._finish(summary, error))
+
+    def _finish(self, summary, error):
+        self._running = False
+        self.start_btn.disabled = False
+        self.close_btn.text = "Kapat"
+
+        if error is not None:
+            self.status.text = f"Hata: {error}"
+        elif summary["cancelled"]:
+            self.status.text = "İptal edildi, dosya yazılmadı"
+        else:
+            self.status.text = f"✅ {summary['rows']} satır\n{summary['path']}"
@@ -0,0 +1,126 @@
+import os
+import threading
+
+from kivy.clock import Clock
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.filechooser import FileChooserListView
+from kivy.uix.label import Label
+from kivy.uix.popup import Popup
+from kivy.uix.progressbar import ProgressBar
+
+import importer
+
+
+# ===============================
+# 📥 İÇE AKTARMA PENCERESİ
+# ===============================
+# Dosya seçilir, içe aktarma arka plandaki thread'de çalışır.
+# İlerleme ana thread'e Clock ile taşınır; arayüz hiç donmaz.
+class ImportPopup(Popup):
+
+    def __init__(self, on_done=None, **kwargs):
+        super().__init__(
+            title="Ürünleri İçe Aktar (CSV / XLSX)",
+            size_hint=(0.95, 0.9),
+            auto_dismiss=False,
+            **kwargs
+        )
+
+        self.on_done = on_done
+        self._cancel = threading.Event()
+        self._running = False
+
+        root = BoxLayout(orientation="vertical", spacing=8, padding=8)
+
+        self.chooser = FileChooserListView(
+            path=os.path.expanduser("~"),
+            filters=["*.csv", "*.CSV", "*.xlsx", "*.XLSX"]
+        )
+        root.add_widget(self.chooser)
+
+        self.progress = ProgressBar(max=1, value=0, size_hint_y=None, height=24)
+        root.add_widget(self.progress)
+
+        self.status = Label(
+            text="Bir dosya seçin",
+            size_hint_y=None,
+            height=60,
+            halign="left",
+            valign="middle"
+        )
+        self.status.bind(size=lambda i, v: setattr(i, "text_size", i.size))
+        root.add_widget(self.status)
+
+        buttons = BoxLayout(size_hint_y=None, height=44, spacing=8)
+
+        self.start_btn = Button(text="İçe Aktar", on_release=self.start)
+        self.close_btn = Button(text="Kapat", on_release=self.close)
+
+        buttons.add_widget(self.start_btn)
+        buttons.add_widget(self.close_btn)
+        root.add_widget(buttons)
+
+        self.content = root
+
+    def start(self, *args):
+        if self._running or not self.chooser.selection:
+            return
+
+        path = self.chooser.selection[0]
+        self._running = True
+        self._cancel.clear()
+
+        self.start_btn.disabled = True
+        self.close_btn.text = "İptal"
+        self.progress.value = 0
+        self.status.text = f"İçe aktarılıyor: {os.path.basename(path)}"
+
+        threading.Thread(
+            target=self._worker, args=(path,), name="import", daemon=True
+        ).start()
+
+    def close(self, *args):
+        if self._running:
+            self._cancel.set()  # chunk bitince durur, yazılanlar kalır
+            self.status.text = "İptal ediliyor..."
+            return
+        self.dismiss()
+
+    # -------------------------------
+    # 🧵 WORKER
+    # -------------------------------
+    def _worker(self, path):
+        try:
+            summary = importer.import_products(
+                path,
+                on_progress=lambda p: Clock.schedule_once(
+                    lambda dt: setattr(self.progress, "value", p)
+                ),
+                cancel=self._cancel.is_set
+            )
+            error = None
+        except Exception as e:
+            summary, error = None, e
+
+        Clock.schedule_once(lambda dt: self._finish(summary, error))
+
+    def _finish(self, summary, error):
+        self._running = False
+        self.start_btn.disabled = False
+        self.close_btn.text = "Kapat"
+
+        if error is not None:
+            self.status.text = f"Hata: {error}"
+            return
+
+        text = f"✅ {summary['imported']} ürün aktarıldı, ❌ {summary['failed']} satır hatalı"
+        if summary["cancelled"]:
+            text += " (iptal edildi)"
+        for line, message in summary["errors"][:3]:
+            text += f"\nSatır {line}: {message}"
+
+        self.status.text = text
+
+        if self.on_done:
+            self.on_done(summary)
@@ -0,0 +1,170 @@
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.label import Label
+from kivy.uix.popup import Popup
+from kivy.uix.scrollview import ScrollView
+from kivy.uix.spinner import Spinner
+from kivy.uix.textinput import TextInput
+
+import db
+
+
+# ===============================
+# 🏬 ŞUBELER
+# ===============================
+# Şube ekleme ve bu cihazın şubesini seçme. Şube verilmeyen tüm hareketler
+# (liste ekranındaki hızlı giriş/çıkış dahil) seçilen şubeye yazılır.
+class LocationPopup(Popup):
+
+    def __init__(self, on_changed=None, **kwargs):
+        super().__init__(
+            title="Şubeler",
+            size_hint=(0.92, 0.85),
+            **kwargs
+        )
+
+        self.on_changed = on_changed
+
+        root = BoxLayout(orientation="vertical", spacing=8, padding=8)
+
+        add_row = BoxLayout(size_hint_y=None, height=44, spacing=6)
+        self.name_input = TextInput(hint_text="Yeni şube adı", multiline=False)
+        self.name_input.bind(on_text_validate=self.add_location)
+        add_row.add_widget(self.name_input)
+        add_row.add_widget(Button(
+            text="➕ Ekle",
+            size_hint_x=None,
+            width=90,
+            on_release=self.add_location
+        ))
+        root.add_widget(add_row)
+
+        self.status = Label(text="", size_hint_y=None, height=30)
+        root.add_widget(self.status)
+
+        scroll = ScrollView()
+        self.rows = GridLayout(cols=1, spacing=6, size_hint_y=None)
+        self.rows.bind(minimum_height=self.rows.setter("height"))
+        scroll.add_widget(self.rows)
+        root.add_widget(scroll)
+
+        root.add_widget(Button(
+            text="Kapat",
+            size_hint_y=None,
+            height=42,
+            on_release=self.dismiss
+        ))
+
+        self.content = root
+        self.refresh()
+
+    def refresh(self, *args):
+        self.rows.clear_widgets()
+
+        current = db.current_location()
+        for loc in db.get_locations():
+            selected = loc["id"] == current
+            self.rows.add_widget(Button(
+                text=f"{'📍 ' if selected else ''}{loc['name']}",
+                size_hint_y=None,
+                height=44,
+                background_normal="",
+                background_color=(0.2, 0.45, 0.3, 1) if selected else (0.2, 0.2, 0.2, 1),
+                on_release=lambda x, lid=loc["id"]: self.select(lid)
+            ))
+
+    def add_location(self, *args):
+        try:
+            db.add_location(self.name_input.text)
+        except ValueError as e:
+            self.status.text = f"❌ {e}"
+            return
+
+        self.name_input.text = ""
+        self.status.text = "✅ Şube eklendi"
+        self.refresh()
+
+    def select(self, location_id):
+        db.set_setting(db.CURRENT_LOCATION_KEY, location_id)
+        self.status.text = "📍 Bu cihazın şubesi değişti"
+        self.refresh()
+        if self.on_changed:
+            self.on_changed()
+
+
+# ===============================
+# 🔁 ŞUBELER ARASI TRANSFER
+# ===============================
+class TransferPopup(Popup):
+
+    def __init__(self, product_id, on_done=None, **kwargs):
+        super().__init__(
+            title="Şubeler Arası Transfer",
+            size_hint=(0.9, None),
+            height=320,
+            **kwargs
+        )
+
+        self.product_id = product_id
+        self.on_done = on_done
+
+        # Spinner etiketi: "Şube (stok)"
+        stock = {s["location_id"]: s["quantity"] for s in db.get_product_stock(product_id)}
+        self._by_label = {
+            f"{loc['name']} ({stock.get(loc['id'], 0)})": loc["id"]
+            for loc in db.get_locations()
+        }
+        names = list(self._by_label)
+
+        current = db.current_location()
+        source = next((n for n, lid in self._by_label.items() if lid == current), names[0])
+
+        root = BoxLayout(orientation="vertical", spacing=8, padding=8)
+
+        row = BoxLayout(size_hint_y=None, height=44, spacing=6)
+        self.from_spinner = Spinner(text=source, values=names)
+        self.to_spinner = Spinner(
+            text=next((n for n in names if n != source), source),
+            values=names
+        )
+        row.add_widget(self.from_spinner)
+        row.add_widget(Label(text="→", size_hint_x=None, width=30))
+        row.add_widget(self.to_spinner)
+        root.add_widget(row)
+
+        self.amount_input = TextInput(
+            hint_text="Miktar",
+            input_filter="int",
+            multiline=False,
+            size_hint_y=None,
+            height=44
+        )
+        root.add_widget(self.amount_input)
+
+        self.status = Label(text="", size_hint_y=None, height=30)
+        root.add_widget(self.status)
+
+        buttons = BoxLayout(size_hint_y=None, height=44, spacing=6)
+        buttons.add_widget(Button(text="İptal", on_release=self.dismiss))
+        buttons.add_widget(Button(text="🔁 Transfer", on_release=self.transfer))
+        root.add_widget(buttons)
+
+        self.content = root
+
+    def transfer(self, *args):
+        try:
+            amount = int(self.amount_input.text or 0)
+            db.transfer_stock(
+                self.product_id,
+                amount,
+                self._by_label[self.from_spinner.text],
+                self._by_label[self.to_spinner.text]
+            )
+        except ValueError as e:
+            self.status.text = f"❌ {e}"
+            return
+
+        self.dismiss()
+        if self.on_done:
+            self.on_done()
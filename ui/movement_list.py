@@ -0,0 +1,151 @@
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+
+import db
+from ui.async_search import AsyncSearch
+from ui.movement_model import MovementHistoryModel
+
+
+ROW_HEIGHT = 52
+
+
+class MovementRow(RecycleDataViewBehavior, BoxLayout):
+    # ♻️ ProductCard gibi: satır widget'ları bir kez kurulur, kaydırınca yeniden doldurulur
+
+    def __init__(self, **kwargs):
+        super().__init__(
+            orientation="horizontal",
+            padding=[10, 4],
+            spacing=8,
+            size_hint_y=None,
+            height=ROW_HEIGHT,
+            **kwargs
+        )
+
+        left = BoxLayout(orientation="vertical")
+
+        self.date_lbl = Label(font_size=13, halign="left", valign="middle")
+        self.date_lbl.bind(size=lambda i, v: setattr(i, "text_size", i.size))
+
+        self.desc_lbl = Label(
+            font_size=11,
+            color=(0.7, 0.7, 0.7, 1),
+            halign="left",
+            valign="middle",
+            shorten=True
+        )
+        self.desc_lbl.bind(size=lambda i, v: setattr(i, "text_size", i.size))
+
+        left.add_widget(self.date_lbl)
+        left.add_widget(self.desc_lbl)
+
+        self.amount_lbl = Label(size_hint_x=None, width=80, font_size=15, bold=True)
+        self.balance_lbl = Label(
+            size_hint_x=None,
+            width=70,
+            font_size=13,
+            color=(0.75, 0.75, 0.75, 1)
+        )
+
+        self.add_widget(left)
+        self.add_widget(self.amount_lbl)
+        self.add_widget(self.balance_lbl)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.date_lbl.text = data["date_text"]
+        self.desc_lbl.text = data["description"]
+
+        if data["type"] == "IN":
+            self.amount_lbl.text = f"⬇️ +{data['amount']}"
+            self.amount_lbl.color = (0.4, 0.85, 0.4, 1)
+        else:
+            self.amount_lbl.text = f"⬆️ -{data['amount']}"
+            self.amount_lbl.color = (0.9, 0.4, 0.4, 1)
+
+        balance = data["balance"]
+        self.balance_lbl.text = "" if balance is None else f"= {balance}"
+
+
+class MovementList(RecycleView):
+    # 📜 Ürün hareket geçmişi: ilk sayfa hemen, kalanı alta yaklaştıkça
+    # arka planda (keyset) yüklenir. 100k hareketli üründe de ilk sayfa
+    # tek bir indeks aramasıdır.
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        self.viewclass = MovementRow
+        self.model = MovementHistoryModel()
+
+        self.product_id = None
+        self.filters = {}
+        self.cursor = None
+        self._loading = False
+        self._generation = 0
+        self._pager = AsyncSearch(
+            query=self._load_page,
+            on_results=self._append_page,
+            delay=0
+        )
+
+        layout = RecycleBoxLayout(
+            orientation="vertical",
+            spacing=2,
+            default_size=(None, ROW_HEIGHT),
+            default_size_hint=(1, None),
+            size_hint_y=None
+        )
+        layout.bind(minimum_height=layout.setter("height"))
+        self.add_widget(layout)
+
+        self.bind(scroll_y=self._check_scroll)
+
+    def load(self, product_id, move_type=None, start=None, end=None):
+        # start / end: "YYYY-AA-GG" (ikisi de dahil); hatalıysa ValueError
+        start, end = db.day_bounds(start, end)
+
+        self.product_id = product_id
+        self.filters = {"move_type": move_type, "start": start, "end": end}
+        self._generation += 1
+
+        # Tür filtresi satır atladığı için bakiye zinciri kopar
+        balance = None if move_type else db.get_balance_before(product_id, end)
+        self.model.reset(self.data, balance)
+        self.scroll_y = 1
+
+        self.cursor = None
+        self._request_page()
+
+    def _request_page(self):
+        self._loading = True
+        self._pager.search((self._generation, self.cursor), debounce=False)
+
+    def _load_page(self, request):
+        # worker thread
+        generation, cursor = request
+        return generation, db.get_movements_page(self.product_id, after=cursor, **self.filters)
+
+    def _check_scroll(self, *args):
+        if self.cursor is None or self._loading:
+            return
+
+        content = self.layout_manager.height if self.layout_manager else 0
+        remaining = self.scroll_y * max(content - self.height, 0)
+        if remaining < self.height:
+            self._request_page()
+
+    def _append_page(self, result):
+        generation, movements = result
+        if generation != self._generation:
+            return  # filtre / ürün bu arada değişti
+
+        self._loading = False
+        self.model.append(self.data, movements)
+        self.cursor = (
+            db.movement_cursor(movements[-1])
+            if len(movements) >= db.MOVEMENT_PAGE_SIZE
+            else None
+        )
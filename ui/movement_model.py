@@ -0,0 +1,51 @@
+from datetime import datetime
+
+
+# ===============================
+# 📜 HAREKET GEÇMİŞİ MODELİ
+# ===============================
+# Geçmiş en yeniden eskiye sayfa sayfa gelir. Her satırın "bakiye"si o
+# hareketten sonraki stoktur: en yeni satır için başlangıç bakiyesi bilinir
+# (güncel stok veya bitiş tarihindeki stok), sonraki her satır bir öncekinin
+# hareketi geri alınarak bulunur. Sayfa eklemek O(sayfa), tüm geçmiş gerekmez.
+
+def movement_delta(move_type, amount):
+    return amount if move_type == "IN" else -amount
+
+
+def movement_to_data(movement, balance):
+    try:
+        when = datetime.fromisoformat(movement["date"]).strftime("%d.%m.%Y %H:%M")
+    except ValueError:
+        when = movement["date"]
+
+    return {
+        "movement_id": movement["id"],
+        "type": movement["type"],
+        "amount": movement["amount"],
+        "date_text": when,
+        "description": "  ".join(filter(None, (
+            movement["description"],
+            f"👤 {movement['username']}" if movement["username"] else None,
+        ))),
+        "balance": balance,
+    }
+
+
+class MovementHistoryModel:
+
+    def __init__(self):
+        self.balance = None     # sıradaki (daha eski) satırdan sonraki stok
+
+    def reset(self, data, balance):
+        # balance None: bakiye gösterilmez (ör. tür filtresi satır atlar)
+        data[:] = []
+        self.balance = balance
+
+    def append(self, data, movements):
+        rows = []
+        for m in movements:
+            rows.append(movement_to_data(m, self.balance))
+            if self.balance is not None:
+                self.balance -= movement_delta(m["type"], m["amount"])
+        data.extend(rows)
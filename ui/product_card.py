@@ -1,21 +1,29 @@
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivy.graphics import Color, RoundedRectangle
 
 
-class ProductCard(BoxLayout):
-    def __init__(self, product, on_open, **kwargs):
+CARD_HEIGHT = 76
+
+
+class ProductCard(RecycleDataViewBehavior, BoxLayout):
+    # ♻️ RecycleView sadece görünen satır kadar kart üretir ve kaydırdıkça
+    # aynı kartları refresh_view_attrs ile yeni satırın verisiyle doldurur.
+    # Bu yüzden widget ağacı ve bind'ler bir kez kurulur.
+
+    def __init__(self, **kwargs):
         super().__init__(
             orientation="horizontal",
             padding=14,
             spacing=10,
             size_hint_y=None,
-            height=76,
+            height=CARD_HEIGHT,
             **kwargs
         )
 
-        self.product = product
-        self.on_open = on_open
+        self.product_id = None
+        self.on_open = None
 
         # 🎨 Arka plan
         with self.canvas.before:
@@ -34,8 +42,7 @@ class ProductCard(BoxLayout):
         # 📦 SOL: isim + kod
         left = BoxLayout(orientation="vertical", spacing=4)
 
-        name_lbl = Label(
-            text=product["name"],
+        self.name_lbl = Label(
             font_size=16,
             bold=True,
             halign="left",
@@ -43,10 +50,9 @@ class ProductCard(BoxLayout):
             size_hint_y=None,
             height=26
         )
-        name_lbl.bind(size=lambda i, v: setattr(i, "text_size", i.size))
+        self.name_lbl.bind(size=lambda i, v: setattr(i, "text_size", i.size))
 
-        code_lbl = Label(
-            text=f"Kod: {product['code']}",
+        self.code_lbl = Label(
             font_size=12,
             color=(0.7, 0.7, 0.7, 1),
             halign="left",
@@ -54,14 +60,13 @@ class ProductCard(BoxLayout):
             size_hint_y=None,
             height=18
         )
-        code_lbl.bind(size=lambda i, v: setattr(i, "text_size", i.size))
+        self.code_lbl.bind(size=lambda i, v: setattr(i, "text_size", i.size))
 
-        left.add_widget(name_lbl)
-        left.add_widget(code_lbl)
+        left.add_widget(self.name_lbl)
+        left.add_widget(self.code_lbl)
 
         # 📊 SAĞ: stok
-        stock_lbl = Label(
-            text=str(product["quantity"]),
+        self.stock_lbl = Label(
             size_hint=(None, None),
             size=(56, 32),
             font_size=16,
@@ -70,30 +75,38 @@ class ProductCard(BoxLayout):
             valign="middle",
             color=(1, 1, 1, 1)
         )
-        stock_lbl.bind(size=stock_lbl.setter("text_size"))
+        self.stock_lbl.bind(size=self.stock_lbl.setter("text_size"))
 
-        with stock_lbl.canvas.before:
+        with self.stock_lbl.canvas.before:
             Color(0.22, 0.22, 0.22, 1)
             self.stock_bg = RoundedRectangle(
                 radius=[16],
-                pos=stock_lbl.pos,
-                size=stock_lbl.size
+                pos=self.stock_lbl.pos,
+                size=self.stock_lbl.size
             )
 
-        stock_lbl.bind(
+        self.stock_lbl.bind(
             pos=lambda i, v: setattr(self.stock_bg, "pos", i.pos),
             size=lambda i, v: setattr(self.stock_bg, "size", i.size)
         )
 
         self.add_widget(left)
-        self.add_widget(stock_lbl)
+        self.add_widget(self.stock_lbl)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.product_id = data["product_id"]
+        self.on_open = rv.on_open
+
+        self.name_lbl.text = data["name"]
+        self.code_lbl.text = f"Kod: {data['code']}"
+        self.stock_lbl.text = str(data["quantity"])
 
     def _update_bg(self, *args):
         self.bg.pos = self.pos
         self.bg.size = self.size
 
     def on_touch_down(self, touch):
-        if self.collide_point(*touch.pos):
-            self.on_open(self.product["id"])
+        if self.collide_point(*touch.pos) and self.on_open:
+            self.on_open(self.product_id)
             return True
         return super().on_touch_down(touch)
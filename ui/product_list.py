@@ -0,0 +1,84 @@
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+
+import db
+from ui.async_search import AsyncSearch
+from ui.product_card import ProductCard, CARD_HEIGHT
+from ui.product_model import ProductListModel
+
+
+class ProductList(RecycleView):
+    # 📜 Sanal liste: 100k ürün olsa da sadece ekrana sığan kadar
+    # ProductCard oluşturulur. Veri self.data (dict listesi) içinde durur.
+    # load_page verilirse liste sayfa sayfa yüklenir: alta yaklaşınca
+    # sonraki sayfa arka planda çekilip sona eklenir.
+
+    def __init__(self, on_open, load_page=None, **kwargs):
+        super().__init__(**kwargs)
+
+        self.on_open = on_open
+        self.model = ProductListModel()
+        self.viewclass = ProductCard
+
+        self.load_page = load_page
+        self.cursor = None          # sonraki sayfa için keyset imleci
+        self._loading = False
+        self._pager = AsyncSearch(
+            query=self.load_page,
+            on_results=self._append_page,
+            delay=0
+        ) if load_page else None
+
+        layout = RecycleBoxLayout(
+            orientation="vertical",
+            spacing=6,
+            padding=[0, 6, 0, 6],
+            default_size=(None, CARD_HEIGHT),
+            default_size_hint=(1, None),
+            size_hint_y=None
+        )
+        layout.bind(minimum_height=layout.setter("height"))
+        self.add_widget(layout)
+
+        self.bind(scroll_y=self._check_scroll)
+
+    def set_products(self, products, complete=True):
+        # Ekrandaki veriyi silip kurmak yerine farkı uygula
+        self.model.sync(self.data, products, complete)
+
+        # yolda olan sayfa artık eski imlece ait
+        self._loading = False
+        self.cursor = (
+            db.page_cursor(products[-1])
+            if complete and self._pager and len(products) >= db.PRODUCT_PAGE_SIZE
+            else None
+        )
+
+    def patch_products(self, changed):
+        return self.model.patch(self.data, changed)
+
+    # ===============================
+    # ♾️ SONSUZ KAYDIRMA
+    # ===============================
+    def _check_scroll(self, *args):
+        if self.cursor is None or self._loading:
+            return
+
+        # scroll_y: 1 = en üst, 0 = en alt. Alta bir ekran kala yükle.
+        content = self.layout_manager.height if self.layout_manager else 0
+        remaining = self.scroll_y * max(content - self.height, 0)
+        if remaining < self.height:
+            self._loading = True
+            self._pager.search(self.cursor, debounce=False)
+
+    def _append_page(self, products):
+        if not self._loading:
+            return  # liste bu arada yenilendi
+
+        self._loading = False
+        self.model.append(self.data, products)
+        self.cursor = (
+            db.page_cursor(products[-1])
+            if len(products) >= db.PRODUCT_PAGE_SIZE
+            else None
+        )
@@ -0,0 +1,152 @@
+# ===============================
+# 🔁 ÜRÜN LİSTESİ MODELİ
+# ===============================
+# Ekrandaki liste (RecycleView.data) her yenilemede baştan kurulmaz.
+# Yeni sorgu sonucu, ekrandakiyle karşılaştırılır ve sadece
+# ekleme / silme / güncelleme / taşıma işlemleri uygulanır.
+# Detay ekranından dönünce ise sadece (updated_at, id) imlecinden sonra
+# değişen ürünler çekilir.
+
+# Bundan fazla işlem çıkarsa (ör. sıralama değişti) listeyi tek seferde değiştir
+PATCH_LIMIT = 200
+
+
+def changed_cursor(product):
+    # db.get_products_changed_since imleci: aynı updated_at'li ürünleri id ayırır
+    return (product["updated_at"] or "", product["id"])
+
+
+def product_to_data(product):
+    # RecycleView satırı: sqlite3.Row yerine küçük, sabit bir dict
+    return {
+        "product_id": product["id"],
+        "name": product["name"],
+        "code": product["code"],
+        "quantity": product["quantity"],
+    }
+
+
+def diff(old, new, limit=PATCH_LIMIT):
+    # old / new: product_to_data listeleri.
+    # Dönüş: sırayla uygulanacak işlemler, limit aşılırsa None.
+    #   ("delete", i) / ("insert", i, data) / ("update", i, data) / ("move", i, j)
+    old_by_id = {d["product_id"]: d for d in old}
+    new_pos = {d["product_id"]: i for i, d in enumerate(new)}
+
+    ops = []
+    cur = [d["product_id"] for d in old]
+
+    # 🗑️ silinenler (sondan başa, indeksler kaymasın)
+    for i in range(len(cur) - 1, -1, -1):
+        if cur[i] not in new_pos:
+            ops.append(("delete", i))
+            del cur[i]
+
+    for i, data in enumerate(new):
+        if len(ops) > limit:
+            return None
+
+        pid = data["product_id"]
+
+        if i < len(cur) and cur[i] != pid:
+            if pid not in old_by_id:
+                ops.append(("insert", i, data))
+                cur.insert(i, pid)
+                continue
+
+            if i + 1 < len(cur) and cur[i + 1] == pid:
+                # cur[i] aşağı kaydı: onu yerine taşı, diğerlerine dokunma
+                moved = cur.pop(i)
+                target = new_pos[moved]
+                cur.insert(target, moved)
+                ops.append(("move", i, target))
+            else:
+                # pid yukarı kaydı
+                j = cur.index(pid, i)
+                cur.insert(i, cur.pop(j))
+                ops.append(("move", j, i))
+
+        elif i >= len(cur):
+            ops.append(("insert", i, data))
+            cur.append(pid)
+            continue
+
+        if old_by_id[pid] != data:
+            ops.append(("update", i, data))
+
+    return ops
+
+
+def apply_ops(data, ops):
+    for op in ops:
+        kind = op[0]
+        if kind == "delete":
+            del data[op[1]]
+        elif kind == "insert":
+            data.insert(op[1], op[2])
+        elif kind == "update":
+            data[op[1]] = op[2]
+        elif kind == "move":
+            data.insert(op[2], data.pop(op[1]))
+
+
+class ProductListModel:
+
+    def __init__(self):
+        self.positions = {}     # product_id -> ekrandaki index
+        self.synced_at = None   # son görülen en büyük (updated_at, id)
+        self.complete = False   # ekranda tüm ürünler mi var (arama yok)
+
+    def sync(self, data, products, complete=True):
+        # Tam sorgu sonucu ile ekrandaki listeyi eşitle
+        new = [product_to_data(p) for p in products]
+        ops = diff(data, new) if data else None
+
+        if ops is None:
+            data[:] = new
+        else:
+            apply_ops(data, ops)
+
+        self.positions = {d["product_id"]: i for i, d in enumerate(data)}
+        self.synced_at = max((changed_cursor(p) for p in products), default=None)
+        self.complete = complete
+
+        return ops
+
+    def append(self, data, products):
+        # Sonsuz kaydırma: yeni sayfayı sona ekle
+        start = len(data)
+        new = [product_to_data(p) for p in products]
+        data.extend(new)
+
+        for i, d in enumerate(new, start):
+            self.positions[d["product_id"]] = i
+
+        self._advance(products)
+
+    def patch(self, data, changed):
+        # Sadece değişen ürünler: O(değişen satır).
+        # Yeni ürün veya sırayı etkileyebilecek değişiklik varsa False döner,
+        # çağıran tam yenileme yapmalı.
+        if not self.complete or self.synced_at is None:
+            return False
+
+        updates = []
+        for p in changed:
+            new = product_to_data(p)
+            i = self.positions.get(new["product_id"])
+            if i is None or data[i]["name"] != new["name"]:
+                return False
+            if data[i] != new:
+                updates.append((i, new))
+
+        for i, new in updates:
+            data[i] = new
+
+        self._advance(changed)
+        return True
+
+    def _advance(self, products):
+        cursor = max((changed_cursor(p) for p in products), default=None)
+        if cursor is not None and (self.synced_at is None or cursor > self.synced_at):
+            self.synced_at = cursor
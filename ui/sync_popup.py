@@ -0,0 +1,116 @@
+import threading
+
+from kivy.clock import Clock
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.uix.popup import Popup
+from kivy.uix.textinput import TextInput
+
+import db
+import sync
+
+
+# ===============================
+# 🔄 SENKRONİZASYON PENCERESİ
+# ===============================
+# Sunucu adresi ayarlara kaydedilir; uygulama açıkken ayrıca
+# SYNC_INTERVAL_MINUTES'te bir arka planda eşitlenir.
+class SyncPopup(Popup):
+
+    def __init__(self, on_synced=None, **kwargs):
+        super().__init__(
+            title="Çoklu Cihaz",
+            size_hint=(0.9, None),
+            height=390,
+            **kwargs
+        )
+
+        self.on_synced = on_synced
+
+        root = BoxLayout(orientation="vertical", spacing=8, padding=8)
+
+        self.url_input = TextInput(
+            text=sync.sync_url() or "",
+            hint_text="Sunucu adresi (http://192.168.1.10:8765)",
+            multiline=False,
+            size_hint_y=None,
+            height=44
+        )
+        root.add_widget(self.url_input)
+
+        self.token_input = TextInput(
+            text=db.get_setting(sync.SYNC_TOKEN_KEY) or "",
+            hint_text="Cihaz anahtarı (sunucunun --hub-token değeri)",
+            password=True,
+            multiline=False,
+            size_hint_y=None,
+            height=44
+        )
+        root.add_widget(self.token_input)
+
+        root.add_widget(Label(
+            text=f"Cihaz: {sync.device_id()}",
+            font_size=13,
+            color=(0.7, 0.7, 0.7, 1),
+            size_hint_y=None,
+            height=24
+        ))
+
+        last = db.get_setting(sync.LAST_SYNC_KEY)
+        self.status = Label(
+            text=f"Son eşitleme: {last.replace('T', ' ')}" if last else "Henüz eşitlenmedi",
+            size_hint_y=None,
+            height=50
+        )
+        root.add_widget(self.status)
+
+        self.sync_btn = Button(
+            text="🔄 Şimdi Senkronize Et",
+            size_hint_y=None,
+            height=44,
+            on_release=self.start_sync
+        )
+        root.add_widget(self.sync_btn)
+
+        root.add_widget(Button(
+            text="Kapat",
+            size_hint_y=None,
+            height=42,
+            on_release=self.dismiss
+        ))
+
+        self.content = root
+
+    def start_sync(self, *args):
+        url = self.url_input.text.strip()
+        if not url:
+            self.status.text = "❌ Sunucu adresi girin"
+            return
+
+        db.set_setting(sync.SYNC_URL_KEY, url)
+        db.set_setting(sync.SYNC_TOKEN_KEY, self.token_input.text.strip())
+        self.sync_btn.disabled = True
+        self.status.text = "Eşitleniyor..."
+
+        def worker():
+            try:
+                summary, error = sync.sync(url), None
+            except Exception as e:
+                summary, error = None, e
+            Clock.schedule_once(lambda dt: self._sync_done(summary, error))
+
+        threading.Thread(target=worker, name="sync", daemon=True).start()
+
+    def _sync_done(self, summary, error):
+        self.sync_btn.disabled = False
+        if error:
+            self.status.text = f"Hata: {error}"
+            return
+
+        self.status.text = (
+            f"✅ {summary['pushed']} gönderildi, {summary['pulled']} alındı\n"
+            f"{summary['bytes'] / 1024:.1f} KB, {summary['seconds']:.1f} sn"
+        )
+        if summary["applied"] and self.on_synced:
+            self.on_synced()
@@ -0,0 +1,334 @@
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.label import Label
+from kivy.uix.popup import Popup
+from kivy.uix.scrollview import ScrollView
+from kivy.uix.spinner import Spinner
+from kivy.uix.textinput import TextInput
+from kivy.uix.togglebutton import ToggleButton
+
+import db
+
+
+def _pin_input(hint="PIN"):
+    return TextInput(
+        hint_text=hint,
+        password=True,
+        input_filter="int",
+        multiline=False,
+        size_hint_y=None,
+        height=44
+    )
+
+
+# ===============================
+# 🔑 GİRİŞ
+# ===============================
+# Bir kullanıcının PIN'i varsa uygulama açılışta bunu gösterir. Kapatılamaz;
+# can_cancel=True sadece "kullanıcı değiştir" için.
+class LoginPopup(Popup):
+
+    def __init__(self, on_login=None, can_cancel=False, **kwargs):
+        super().__init__(
+            title="Giriş",
+            size_hint=(0.85, None),
+            height=300,
+            auto_dismiss=can_cancel,
+            **kwargs
+        )
+
+        self.on_login = on_login
+
+        root = BoxLayout(orientation="vertical", spacing=8, padding=8)
+
+        self.user_input = TextInput(
+            hint_text="Kullanıcı adı",
+            multiline=False,
+            size_hint_y=None,
+            height=44
+        )
+        root.add_widget(self.user_input)
+
+        self.pin_input = _pin_input()
+        self.pin_input.bind(on_text_validate=self.login)
+        root.add_widget(self.pin_input)
+
+        self.status = Label(text="", size_hint_y=None, height=30)
+        root.add_widget(self.status)
+
+        buttons = BoxLayout(size_hint_y=None, height=44, spacing=6)
+        if can_cancel:
+            buttons.add_widget(Button(text="İptal", on_release=self.dismiss))
+        buttons.add_widget(Button(text="🔑 Giriş", on_release=self.login))
+        root.add_widget(buttons)
+
+        self.content = root
+
+    def login(self, *args):
+        try:
+            db.login(self.user_input.text, self.pin_input.text)
+        except ValueError as e:
+            self.pin_input.text = ""
+            self.status.text = f"❌ {e}"
+            return
+
+        self.dismiss()
+        if self.on_login:
+            self.on_login()
+
+
+# ===============================
+# 👤 KULLANICILAR
+# ===============================
+class UsersPopup(Popup):
+
+    def __init__(self, on_changed=None, **kwargs):
+        super().__init__(
+            title="Kullanıcılar",
+            size_hint=(0.95, 0.9),
+            **kwargs
+        )
+
+        self.on_changed = on_changed
+
+        root = BoxLayout(orientation="vertical", spacing=8, padding=8)
+
+        top = BoxLayout(size_hint_y=None, height=44, spacing=6)
+        self.me_label = Label(text="", halign="left")
+        top.add_widget(self.me_label)
+        top.add_widget(Button(
+            text="🔁 Kullanıcı Değiştir",
+            size_hint_x=None,
+            width=170,
+            on_release=self.switch_user
+        ))
+        root.add_widget(top)
+
+        add_row = BoxLayout(size_hint_y=None, height=44, spacing=6)
+        self.name_input = TextInput(hint_text="Kullanıcı adı", multiline=False)
+        self.role_spinner = Spinner(size_hint_x=None, width=120)
+        self.pin_input = _pin_input("PIN (ops.)")
+        add_row.add_widget(self.name_input)
+        add_row.add_widget(self.role_spinner)
+        add_row.add_widget(self.pin_input)
+        add_row.add_widget(Button(
+            text="➕",
+            size_hint_x=None,
+            width=50,
+            on_release=self.add_user
+        ))
+        root.add_widget(add_row)
+
+        self.status = Label(text="", size_hint_y=None, height=30)
+        root.add_widget(self.status)
+
+        scroll = ScrollView()
+        self.rows = GridLayout(cols=1, spacing=6, size_hint_y=None)
+        self.rows.bind(minimum_height=self.rows.setter("height"))
+        scroll.add_widget(self.rows)
+        root.add_widget(scroll)
+
+        buttons = BoxLayout(size_hint_y=None, height=42, spacing=6)
+        buttons.add_widget(Button(text="🛡️ Roller", on_release=self.open_roles))
+        buttons.add_widget(Button(text="Kapat", on_release=self.dismiss))
+        root.add_widget(buttons)
+
+        self.content = root
+        self.refresh()
+
+    def refresh(self, *args):
+        self.rows.clear_widgets()
+
+        self._roles = {r["name"]: r["id"] for r in db.get_roles()}
+        self.role_spinner.values = list(self._roles)
+        if self.role_spinner.text not in self._roles:
+            self.role_spinner.text = next(reversed(self._roles), "")
+
+        me = db.current_user_id()
+        users = db.get_users()
+        self.me_label.text = next(
+            (f"👤 {u['username']} ({u['role']})" for u in users if u["id"] == me),
+            "👤 -"
+        )
+
+        for user in users:
+            row = BoxLayout(size_hint_y=None, height=44, spacing=6)
+            row.add_widget(Label(
+                text=f"{'🔒 ' if user['has_pin'] else ''}{user['username']}",
+                color=(1, 1, 1, 1) if user["active"] else (0.5, 0.5, 0.5, 1)
+            ))
+
+            role = Spinner(
+                text=user["role"],
+                values=list(self._roles),
+                size_hint_x=None,
+                width=120
+            )
+            role.bind(text=lambda x, text, uid=user["id"]: self._run(
+                db.set_user_role, uid, self._roles[text]
+            ))
+            row.add_widget(role)
+
+            row.add_widget(Button(
+                text="🔑 PIN",
+                size_hint_x=None,
+                width=80,
+                on_release=lambda x, uid=user["id"]: self.ask_pin(uid)
+            ))
+            row.add_widget(Button(
+                text="Pasifleştir" if user["active"] else "Aktifleştir",
+                size_hint_x=None,
+                width=110,
+                on_release=lambda x, u=user: self._run(db.set_user_active, u["id"], not u["active"])
+            ))
+            self.rows.add_widget(row)
+
+    def _run(self, fn, *args):
+        try:
+            fn(*args)
+        except ValueError as e:
+            self.status.text = f"❌ {e}"
+        else:
+            self.status.text = "✅ Kaydedildi"
+            if self.on_changed:
+                self.on_changed()
+        self.refresh()
+
+    def add_user(self, *args):
+        try:
+            db.add_user(
+                self.name_input.text,
+                self._roles.get(self.role_spinner.text),
+                self.pin_input.text or None
+            )
+        except ValueError as e:
+            self.status.text = f"❌ {e}"
+            return
+
+        self.name_input.text = ""
+        self.pin_input.text = ""
+        self.status.text = "✅ Kullanıcı eklendi"
+        self.refresh()
+
+    def ask_pin(self, user_id):
+        box = BoxLayout(orientation="vertical", spacing=8, padding=8)
+        pin = _pin_input("Yeni PIN (boş: PIN'siz)")
+        box.add_widget(pin)
+
+        popup = Popup(title="PIN", content=box, size_hint=(0.8, None), height=200)
+        buttons = BoxLayout(size_hint_y=None, height=44, spacing=6)
+        buttons.add_widget(Button(text="İptal", on_release=popup.dismiss))
+        buttons.add_widget(Button(
+            text="Kaydet",
+            on_release=lambda x: (
+                popup.dismiss(),
+                self._run(db.set_user_pin, user_id, pin.text or None)
+            )
+        ))
+        box.add_widget(buttons)
+        popup.open()
+
+    def switch_user(self, *args):
+        LoginPopup(on_login=self.refresh, can_cancel=True).open()
+
+    def open_roles(self, *args):
+        RolesPopup(on_changed=self.on_changed).open()
+
+
+# ===============================
+# 🛡️ ROLLER VE İZİNLER
+# ===============================
+class RolesPopup(Popup):
+
+    def __init__(self, on_changed=None, **kwargs):
+        super().__init__(
+            title="Roller",
+            size_hint=(0.95, 0.9),
+            **kwargs
+        )
+
+        self.on_changed = on_changed
+
+        root = BoxLayout(orientation="vertical", spacing=8, padding=8)
+
+        add_row = BoxLayout(size_hint_y=None, height=44, spacing=6)
+        self.name_input = TextInput(hint_text="Yeni rol adı", multiline=False)
+        add_row.add_widget(self.name_input)
+        add_row.add_widget(Button(
+            text="➕ Ekle",
+            size_hint_x=None,
+            width=90,
+            on_release=self.add_role
+        ))
+        root.add_widget(add_row)
+
+        self.status = Label(text="", size_hint_y=None, height=30)
+        root.add_widget(self.status)
+
+        scroll = ScrollView()
+        self.rows = GridLayout(cols=1, spacing=4, size_hint_y=None)
+        self.rows.bind(minimum_height=self.rows.setter("height"))
+        scroll.add_widget(self.rows)
+        root.add_widget(scroll)
+
+        root.add_widget(Button(
+            text="Kapat",
+            size_hint_y=None,
+            height=42,
+            on_release=self.dismiss
+        ))
+
+        self.content = root
+        self.refresh()
+
+    def refresh(self, *args):
+        self.rows.clear_widgets()
+
+        for role in db.get_roles():
+            self.rows.add_widget(Label(
+                text=role["name"],
+                bold=True,
+                size_hint_y=None,
+                height=32
+            ))
+
+            grid = GridLayout(cols=2, spacing=4, size_hint_y=None)
+            grid.bind(minimum_height=grid.setter("height"))
+            for permission, label in db.PERMISSIONS.items():
+                grid.add_widget(ToggleButton(
+                    text=label,
+                    state="down" if permission in role["permissions"] else "normal",
+                    size_hint_y=None,
+                    height=38,
+                    on_release=lambda x, r=role, p=permission: self.toggle(r, p, x.state == "down")
+                ))
+            self.rows.add_widget(grid)
+
+    def toggle(self, role, permission, granted):
+        permissions = set(role["permissions"])
+        if granted:
+            permissions.add(permission)
+        else:
+            permissions.discard(permission)
+
+        try:
+            db.set_role_permissions(role["id"], permissions)
+        except ValueError as e:
+            self.status.text = f"❌ {e}"
+        else:
+            self.status.text = "✅ Kaydedildi"
+            if self.on_changed:
+                self.on_changed()
+        self.refresh()
+
+    def add_role(self, *args):
+        try:
+            db.add_role(self.name_input.text)
+        except ValueError as e:
+            self.status.text = f"❌ {e}"
+            return
+
+        self.name_input.text = ""
+        self.status.text = "✅ Rol eklendi"
+        self.refresh()